@@ -331,7 +331,7 @@ def register_service_account(
         from .automation.engine import BrowserBot
         from .automation.flows.generic import GenericEmailCodeFlow, FlowConfig
         from .data.database import (
-            get_accounts,
+            get_account,
             upsert_account,
             save_registration,
         )
@@ -369,11 +369,7 @@ def register_service_account(
         else:
             if not mailbox_email:
                 return None
-            acc = None
-            for a in get_accounts():
-                if a['email'].lower() == mailbox_email.lower():
-                    acc = a
-                    break
+            acc = get_account(mailbox_email)
             if not acc:
                 return None
             email_acc = EmailAccount(
@@ -515,7 +511,7 @@ def register_service_account_http(
     try:
         from .automation.http import register_http
         from .data.database import (
-            get_accounts,
+            get_account,
             upsert_account,
             save_registration,
         )
@@ -559,10 +555,9 @@ def register_service_account_http(
             # best-effort: fetch stored password if not provided
             if not password_val:
                 try:
-                    for a in get_accounts():
-                        if a['email'].lower() == email_val.lower():
-                            password_val = a.get('password') or password_val
-                            break
+                    a = get_account(email_val)
+                    if a:
+                        password_val = a.get('password') or password_val
                 except Exception:
                     pass
 
@@ -31,6 +31,8 @@ from servbot import (
 from servbot.config import load_flashmail_card
 from servbot.data.database import (
     get_accounts,
+    get_account_emails,
+    get_account,
     upsert_account,
     list_flashmail_cards,
     add_flashmail_card,
@@ -383,16 +385,15 @@ class ServbotCLI:
     def cmd_check_all(self):
         """Check verification codes for all accounts."""
         try:
-            accounts = get_accounts()
+            emails = get_account_emails()
             
-            if not accounts:
+            if not emails:
                 print("\nNo accounts found in database.")
                 return
             
-            print(f"\nChecking verification codes for {len(accounts)} account(s)...")
+            print(f"\nChecking verification codes for {len(emails)} account(s)...")
             
-            for acc in accounts:
-                email = acc['email']
+            for email in emails:
                 print(f"\n{'=' * 70}")
                 print(f"Checking: {email}")
                 print("=" * 70)
@@ -772,8 +773,7 @@ class ServbotCLI:
             email: Email address to fetch codes for
         """
         # Get account details from database
-        accounts = get_accounts()
-        account = next((acc for acc in accounts if acc['email'].lower() == email.lower()), None)
+        account = get_account(email)
         if not account:
             print(f"Account not found in database: {email}")
             return
@@ -1,7 +1,7 @@
 """Email client implementations for supported providers (Graph-only)."""
 
-from .graph import GraphClient
+from .graph import GraphClient, GraphThrottled
 from .flashmail import FlashmailClient
 
-__all__ = ['GraphClient', 'FlashmailClient']
+__all__ = ['GraphClient', 'GraphThrottled', 'FlashmailClient']
 
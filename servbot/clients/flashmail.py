@@ -137,25 +137,46 @@ class FlashmailClient:
             digits = "".join(c for c in body if c.isdigit())
             return int(digits) if digits else 0
 
-    def fetch_accounts(self, quantity: int, account_type: str = "outlook") -> List[EmailAccount]:
+    def fetch_accounts(
+        self,
+        quantity: int,
+        account_type: str = "outlook",
+        *,
+        check_inventory: bool = False,
+        inventory: Optional[Dict[str, int]] = None,
+    ) -> List[EmailAccount]:
         """Fetches email accounts from Flashmail.
         
         Args:
             quantity: Number of accounts to fetch (1-2000)
             account_type: Type of account ("outlook" or "hotmail")
+            check_inventory: Query inventory first and fail fast when the
+                account type cannot cover ``quantity`` (avoids the slow fetch call)
+            inventory: Previously fetched inventory (from get_inventory) to check
+                against instead of issuing another request; batch callers can
+                pass the remaining budget here
             
         Returns:
             List of EmailAccount objects
             
         Raises:
             ValueError: If parameters are invalid
-            RuntimeError: If fetch request fails
+            RuntimeError: If fetch request fails or inventory is insufficient
         """
         if account_type not in {"outlook", "hotmail"}:
             raise ValueError("account_type must be 'outlook' or 'hotmail'")
         if not (FLASHMAIL_MIN_QUANTITY <= quantity <= FLASHMAIL_MAX_QUANTITY):
             raise ValueError(f"quantity must be between {FLASHMAIL_MIN_QUANTITY} and {FLASHMAIL_MAX_QUANTITY}")
         
+        if inventory is None and check_inventory:
+            inventory = self.get_inventory()
+        if inventory is not None:
+            available = int(inventory.get(account_type, 0))
+            if available < quantity:
+                raise RuntimeError(
+                    f"Insufficient {account_type} inventory: {available} available, {quantity} requested"
+                )
+        
         status, body, _ = _http_get(
             "/huoqu",
             params={
@@ -10,24 +10,283 @@ For Outlook/Hotmail/Office 365 accounts, this is preferred over IMAP
 for better reliability and modern authentication support.
 """
 
+import atexit
+import collections
+import concurrent.futures
 import datetime as dt
-from typing import List, Optional
+import functools
+import hashlib
+import logging
+import threading
+import time
+from typing import ClassVar, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
 
 from .base import EmailClient
 from ..core.models import EmailMessage
-from ..parsers.email_parser import html_to_text
+from ..parsers.email_parser import fast_html_snippet
 from ..constants import (
     GRAPH_API_BASE_URL,
     GRAPH_TOKEN_URL,
     GRAPH_API_SCOPE,
     GRAPH_API_MAX_MESSAGES,
+    GRAPH_API_DEFAULT_LIMIT,
+    MAX_HTML_BODY_BYTES,
 )
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.exceptions import HTTPError as Urllib3Error
+    from urllib3.util.retry import Retry
 except ImportError:
     requests = None  # type: ignore
 
+try:
+    # Optional: C JSON parser, noticeably faster on large Graph pages
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+try:
+    # Optional: incremental JSON parsing for large (full-body) list pages
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Connection pool sizing for the shared Graph/login session
+GRAPH_POOL_SIZE = 20
+
+# Worker cap for GraphClient.fetch_many; kept below GRAPH_POOL_SIZE so every
+# worker gets a pooled connection instead of opening a throwaway one
+GRAPH_FETCH_MANY_WORKERS = 16
+
+# Full-body pages at least this large (or of unknown length) are streamed
+# with ijson; smaller ones are cheaper to decode in one _loads() call
+GRAPH_STREAM_MIN_BYTES = 256 * 1024
+
+# $select for list calls; the full body is only requested when asked for
+GRAPH_SELECT_LIST = "id,subject,from,bodyPreview,receivedDateTime,isRead"
+GRAPH_SELECT_WITH_BODY = GRAPH_SELECT_LIST + ",body"
+
+# Graph JSON batching accepts at most 20 requests per $batch call
+GRAPH_BATCH_SIZE = 20
+
+# Refresh access tokens this many seconds before they actually expire
+TOKEN_EXPIRY_SKEW_SECONDS = 60
+
+# Rotated refresh tokens are written to the DB behind the caller's back; the
+# new access token is usable immediately, the row only matters after restart
+_PERSIST_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="graph-persist"
+)
+atexit.register(_PERSIST_EXECUTOR.shutdown, wait=True)
+
+# Access tokens shared across clients for the same account:
+# (client_id, sha256(refresh_token)) -> (access_token, refresh_token, expires_at)
+# Rotation adds a key per new refresh token (the old key is kept so holders
+# of the old token find the new one), so the least recently stored entries
+# are evicted beyond TOKEN_CACHE_MAX_ENTRIES.
+TOKEN_CACHE_MAX_ENTRIES = 1024
+_TOKEN_CACHE: "collections.OrderedDict[Tuple[str, str], Tuple[str, str, float]]" = collections.OrderedDict()
+_TOKEN_CACHE_LOCK = threading.Lock()
+
+
+class GraphThrottled(RuntimeError):
+    """Raised when Graph is still returning 429 after the session's retries.
+    
+    Attributes:
+        retry_after: Seconds the server asked us to wait (None if not given)
+    """
+
+    def __init__(self, retry_after: Optional[float] = None):
+        self.retry_after = retry_after
+        super().__init__(f"Graph API throttled (Retry-After: {retry_after})")
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    """Reads a numeric Retry-After header from a 429 response."""
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+# Token requests send a pre-encoded form body, so the header is set explicitly
+_FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+def _refresh_request_body(client_id: Optional[str], refresh_token: Optional[str]) -> Optional[bytes]:
+    """URL-encodes the refresh-token grant once for reuse across refreshes."""
+    if not client_id or not refresh_token:
+        return None
+    # Use user's specified method: include explicit Graph scope on refresh
+    return urlencode({
+        "client_id": client_id,
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token,
+        "scope": GRAPH_API_SCOPE,
+    }).encode("ascii")
+
+
+def _token_cache_key(client_id: str, refresh_token: str) -> Tuple[str, str]:
+    return (client_id, hashlib.sha256(refresh_token.encode("utf-8")).hexdigest())
+
+
+def _store_token(client_id: str, refresh_token: str, entry: Tuple[str, str, float]) -> None:
+    """Caches a token entry under the given credentials, evicting the oldest if full."""
+    key = _token_cache_key(client_id, refresh_token)
+    with _TOKEN_CACHE_LOCK:
+        _TOKEN_CACHE[key] = entry
+        _TOKEN_CACHE.move_to_end(key)
+        while len(_TOKEN_CACHE) > TOKEN_CACHE_MAX_ENTRIES:
+            _TOKEN_CACHE.popitem(last=False)
+
+
+def _expires_at(token_data: dict) -> float:
+    """Converts a token response's expires_in into a monotonic deadline."""
+    try:
+        expires_in = int(token_data.get("expires_in", 3600))
+    except (TypeError, ValueError):
+        expires_in = 3600
+    return time.monotonic() + expires_in - TOKEN_EXPIRY_SKEW_SECONDS
+
+
+def _cached_token(client_id: Optional[str], refresh_token: Optional[str]) -> Optional[Tuple[str, str, float]]:
+    """Returns a still-valid cached token entry for the credentials, if any."""
+    if not client_id or not refresh_token:
+        return None
+    entry = _TOKEN_CACHE.get(_token_cache_key(client_id, refresh_token))
+    if entry and time.monotonic() < entry[2]:
+        return entry
+    return None
+
+
+def _build_session() -> "requests.Session":
+    """Builds a pooled, retrying session for Graph and token endpoints."""
+    session = requests.Session()  # type: ignore
+    adapter = HTTPAdapter(
+        pool_connections=GRAPH_POOL_SIZE,
+        pool_maxsize=GRAPH_POOL_SIZE,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "PATCH", "POST"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+@functools.lru_cache(maxsize=8)
+def _build_list_url(
+    folder: str,
+    unseen_only: bool,
+    top: int,
+    since_str: Optional[str],
+    include_body: bool,
+) -> str:
+    """Builds the fully encoded message-list URL.
+    
+    Polling loops repeat the same query, so the encoded URL is cached rather
+    than rebuilding and re-encoding the params dict on every request.
+    """
+    filters = []
+    if unseen_only:
+        filters.append("isRead eq false")
+    if since_str:
+        filters.append(f"receivedDateTime ge {since_str}")
+    
+    params = {
+        "$top": top,
+        "$select": GRAPH_SELECT_WITH_BODY if include_body else GRAPH_SELECT_LIST,
+        "$orderby": "receivedDateTime desc",
+    }
+    if filters:
+        params["$filter"] = " and ".join(filters)
+    
+    return f"{GRAPH_API_BASE_URL}/me/mailFolders/{quote(folder, safe='')}/messages?{urlencode(params)}"
+
+
+def _format_since(since: dt.datetime) -> str:
+    """Formats a datetime as a Graph UTC timestamp (naive values are taken as UTC).
+    
+    isoformat() is cheaper than strftime() and the result feeds the cached
+    _build_list_url() key, so repeated polls reuse the encoded URL.
+    """
+    if since.tzinfo is not None:
+        since = since.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return since.replace(microsecond=0).isoformat() + "Z"
+
+
+def _parse_graph_datetime(value: str) -> Optional[dt.datetime]:
+    """Parses a Graph ISO-8601 timestamp such as 2025-01-01T12:00:00Z."""
+    if not value:
+        return None
+    try:
+        return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+class _GraphPage:
+    """Iterates the ``value`` entries of one Graph list response.
+    
+    ``next_link`` holds ``@odata.nextLink`` once iteration has seen it. When
+    streaming (ijson installed, large page) message dicts are built one at a
+    time from the raw socket instead of decoding the whole page first.
+    Streaming errors are re-raised as ``ValueError`` (bad JSON) or
+    ``requests.ConnectionError`` (transport), like the non-streaming path.
+    """
+
+    def __init__(self, response, stream: bool = False):
+        self.response = response
+        self.stream = stream and ijson is not None and self._is_large(response)
+        self.next_link: Optional[str] = None
+
+    @staticmethod
+    def _is_large(response) -> bool:
+        try:
+            return int(response.headers.get("Content-Length")) >= GRAPH_STREAM_MIN_BYTES
+        except (TypeError, ValueError):
+            return True  # chunked/unknown length: assume large
+
+    def __iter__(self):
+        if not self.stream:
+            data = _loads(self.response.content)
+            self.next_link = data.get("@odata.nextLink")
+            yield from data.get("value", [])
+            return
+        
+        raw = self.response.raw
+        raw.decode_content = True  # let urllib3 undo gzip/deflate
+        builder = None
+        try:
+            for prefix, event, value in ijson.parse(raw):
+                if prefix == "@odata.nextLink" and event == "string":
+                    self.next_link = value
+                elif prefix == "value.item" and event == "start_map":
+                    builder = ObjectBuilder()
+                    builder.event(event, value)
+                elif builder is not None:
+                    builder.event(event, value)
+                    if prefix == "value.item" and event == "end_map":
+                        yield builder.value
+                        builder = None
+        except ijson.JSONError as e:
+            raise ValueError(f"Malformed Graph response: {e}") from e
+        except Urllib3Error as e:
+            raise requests.ConnectionError(e) from e
+
 
 class GraphClient(EmailClient):
     """Microsoft Graph API email client.
@@ -42,12 +301,27 @@ class GraphClient(EmailClient):
         mailbox: Email address of the mailbox being accessed
     """
 
+    # One keep-alive session shared by every client so repeated polls reuse
+    # TCP/TLS connections to graph.microsoft.com and login.microsoftonline.com.
+    _session: ClassVar[Optional["requests.Session"]] = None
+    _session_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def _get_session(cls) -> "requests.Session":
+        """Returns the shared HTTP session, creating it on first use."""
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    cls._session = _build_session()
+        return cls._session
+
     def __init__(
         self,
         access_token: str,
         refresh_token: Optional[str] = None,
         client_id: Optional[str] = None,
         mailbox: Optional[str] = None,
+        expires_at: float = 0.0,
     ):
         """Initializes Graph API client.
         
@@ -56,127 +330,204 @@ class GraphClient(EmailClient):
             refresh_token: OAuth2 refresh token (for token renewal)
             client_id: Application client ID (for token renewal)
             mailbox: Email address of the mailbox (for message tracking)
+            expires_at: time.monotonic() deadline after which the access token
+                is refreshed proactively (0 = unknown, refresh only on 401)
         """
         if not requests:
             raise RuntimeError("requests library required for Graph API client")
         
+        self._get_session()
         self.access_token = access_token
-        self.refresh_token = refresh_token
         self.client_id = client_id
+        self.refresh_token = refresh_token
         self.mailbox = mailbox or ""
+        self._expires_at = expires_at
+
+    @property
+    def access_token(self) -> str:
+        return self._access_token
+
+    @access_token.setter
+    def access_token(self, value: str) -> None:
+        # Authorization varies per mailbox, so it lives on the client rather
+        # than on the shared session; rebuilt only when the token changes.
+        self._access_token = value
+        self._auth_headers = {"Authorization": f"Bearer {value}"}
+
+    @property
+    def refresh_token(self) -> Optional[str]:
+        return self._refresh_token
+
+    @refresh_token.setter
+    def refresh_token(self, value: Optional[str]) -> None:
+        # Re-encoded only when the token is set or rotated, not per refresh
+        self._refresh_token = value
+        self._refresh_body = _refresh_request_body(self.client_id, value)
 
     def fetch_messages(
         self,
         folder: str = "inbox",
         unseen_only: bool = True,
         since: Optional[dt.datetime] = None,
-        limit: int = GRAPH_API_MAX_MESSAGES,
+        limit: int = GRAPH_API_DEFAULT_LIMIT,
+        include_body: bool = False,
     ) -> List[EmailMessage]:
         """Fetches messages from Microsoft Graph API.
         
+        Pages are requested with the largest useful ``$top`` and
+        ``@odata.nextLink`` is followed until ``limit`` messages are collected.
+        
         Args:
             folder: Mail folder name (default "inbox")
             unseen_only: Only fetch unread messages
             since: Only fetch messages since this datetime
-            limit: Maximum messages to fetch (max from constants)
+            limit: Maximum messages to fetch
+            include_body: Also download the full message body. When False only
+                ``bodyPreview`` is requested, which keeps list payloads small.
             
         Returns:
             List of EmailMessage objects
         
+        Transport, HTTP (after the session's retries) and JSON decoding errors
+        are logged and yield an empty list.
+        
         Raises:
-            RuntimeError: If mailbox is not set or API request fails after retry
+            GraphThrottled: If Graph is still throttling after the retries;
+                ``retry_after`` says how long to back off
+            RuntimeError: If the mailbox or folder is forbidden or missing
         """
         # Mailbox is optional for basic fetch (used in tests); recommended in production for tracking
+        self._ensure_token()
+        
+        since_str = _format_since(since) if since else None
+        url = _build_list_url(
+            folder, unseen_only, min(limit, GRAPH_API_MAX_MESSAGES), since_str, include_body
+        )
+        
+        messages: List[EmailMessage] = []
         try:
-            # Build filter query
-            filters = []
-            if unseen_only:
-                filters.append("isRead eq false")
-            if since:
-                since_str = since.strftime("%Y-%m-%dT%H:%M:%SZ")
-                filters.append(f"receivedDateTime ge {since_str}")
-            
-            filter_query = " and ".join(filters) if filters else None
-            
-            # Build request URL
-            url = f"{GRAPH_API_BASE_URL}/me/mailFolders/{folder}/messages"
-            params = {
-                "$top": min(limit, GRAPH_API_MAX_MESSAGES),
-                "$select": "id,subject,from,body,bodyPreview,receivedDateTime,isRead",
-                "$orderby": "receivedDateTime desc"
-            }
-            if filter_query:
-                params["$filter"] = filter_query
-            
-            # First attempt
-            response = requests.get(  # type: ignore
-                url,
-                headers={"Authorization": f"Bearer {self.access_token}"},
-                params=params,
-                timeout=30,
-            )
-            
-            # Handle 401 Unauthorized - token may be expired
-            if response.status_code == 401:
-                # Try to refresh token
-                new_token = self.refresh_access_token()
-                if new_token:
-                    # Retry with new token
-                    response = requests.get(  # type: ignore
-                        url,
-                        headers={"Authorization": f"Bearer {new_token}"},
-                        params=params,
-                        timeout=30,
-                    )
+            response = self._get(url, stream=include_body)
             
             # Handle errors
             if response.status_code == 403:
+                response.close()
                 raise RuntimeError(
                     f"Insufficient permissions to access mailbox '{self.mailbox}'. "
                     "Required scopes: Mail.Read or Mail.ReadWrite"
                 )
             elif response.status_code == 404:
+                response.close()
                 raise RuntimeError(
                     f"Mailbox or folder not found: mailbox='{self.mailbox}', folder='{folder}'"
                 )
             
-            response.raise_for_status()
-            
-            raw_messages = response.json().get("value", [])
+            # Follow server-side paging until the caller's limit is met.
+            # Full-body pages are streamed so each message is converted as it
+            # is parsed rather than after the whole page is materialized.
+            while True:
+                try:
+                    if response.status_code == 429:
+                        # The session already backed off per Retry-After;
+                        # hand the wait to the caller instead of spinning.
+                        raise GraphThrottled(_retry_after_seconds(response))
+                    response.raise_for_status()
+                    page = _GraphPage(response, stream=include_body)
+                    for msg in page:
+                        messages.append(self._to_email_message(msg))
+                        if len(messages) >= limit:
+                            break
+                finally:
+                    response.close()
+                if not page.next_link or len(messages) >= limit:
+                    break
+                response = self._get(page.next_link, stream=include_body)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("Graph message fetch failed for '%s': %s", self.mailbox, e)
+            return []
+        
+        return messages
+
+    @staticmethod
+    def fetch_many(clients: List["GraphClient"], **kwargs) -> Dict[str, List[EmailMessage]]:
+        """Fetches several mailboxes concurrently over the shared session.
+        
+        Args:
+            clients: Clients to poll, one per mailbox
+            **kwargs: Passed through to fetch_messages()
             
-            # Convert to EmailMessage objects
-            messages = []
-            for msg in raw_messages:
-                from_email = msg.get("from", {}).get("emailAddress", {})
-                from_addr = from_email.get("address", "")
-                
-                body_preview = msg.get("bodyPreview", "")
-                body_html = msg.get("body", {}).get("content", "")
-                body_type = msg.get("body", {}).get("contentType", "text")
-                
-                # Convert HTML to text if needed
-                if body_html and body_type == "html":
-                    body_text = html_to_text(body_html)
+        Returns:
+            Dict mapping each client's mailbox to its messages. A mailbox whose
+            fetch raised (including GraphThrottled) maps to an empty list.
+        """
+        results: Dict[str, List[EmailMessage]] = {}
+        if not clients:
+            return results
+        
+        workers = min(GRAPH_FETCH_MANY_WORKERS, len(clients))
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="graph-fetch"
+        ) as executor:
+            futures = {executor.submit(c.fetch_messages, **kwargs): c for c in clients}
+            for future in concurrent.futures.as_completed(futures):
+                client = futures[future]
+                error = future.exception()
+                if error is not None:
+                    logger.warning("Graph fetch failed for '%s': %s", client.mailbox, error)
+                    results[client.mailbox] = []
                 else:
-                    body_text = body_preview
-                
-                email_msg = EmailMessage(
-                    message_id=str(msg.get("id", "")),
-                    provider="graph",
-                    mailbox=self.mailbox,  # Use client's mailbox
-                    subject=msg.get("subject", ""),
-                    from_addr=from_addr,
-                    received_date=msg.get("receivedDateTime", ""),
-                    body_text=body_text,
-                    body_html=body_html,
-                    is_read=bool(msg.get("isRead", False)),
-                )
-                messages.append(email_msg)
-            
-            return messages
+                    results[client.mailbox] = future.result()
+        return results
+
+    def _to_email_message(self, msg: dict) -> EmailMessage:
+        """Converts one Graph message resource into an EmailMessage.
         
-        except Exception:
-            return []
+        Graph already returns ``id`` as a string and ``isRead`` as a bool, so
+        they are passed through without coercion; ``or {}`` also covers
+        properties Graph sends as null.
+        """
+        sender = (msg.get("from") or {}).get("emailAddress") or {}
+        body = msg.get("body") or {}
+        body_html = body.get("content") or ""
+        if len(body_html) > MAX_HTML_BODY_BYTES:
+            body_html = body_html[:MAX_HTML_BODY_BYTES]
+        
+        # Convert HTML to text if needed; body_text feeds code/link
+        # extraction, so the snippet is not length-capped here
+        if body_html and body.get("contentType", "text") == "html":
+            body_text = fast_html_snippet(body_html, max_len=None)
+        else:
+            body_text = msg.get("bodyPreview", "")
+        
+        received_raw = msg.get("receivedDateTime", "")
+        
+        return EmailMessage(
+            message_id=msg.get("id", ""),
+            provider="graph",
+            mailbox=self.mailbox,  # Use client's mailbox
+            subject=msg.get("subject", ""),
+            from_addr=sender.get("address", ""),
+            received_date=received_raw,
+            body_text=body_text,
+            body_html=body_html,
+            is_read=msg.get("isRead", False),
+            received_at=_parse_graph_datetime(received_raw),
+        )
+
+    def _get(self, url: str, params: Optional[dict] = None, stream: bool = False):
+        """GETs a Graph URL, refreshing the token and retrying once on 401."""
+        response = self._session.get(
+            url, headers=self._auth_headers, params=params, timeout=30, stream=stream
+        )
+        
+        # Handle 401 Unauthorized - token may be expired
+        if response.status_code == 401:
+            new_token = self.refresh_access_token()
+            if new_token:
+                response.close()
+                response = self._session.get(
+                    url, headers=self._auth_headers, params=params, timeout=30, stream=stream
+                )
+        return response
 
     def mark_as_read(self, message_id: str) -> bool:
         """Marks message as read via Graph API.
@@ -188,13 +539,11 @@ class GraphClient(EmailClient):
             True if successful, False otherwise
         """
         try:
+            self._ensure_token()
             url = f"{GRAPH_API_BASE_URL}/me/messages/{message_id}"
-            response = requests.patch(  # type: ignore
+            response = self._session.patch(
                 url,
-                headers={
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Content-Type": "application/json",
-                },
+                headers=self._auth_headers,
                 json={"isRead": True},
                 timeout=10,
             )
@@ -203,12 +552,64 @@ class GraphClient(EmailClient):
         except Exception:
             return False
 
+    def mark_many_as_read(self, message_ids: List[str]) -> Dict[str, bool]:
+        """Marks several messages as read using Graph JSON batching.
+        
+        Sends up to GRAPH_BATCH_SIZE PATCH requests per ``$batch`` call instead
+        of one round-trip per message.
+        
+        Args:
+            message_ids: Message IDs from Graph API
+            
+        Returns:
+            Dict mapping each message ID to True if it was marked read
+        """
+        results = {mid: False for mid in message_ids}
+        try:
+            self._ensure_token()
+        except Exception:
+            return results
+        
+        ids = list(results)
+        url = f"{GRAPH_API_BASE_URL}/$batch"
+        for start in range(0, len(ids), GRAPH_BATCH_SIZE):
+            chunk = ids[start:start + GRAPH_BATCH_SIZE]
+            payload = {
+                "requests": [
+                    {
+                        "id": str(i),
+                        "method": "PATCH",
+                        "url": f"/me/messages/{mid}",
+                        "headers": {"Content-Type": "application/json"},
+                        "body": {"isRead": True},
+                    }
+                    for i, mid in enumerate(chunk)
+                ]
+            }
+            try:
+                response = self._session.post(url, headers=self._auth_headers, json=payload, timeout=30)
+                if response.status_code == 401 and self.refresh_access_token():
+                    response = self._session.post(
+                        url, headers=self._auth_headers, json=payload, timeout=30
+                    )
+                response.raise_for_status()
+                for item in _loads(response.content).get("responses", []):
+                    try:
+                        mid = chunk[int(item.get("id"))]
+                    except (TypeError, ValueError, IndexError):
+                        continue
+                    results[mid] = int(item.get("status", 500)) < 300
+            except Exception:
+                continue
+        return results
+
     def refresh_access_token(self) -> Optional[str]:
         """Refreshes the access token using refresh token.
         
         Attempts to refresh the OAuth access token using the stored refresh token.
         If successful, updates the client's access_token and optionally persists
-        to database if mailbox is known.
+        to database if mailbox is known. The database write runs on a background
+        thread so the new token is returned without waiting for it.
         
         Microsoft Graph may rotate refresh tokens - if a new refresh_token is
         returned, it will be stored and the old one should be discarded.
@@ -216,44 +617,64 @@ class GraphClient(EmailClient):
         Returns:
             New access token or None if refresh fails
         """
-        if not self.refresh_token or not self.client_id:
+        if not self._refresh_body:
             return None
         
         try:
-            # Use user's specified method: include explicit Graph scope on refresh
-            response = requests.post(  # type: ignore
+            response = self._session.post(
                 GRAPH_TOKEN_URL,
-                data={
-                    "client_id": self.client_id,
-                    "grant_type": "refresh_token",
-                    "refresh_token": self.refresh_token,
-                    "scope": GRAPH_API_SCOPE,
-                },
+                data=self._refresh_body,
+                headers=_FORM_HEADERS,
                 timeout=10,
             )
             response.raise_for_status()
-            token_data = response.json()
+            token_data = _loads(response.content)
             new_access_token = token_data.get("access_token")
             new_refresh_token = token_data.get("refresh_token")  # May be rotated
             
             if new_access_token:
+                used_refresh_token = self.refresh_token
                 self.access_token = new_access_token
+                self._expires_at = _expires_at(token_data)
                 
                 # If refresh token was rotated, update it
                 if new_refresh_token and new_refresh_token != self.refresh_token:
                     self.refresh_token = new_refresh_token
+                    _store_token(
+                        self.client_id, new_refresh_token,
+                        (new_access_token, new_refresh_token, self._expires_at),
+                    )
                     
-                    # Persist to database if mailbox is known
+                    # Persist to database if mailbox is known (write-behind;
+                    # _persist_tokens_to_db never raises)
                     if self.mailbox:
-                        try:
-                            self._persist_tokens_to_db(new_access_token, new_refresh_token)
-                        except Exception:
-                            # Don't fail refresh if persistence fails
-                            pass
+                        _PERSIST_EXECUTOR.submit(
+                            self._persist_tokens_to_db, new_access_token, new_refresh_token
+                        )
+                
+                _store_token(
+                    self.client_id, used_refresh_token,
+                    (new_access_token, self.refresh_token, self._expires_at),
+                )
             
             return new_access_token
         except Exception:
             return None
+
+    def _ensure_token(self) -> None:
+        """Refreshes the access token ahead of expiry.
+        
+        Adopts a token another client already refreshed for the same account
+        before falling back to a token-endpoint round-trip. Tokens with an
+        unknown expiry are left alone and refreshed reactively on 401.
+        """
+        if not self._expires_at or time.monotonic() < self._expires_at:
+            return
+        cached = _cached_token(self.client_id, self.refresh_token)
+        if cached:
+            self.access_token, self.refresh_token, self._expires_at = cached
+            return
+        self.refresh_access_token()
     
     def _persist_tokens_to_db(self, access_token: str, refresh_token: str) -> None:
         """Persists refreshed tokens to database.
@@ -294,22 +715,23 @@ class GraphClient(EmailClient):
         Returns:
             GraphClient instance or None if token refresh fails
         """
+        cached = _cached_token(client_id, refresh_token)
+        if cached:
+            return cls(cached[0], cached[1], client_id, mailbox, expires_at=cached[2])
         try:
-            # Use user's specified method: include explicit Graph scope on refresh
-            response = requests.post(  # type: ignore
+            response = cls._get_session().post(
                 GRAPH_TOKEN_URL,
-                data={
-                    "client_id": client_id,
-                    "grant_type": "refresh_token",
-                    "refresh_token": refresh_token,
-                    "scope": GRAPH_API_SCOPE,
-                },
+                data=_refresh_request_body(client_id, refresh_token),
+                headers=_FORM_HEADERS,
                 timeout=10,
             )
             response.raise_for_status()
-            access_token = response.json().get("access_token")
+            token_data = _loads(response.content)
+            access_token = token_data.get("access_token")
             if access_token:
-                return cls(access_token, refresh_token, client_id, mailbox)
+                expires_at = _expires_at(token_data)
+                _store_token(client_id, refresh_token, (access_token, refresh_token, expires_at))
+                return cls(access_token, refresh_token, client_id, mailbox, expires_at=expires_at)
         except Exception:
             pass
         return None
@@ -5,48 +5,47 @@ Loads settings from the data directory.
 """
 from __future__ import annotations
 
+import functools
 import os
+import re
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+# Matches lines like: CEREBRAS_KEY = "key"
+_KV_RE = re.compile(r'^\s*(\w+)\s*=\s*["\']?([^"\'\n]+)', re.M)
+
 
 def get_data_dir() -> Path:
     """Get the data directory path."""
     return Path(__file__).parent / "data"
 
 
-def load_cerebras_key() -> Optional[str]:
-    """Load Cerebras API key from data/ai.api file."""
+@functools.lru_cache(maxsize=1)
+def _load_ai_api_dict() -> Dict[str, str]:
+    """Parse data/ai.api once into a KEY -> value dict.
+
+    Call clear_config_cache() to pick up file changes.
+    """
     try:
         ai_api_file = get_data_dir() / "ai.api"
         if not ai_api_file.exists():
-            return None
-        
+            return {}
         content = ai_api_file.read_text()
-        for line in content.split('\n'):
-            if line.startswith('CEREBRAS_KEY'):
-                # Extract key from line like: CEREBRAS_KEY = "key"
-                return line.split('=')[1].strip().strip('"\'')
-        return None
+        return {m.group(1): m.group(2).strip() for m in _KV_RE.finditer(content)}
     except Exception:
-        return None
+        return {}
+
+
+@functools.lru_cache(maxsize=1)
+def load_cerebras_key() -> Optional[str]:
+    """Load Cerebras API key from data/ai.api file."""
+    return _load_ai_api_dict().get('CEREBRAS_KEY')
 
 
+@functools.lru_cache(maxsize=1)
 def load_flashmail_card() -> Optional[str]:
     """Load Flashmail API card from data/ai.api file."""
-    try:
-        ai_api_file = get_data_dir() / "ai.api"
-        if not ai_api_file.exists():
-            return None
-        
-        content = ai_api_file.read_text()
-        for line in content.split('\n'):
-            if line.startswith('FLASHMAIL_CARD'):
-                # Extract key from line like: FLASHMAIL_CARD = "key"
-                return line.split('=')[1].strip().strip('"\'')
-        return None
-    except Exception:
-        return None
+    return _load_ai_api_dict().get('FLASHMAIL_CARD')
 
 
 def load_graph_account() -> Optional[Dict[str, str]]:
@@ -64,22 +63,25 @@ def load_graph_account() -> Optional[Dict[str, str]]:
     Returns:
         Dict with keys: email, refresh_token, client_id
         Returns None if no credentials found
+    
+    The result is cached; call clear_config_cache() after changing credentials.
     """
+    acct = _load_graph_account()
+    return dict(acct) if acct else None
+
+
+@functools.lru_cache(maxsize=1)
+def _load_graph_account() -> Optional[Dict[str, str]]:
     try:
         # 1) Try accounts table first (new unified storage)
         try:
-            from .data.database import ensure_db, get_accounts
+            from .data.database import ensure_db, get_first_graph_account
             ensure_db()
             
             # Get first account with Graph credentials
-            accounts = get_accounts()
-            for acc in accounts:
-                if acc.get('refresh_token') and acc.get('client_id'):
-                    return {
-                        'email': acc['email'],
-                        'refresh_token': acc['refresh_token'],
-                        'client_id': acc['client_id'],
-                    }
+            acc = get_first_graph_account()
+            if acc:
+                return acc
         except Exception:
             pass
         
@@ -146,6 +148,9 @@ def load_account_credentials(email: str) -> Optional[Dict[str, str]]:
         - source: Account source (flashmail, manual, file, migrated)
         
         Returns None if account not found
+    
+    Results are cached per normalized email; database writes through
+    upsert_account()/upsert_graph_account() invalidate the cache.
         
     Example:
         >>> creds = load_account_credentials("user@outlook.com")
@@ -164,51 +169,38 @@ def load_account_credentials(email: str) -> Optional[Dict[str, str]]:
         ...         creds['password']
         ...     )
     """
+    creds = _load_account_credentials((email or '').strip().lower())
+    return dict(creds) if creds else None
+
+
+@functools.lru_cache(maxsize=128)
+def _load_account_credentials(email: str) -> Optional[Dict[str, Any]]:
     try:
-        from .data.database import ensure_db, get_accounts
+        from .data.database import ensure_db, get_account
         ensure_db()
-        
-        accounts = get_accounts()
-        for acc in accounts:
-            if acc['email'].lower() == email.lower():
-                return acc
-        
-        return None
+        return get_account(email)
     except Exception:
         return None
 
 
-# Global config cache
-_CONFIG_CACHE: Dict[str, Any] = {}
-
-
-def get_config(key: str, loader_func=None, default=None):
-    """Get configuration value with caching."""
-    if key not in _CONFIG_CACHE:
-        if loader_func:
-            _CONFIG_CACHE[key] = loader_func()
-        else:
-            _CONFIG_CACHE[key] = default
-    return _CONFIG_CACHE[key] or default
-
-
+@functools.lru_cache(maxsize=1)
 def load_groq_key() -> Optional[str]:
     """Load Groq API key from env or data/ai.api.
     Checks env: GROQ_API_KEY, GROQ_API; then data/ai.api line GROQ_API = "...".
     """
-    import os
     # Env first
     key = os.getenv('GROQ_API_KEY') or os.getenv('GROQ_API')
     if key:
         return key.strip()
-    try:
-        ai_api_file = get_data_dir() / "ai.api"
-        if not ai_api_file.exists():
-            return None
-        content = ai_api_file.read_text()
-        for line in content.split('\n'):
-            if line.strip().startswith('GROQ_API') and '=' in line:
-                return line.split('=', 1)[1].strip().strip('"\'')
-    except Exception:
-        pass
-    return None
+    values = _load_ai_api_dict()
+    return values.get('GROQ_API') or values.get('GROQ_API_KEY')
+
+
+def clear_config_cache() -> None:
+    """Drop all cached configuration so the next load re-reads its source."""
+    _load_ai_api_dict.cache_clear()
+    load_cerebras_key.cache_clear()
+    load_flashmail_card.cache_clear()
+    load_groq_key.cache_clear()
+    _load_graph_account.cache_clear()
+    _load_account_credentials.cache_clear()
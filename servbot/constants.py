@@ -13,7 +13,8 @@ DEFAULT_IMAP_TIMEOUT = 30
 GRAPH_API_BASE_URL = "https://graph.microsoft.com/v1.0"
 GRAPH_TOKEN_URL = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
 GRAPH_API_SCOPE = "https://graph.microsoft.com/.default"
-GRAPH_API_MAX_MESSAGES = 50
+GRAPH_API_MAX_MESSAGES = 1000  # Largest $top Graph accepts per page
+GRAPH_API_DEFAULT_LIMIT = 50
 
 # Flashmail API Configuration
 FLASHMAIL_BASE_URL = "https://zizhu.shanyouxiang.com"
@@ -24,6 +25,7 @@ FLASHMAIL_DEFAULT_TIMEOUT = 60
 # Message Fetching Defaults
 DEFAULT_MESSAGE_LIMIT = 200
 DEFAULT_MESSAGE_PREVIEW_LENGTH = 280
+MAX_HTML_BODY_BYTES = 524288  # HTML bodies are truncated to this many characters before parsing
 
 # Verification Polling
 DEFAULT_POLL_TIMEOUT_SECONDS = 60
@@ -5,13 +5,16 @@ following Google Python Style Guide conventions.
 """
 
 from dataclasses import dataclass
+from datetime import datetime
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Verification:
     """Represents an extracted verification code or link.
     
+    Immutable and hashable, so instances can be used directly in dedup sets.
+    
     Attributes:
         service: Name of the service (e.g., "Google", "GitHub")
         code: Verification code or URL
@@ -34,7 +37,7 @@ class Verification:
         return f"<{self.service}, {self.code}>"
 
 
-@dataclass
+@dataclass(slots=True)
 class EmailAccount:
     """Represents an email account configuration.
     
@@ -58,7 +61,7 @@ class EmailAccount:
     client_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class EmailMessage:
     """Represents a fetched email message.
     
@@ -70,8 +73,11 @@ class EmailMessage:
         from_addr: Sender email address
         received_date: Date message was received
         body_text: Plain text body
-        body_html: HTML body
+        body_html: HTML body (Graph bodies are truncated to MAX_HTML_BODY_BYTES
+            characters to bound memory)
         is_read: Whether message has been read
+        received_at: received_date parsed once into a timezone-aware datetime
+            (None when the provider did not supply a parseable date)
     """
     message_id: str
     provider: str
@@ -82,4 +88,5 @@ class EmailMessage:
     body_text: str = ""
     body_html: str = ""
     is_read: bool = False
+    received_at: Optional[datetime] = None
 
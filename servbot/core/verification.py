@@ -9,7 +9,7 @@ import time
 from typing import List, Optional
 
 from .models import Verification, EmailMessage
-from ..clients import GraphClient
+from ..clients import GraphClient, GraphThrottled
 from ..parsers import (
     parse_verification_codes,
     parse_verification_links,
@@ -182,6 +182,9 @@ def fetch_verification_codes(
         
     Returns:
         List of Verification objects, deduplicated and sorted by newest first
+    
+    Raises:
+        GraphThrottled: If Microsoft Graph is throttling the mailbox
     """
     results: List[Verification] = []
     messages: List[EmailMessage] = []
@@ -193,17 +196,14 @@ def fetch_verification_codes(
         # First, try to get Graph credentials for this specific account
         if username:
             try:
-                from ..data.database import get_accounts
-                accounts = get_accounts()
-                for acc in accounts:
-                    if acc['email'].lower() == username.lower():
-                        if acc.get('refresh_token') and acc.get('client_id'):
-                            graph_client = GraphClient.from_credentials(
-                                acc['refresh_token'],
-                                acc['client_id'],
-                                mailbox=username,  # Pass mailbox for message tracking
-                            )
-                        break
+                from ..data.database import get_account
+                acc = get_account(username)
+                if acc and acc.get('refresh_token') and acc.get('client_id'):
+                    graph_client = GraphClient.from_credentials(
+                        acc['refresh_token'],
+                        acc['client_id'],
+                        mailbox=username,  # Pass mailbox for message tracking
+                    )
             except Exception:
                 pass
         
@@ -231,9 +231,11 @@ def fetch_verification_codes(
                     unseen_only=unseen_only,
                     since=since,
                     limit=min(limit, GRAPH_API_MAX_MESSAGES),
+                    include_body=True,
                 )
                 
                 # Process messages
+                to_mark: List[str] = []
                 for msg in messages:
                     verifs = _process_email_for_verifications(msg, use_ai)
                     if verifs:
@@ -241,10 +243,15 @@ def fetch_verification_codes(
                         _save_message_and_verifications(msg, verifs)
                         
                         if mark_seen:
-                            graph_client.mark_as_read(msg.message_id)
+                            to_mark.append(msg.message_id)
+                
+                if to_mark:
+                    graph_client.mark_many_as_read(to_mark)
                 
                 if results:
                     return _deduplicate_verifications(results)
+            except GraphThrottled:
+                raise  # Let pollers back off for Retry-After
             except Exception:
                 pass  # Fall through to IMAP
     
@@ -291,17 +298,23 @@ def get_verification_for_service(
     deadline = dt.datetime.utcnow() + dt.timedelta(seconds=max(0, timeout_seconds))
     
     while True:
-        verifications = fetch_verification_codes(
-            imap_server=imap_server,
-            username=username,
-            password=password,
-            port=port,
-            ssl=ssl,
-            folder=folder,
-            unseen_only=unseen_only,
-            limit=100,
-            prefer_graph=prefer_graph,
-        )
+        wait = max(MIN_POLL_INTERVAL_SECONDS, poll_interval_seconds)
+        try:
+            verifications = fetch_verification_codes(
+                imap_server=imap_server,
+                username=username,
+                password=password,
+                port=port,
+                ssl=ssl,
+                folder=folder,
+                unseen_only=unseen_only,
+                limit=100,
+                prefer_graph=prefer_graph,
+            )
+        except GraphThrottled as e:
+            # Honor the server's Retry-After instead of polling straight back in
+            verifications = []
+            wait = max(wait, e.retry_after or 0)
         
         # Find matching service
         candidates = [
@@ -326,7 +339,7 @@ def get_verification_for_service(
             return None
         
         # Wait before next poll
-        time.sleep(max(MIN_POLL_INTERVAL_SECONDS, poll_interval_seconds))
+        time.sleep(wait)
 
 
 def get_latest_verification(
@@ -352,21 +365,25 @@ def get_latest_verification(
         prefer_graph: Try Graph API first
         
     Returns:
-        Verification object or None if not found
+        Verification object or None if not found (including while Microsoft
+        Graph is throttling the mailbox)
     """
     canonical = canonical_service_name(target_service)
     
-    verifications = fetch_verification_codes(
-        imap_server=imap_server,
-        username=username,
-        password=password,
-        port=port,
-        ssl=ssl,
-        folder=folder,
-        unseen_only=True,
-        limit=DEFAULT_MESSAGE_LIMIT,
-        prefer_graph=prefer_graph,
-    )
+    try:
+        verifications = fetch_verification_codes(
+            imap_server=imap_server,
+            username=username,
+            password=password,
+            port=port,
+            ssl=ssl,
+            folder=folder,
+            unseen_only=True,
+            limit=DEFAULT_MESSAGE_LIMIT,
+            prefer_graph=prefer_graph,
+        )
+    except GraphThrottled:
+        return None  # single-shot: nothing to back off for
     
     # Find first matching service
     for v in verifications:
@@ -3,10 +3,15 @@
 from .services import SERVICES, ALIASES
 from .database import (
     ensure_db,
+    close_db,
     upsert_account,
     save_message,
+    save_messages_bulk,
     save_verification,
     get_accounts,
+    get_account_emails,
+    get_account,
+    get_first_graph_account,
     get_latest_verifications,
     find_verification,
     get_graph_account,
@@ -21,10 +26,15 @@ __all__ = [
     'SERVICES',
     'ALIASES',
     'ensure_db',
+    'close_db',
     'upsert_account',
     'save_message',
+    'save_messages_bulk',
     'save_verification',
     'get_accounts',
+    'get_account_emails',
+    'get_account',
+    'get_first_graph_account',
     'get_latest_verifications',
     'find_verification',
     'get_graph_account',
@@ -8,158 +8,350 @@ SQLite-backed local database for accounts, messages, and verifications.
 """
 from __future__ import annotations
 
+import functools
+import re
 import sqlite3
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 
 from ..constants import DEFAULT_MESSAGE_PREVIEW_LENGTH, DEFAULT_VERIFICATION_HOURS
 
 DATA_DIR = Path(__file__).parent
 DB_PATH = DATA_DIR / "servbot.db"
 
+# Bump whenever _SCHEMA_DDL changes so existing databases pick it up
+SCHEMA_VERSION = 7
+
+_SCHEMA_DDL = """
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT,
+    type TEXT,               -- outlook | hotmail | other
+    source TEXT,             -- flashmail | file | manual | other
+    card TEXT,               -- DEPRECATED: do not store API cards in DB
+    imap_server TEXT,
+    refresh_token TEXT,      -- Microsoft Graph API OAuth refresh token
+    client_id TEXT,          -- Microsoft Graph API OAuth client ID
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    last_seen_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,        -- imap | graph
+    mailbox TEXT NOT NULL,         -- the email address
+    provider_msg_id TEXT NOT NULL, -- stable id per provider
+    subject TEXT,
+    from_addr TEXT,
+    received_date TEXT,
+    body_preview TEXT,
+    body_html TEXT,
+    body_text TEXT,
+    is_read INTEGER,
+    service TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(provider, mailbox, provider_msg_id)
+);
+
+CREATE TABLE IF NOT EXISTS verifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id INTEGER NOT NULL REFERENCES messages(id) ON DELETE CASCADE,
+    service TEXT,
+    value TEXT,
+    is_link INTEGER,               -- 0 code, 1 link
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- LEGACY TABLE: graph_accounts is deprecated
+-- New accounts should store credentials in the accounts table
+-- This table is kept for backward compatibility
+CREATE TABLE IF NOT EXISTS graph_accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE,
+    refresh_token TEXT,      -- Microsoft Graph API OAuth refresh token
+    client_id TEXT,          -- Microsoft Graph API OAuth client ID
+    added_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_accounts_email_lower ON accounts(lower(email));
+CREATE INDEX IF NOT EXISTS idx_messages_mailbox ON messages(mailbox);
+CREATE INDEX IF NOT EXISTS idx_verifications_message ON verifications(message_id);
+CREATE INDEX IF NOT EXISTS idx_verifications_created_at ON verifications(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_verifications_service_created ON verifications(service COLLATE NOCASE, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_mailbox_id ON messages(mailbox, id);
+
+-- flashmail_cards metadata (no secrets stored)
+CREATE TABLE IF NOT EXISTS flashmail_cards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    alias TEXT UNIQUE NOT NULL,
+    storage TEXT DEFAULT 'keyring',
+    last_known_balance INTEGER DEFAULT 0,
+    last_checked_at TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    is_default INTEGER DEFAULT 0
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_flashmail_cards_alias ON flashmail_cards(alias);
+-- At most one default card; older databases may hold several, so keep the
+-- one list_flashmail_cards() already reported first
+DROP INDEX IF EXISTS idx_flashmail_cards_default;
+UPDATE flashmail_cards SET is_default = 0
+WHERE is_default = 1
+  AND alias != (SELECT MIN(alias) FROM flashmail_cards WHERE is_default = 1);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_flashmail_cards_only_default
+    ON flashmail_cards(is_default) WHERE is_default = 1;
+
+-- registrations (stores service site account results and artifacts)
+CREATE TABLE IF NOT EXISTS registrations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service TEXT NOT NULL,
+    website_url TEXT,
+    mailbox_email TEXT NOT NULL,
+    service_username TEXT,
+    service_password TEXT,
+    status TEXT DEFAULT 'success',
+    error TEXT,
+    cookies_json TEXT,
+    storage_state_json TEXT,
+    user_agent TEXT,
+    profile_dir TEXT,
+    debug_dir TEXT,
+    artifacts_json TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT
+);
+
+-- (service, mailbox_email) lookups come back newest first without a sort;
+-- the leading columns also cover service-only filters
+DROP INDEX IF EXISTS idx_registrations_service_mailbox;
+CREATE INDEX IF NOT EXISTS idx_registrations_svc_mbox_created
+    ON registrations(service, mailbox_email, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_registrations_created_at ON registrations(created_at);
+
+-- event_log (written by servbot.event_logger)
+CREATE TABLE IF NOT EXISTS event_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_type TEXT,
+    status TEXT,
+    service TEXT,
+    details_json TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_log_type ON event_log(event_type);
+CREATE INDEX IF NOT EXISTS idx_event_log_status ON event_log(status);
+"""
 
-def _connect() -> sqlite3.Connection:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+# INSERT ... RETURNING is available from SQLite 3.35 onwards
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Appended to an upsert so it hands back the row id (inserted or updated);
+# the plain statements stay RETURNING-free for executemany()
+_RETURNING_ID = " RETURNING id"
+
+
+_UPSERT_ACCOUNT_SQL = """
+    INSERT INTO accounts(email, password, type, source, card, imap_server, refresh_token, client_id)
+    VALUES(?,?,?,?,?,?,?,?)
+    ON CONFLICT(email) DO UPDATE SET
+        password=excluded.password,
+        type=excluded.type,
+        source=excluded.source,
+        card=excluded.card,
+        imap_server=excluded.imap_server,
+        refresh_token=excluded.refresh_token,
+        client_id=excluded.client_id
+"""
 
+_UPSERT_ACCOUNT_IF_PROVIDED_SQL = """
+    INSERT INTO accounts(email, password, type, source, card, imap_server, refresh_token, client_id)
+    VALUES(?,?,?,?,?,?,?,?)
+    ON CONFLICT(email) DO UPDATE SET
+        password=CASE WHEN excluded.password != '' THEN excluded.password ELSE accounts.password END,
+        type=COALESCE(excluded.type, accounts.type),
+        source=COALESCE(excluded.source, accounts.source),
+        card=COALESCE(excluded.card, accounts.card),
+        imap_server=COALESCE(excluded.imap_server, accounts.imap_server),
+        refresh_token=COALESCE(excluded.refresh_token, accounts.refresh_token),
+        client_id=COALESCE(excluded.client_id, accounts.client_id)
+"""
 
-def init_db() -> None:
-    conn = _connect()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT NOT NULL UNIQUE,
-            password TEXT,
-            type TEXT,               -- outlook | hotmail | other
-            source TEXT,             -- flashmail | file | manual | other
-            card TEXT,               -- DEPRECATED: do not store API cards in DB
-            imap_server TEXT,
-            refresh_token TEXT,      -- Microsoft Graph API OAuth refresh token
-            client_id TEXT,          -- Microsoft Graph API OAuth client ID
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            last_seen_at TEXT
-        );
-        """
-    )
+_UPSERT_GRAPH_ACCOUNT_SQL = """
+    INSERT INTO graph_accounts(email, refresh_token, client_id)
+    VALUES(?,?,?)
+    ON CONFLICT(email) DO UPDATE SET
+        refresh_token=excluded.refresh_token,
+        client_id=excluded.client_id
+"""
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            provider TEXT NOT NULL,        -- imap | graph
-            mailbox TEXT NOT NULL,         -- the email address
-            provider_msg_id TEXT NOT NULL, -- stable id per provider
-            subject TEXT,
-            from_addr TEXT,
-            received_date TEXT,
-            body_preview TEXT,
-            body_html TEXT,
-            body_text TEXT,
-            is_read INTEGER,
-            service TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(provider, mailbox, provider_msg_id)
-        );
-        """
-    )
 
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS verifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            message_id INTEGER NOT NULL REFERENCES messages(id) ON DELETE CASCADE,
-            service TEXT,
-            value TEXT,
-            is_link INTEGER,               -- 0 code, 1 link
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-    )
+_SAVE_MESSAGE_SQL = """
+    INSERT INTO messages(provider, mailbox, provider_msg_id, subject, from_addr, received_date, body_preview, body_html, body_text, is_read, service)
+    VALUES(?,?,?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(provider, mailbox, provider_msg_id) DO UPDATE SET
+        subject=excluded.subject,
+        from_addr=excluded.from_addr,
+        received_date=excluded.received_date,
+        body_preview=excluded.body_preview,
+        body_html=excluded.body_html,
+        body_text=excluded.body_text,
+        is_read=COALESCE(excluded.is_read, messages.is_read),
+        service=excluded.service
+"""
+_SAVE_MESSAGE_RETURNING_SQL = _SAVE_MESSAGE_SQL + _RETURNING_ID
+_UPSERT_ACCOUNT_RETURNING_SQL = _UPSERT_ACCOUNT_SQL + _RETURNING_ID
+_UPSERT_ACCOUNT_IF_PROVIDED_RETURNING_SQL = _UPSERT_ACCOUNT_IF_PROVIDED_SQL + _RETURNING_ID
+_UPSERT_GRAPH_ACCOUNT_RETURNING_SQL = _UPSERT_GRAPH_ACCOUNT_SQL + _RETURNING_ID
 
-    # LEGACY TABLE: graph_accounts is deprecated
-    # New accounts should store credentials in the accounts table
-    # This table is kept for backward compatibility
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS graph_accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE,
-            refresh_token TEXT,      -- Microsoft Graph API OAuth refresh token
-            client_id TEXT,          -- Microsoft Graph API OAuth client ID
-            added_at TEXT DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-    )
+# upsert_account statement keyed by update_only_if_provided, resolved once
+# against _HAS_RETURNING
+_UPSERT_ACCOUNT_BY_MODE = {
+    False: _UPSERT_ACCOUNT_RETURNING_SQL if _HAS_RETURNING else _UPSERT_ACCOUNT_SQL,
+    True: _UPSERT_ACCOUNT_IF_PROVIDED_RETURNING_SQL if _HAS_RETURNING else _UPSERT_ACCOUNT_IF_PROVIDED_SQL,
+}
 
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_mailbox ON messages(mailbox);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_verifications_message ON verifications(message_id);")
-
-    # New table: flashmail_cards metadata (no secrets stored)
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS flashmail_cards (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            alias TEXT UNIQUE NOT NULL,
-            storage TEXT DEFAULT 'keyring',
-            last_known_balance INTEGER DEFAULT 0,
-            last_checked_at TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            is_default INTEGER DEFAULT 0
-        );
-        """
-    )
+_SAVE_VERIFICATION_SQL = (
+    "INSERT INTO verifications(message_id, service, value, is_link) VALUES(?,?,?,?)"
+)
 
-    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_flashmail_cards_alias ON flashmail_cards(alias);")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_flashmail_cards_default ON flashmail_cards(is_default);")
-
-    # New table: registrations (stores service site account results and artifacts)
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS registrations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            service TEXT NOT NULL,
-            website_url TEXT,
-            mailbox_email TEXT NOT NULL,
-            service_username TEXT,
-            service_password TEXT,
-            status TEXT DEFAULT 'success',
-            error TEXT,
-            cookies_json TEXT,
-            storage_state_json TEXT,
-            user_agent TEXT,
-            profile_dir TEXT,
-            debug_dir TEXT,
-            artifacts_json TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT
-        );
-        """
-    )
-    cur.execute(
-        "CREATE INDEX IF NOT EXISTS idx_registrations_service_mailbox ON registrations(service, mailbox_email);"
-    )
-    cur.execute(
-        "CREATE INDEX IF NOT EXISTS idx_registrations_created_at ON registrations(created_at);"
+
+# get_graph_account() result cache: (DB_PATH, monotonic expiry, row)
+GRAPH_ACCOUNT_CACHE_TTL_SECONDS = 30
+_graph_account_cache: Optional[Tuple[str, float, Optional[Dict[str, str]]]] = None
+
+
+def _invalidate_credential_cache() -> None:
+    """Drops cached credential lookups (here and in servbot.config) after a write."""
+    global _graph_account_cache
+    _graph_account_cache = None
+    try:
+        from ..config import clear_config_cache
+        clear_config_cache()
+    except Exception:
+        pass
+
+
+# Connection setup applied once per cached connection
+# (journal_mode=WAL is persistent, so init_db() sets it once per file)
+_PRAGMAS = (
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA synchronous = NORMAL;",   # safe with WAL: commits append, no fsync each
+    "PRAGMA wal_autocheckpoint = 1000;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -64000;",   # ~64 MB page cache
+    "PRAGMA mmap_size = 268435456;",  # 256 MB
+)
+
+# One connection per thread, reused across helper calls (see _ThreadConnection)
+_CONN = threading.local()
+
+# DB paths already initialized and migrated by this process (see ensure_db)
+_ENSURED: set = set()
+
+
+class _SharedConnection(sqlite3.Connection):
+    """Cached connection whose close() is a no-op.
+    
+    Helpers (and older callers outside this module) may still call close();
+    the connection is really closed by close_db() or at interpreter exit.
+    """
+
+    def close(self) -> None:
+        pass
+
+    def _close(self) -> None:
+        super().close()
+
+
+class _ThreadConnection:
+    """Holds one thread's connection in _CONN and closes it with the thread.
+    
+    The holder is only referenced from the thread-local, so it is collected
+    when its thread exits; the finalizer then closes the connection. It also
+    runs at interpreter exit, or earlier via close().
+    """
+
+    __slots__ = ("conn", "path", "close", "__weakref__")
+
+    def __init__(self, conn: _SharedConnection, path: str):
+        self.conn = conn
+        self.path = path
+        self.close = weakref.finalize(self, conn._close)
+
+
+def _connect() -> sqlite3.Connection:
+    """Returns this thread's connection to DB_PATH, opening it on first use.
+    
+    Use as ``with _connect() as conn:`` so each helper commits (or rolls
+    back) its own work on the shared connection.
+    """
+    path = str(DB_PATH)
+    holder = getattr(_CONN, "holder", None)
+    if holder is not None:
+        if holder.path == path:
+            return holder.conn
+        holder.close()  # DB_PATH was repointed (tests)
+    
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    # Hot helpers use constant SQL text, so a larger statement cache means
+    # they are parsed once per connection rather than once per call
+    conn = sqlite3.connect(
+        path, factory=_SharedConnection, check_same_thread=False, cached_statements=256
     )
+    conn.row_factory = sqlite3.Row
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    _CONN.holder = _ThreadConnection(conn, path)
+    return conn
+
+
+def close_db() -> None:
+    """Closes the calling thread's cached connection (e.g. before deleting the file)."""
+    global _graph_account_cache
+    _ENSURED.discard(str(DB_PATH))  # the file may be deleted/replaced next
+    _graph_account_cache = None
+    holder = getattr(_CONN, "holder", None)
+    if holder is not None:
+        _CONN.holder = None
+        holder.close()
 
-    conn.commit()
-    conn.close()
+
+def init_db() -> None:
+    """Creates tables and indexes unless the schema is already current.
+    
+    PRAGMA user_version records SCHEMA_VERSION once the DDL has run, so warm
+    starts cost a single PRAGMA read instead of re-running every statement.
+    Bump SCHEMA_VERSION whenever _SCHEMA_DDL changes.
+    """
+    conn = _connect()
+    if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+        return
+    # WAL lets readers (get_accounts, get_recent_events) run alongside writers
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.executescript(_SCHEMA_DDL + f"PRAGMA user_version = {SCHEMA_VERSION};")
 
 
 def ensure_db() -> None:
-    """Ensures database is initialized and migrated."""
+    """Ensures database is initialized and migrated.
+    
+    Config loaders and card helpers call this on every lookup, so the schema
+    check and legacy migrations run once per process for each DB_PATH.
+    """
+    path = str(DB_PATH)
+    if path in _ENSURED:
+        return
     init_db()
     migrate_email_txt_to_db()
     migrate_graph_accounts_to_accounts()
     migrate_normalize_flashmail_passwords()
+    _ENSURED.add(path)
 
 
+@functools.lru_cache(maxsize=4096)
 def infer_type_from_email(email: str) -> str:
     e = (email or "").lower()
     if any(e.endswith("@" + d) for d in ("outlook.com", "live.com", "msn.com")):
@@ -204,65 +396,78 @@ def upsert_account(
 
     # Normalize Flashmail-style combined password if present: password----refresh_token----client_id
     pw = password or ""
-    pw_clean = pw
     rt = refresh_token
     cid = client_id
     if "----" in pw:
         parts = [p.strip() for p in pw.split("----")]
-        if len(parts) >= 1:
-            pw_clean = parts[0]
+        pw = parts[0]
         if len(parts) >= 3:
             # Only fill if not explicitly provided
             rt = rt or parts[1]
             cid = cid or parts[2]
 
-    conn = _connect()
-    cur = conn.cursor()
-    
-    if update_only_if_provided:
-        # Legacy mode: only update non-empty values (for backward compatibility)
-        cur.execute(
-            """
-            INSERT INTO accounts(email, password, type, source, card, imap_server, refresh_token, client_id)
-            VALUES(?,?,?,?,?,?,?,?)
-            ON CONFLICT(email) DO UPDATE SET
-                password=CASE WHEN excluded.password != '' THEN excluded.password ELSE accounts.password END,
-                type=COALESCE(excluded.type, accounts.type),
-                source=COALESCE(excluded.source, accounts.source),
-                card=COALESCE(excluded.card, accounts.card),
-                imap_server=COALESCE(excluded.imap_server, accounts.imap_server),
-                refresh_token=COALESCE(excluded.refresh_token, accounts.refresh_token),
-                client_id=COALESCE(excluded.client_id, accounts.client_id)
-            ;
-            """,
-            (email, pw_clean, acc_type, source, card, imap_server, rt, cid),
-        )
-    else:
-        # New mode: direct update allows NULL to clear values
-        cur.execute(
-            """
-            INSERT INTO accounts(email, password, type, source, card, imap_server, refresh_token, client_id)
-            VALUES(?,?,?,?,?,?,?,?)
-            ON CONFLICT(email) DO UPDATE SET
-                password=excluded.password,
-                type=excluded.type,
-                source=excluded.source,
-                card=excluded.card,
-                imap_server=excluded.imap_server,
-                refresh_token=excluded.refresh_token,
-                client_id=excluded.client_id
-            ;
-            """,
-            (email, pw_clean, acc_type, source, card, imap_server, rt, cid),
-        )
-    
-    conn.commit()
-    cur.execute("SELECT id FROM accounts WHERE email=?", (email,))
-    row = cur.fetchone()
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        # Legacy mode only updates non-empty values (for backward compatibility);
+        # the default mode updates directly, allowing NULL to clear values
+        params = (email, pw, acc_type, source, card, imap_server, rt, cid)
+        cur.execute(_UPSERT_ACCOUNT_BY_MODE[bool(update_only_if_provided)], params)
+        if not _HAS_RETURNING:
+            cur.execute("SELECT id FROM accounts WHERE email=?", (email,))
+        row = cur.fetchone()
+    _invalidate_credential_cache()
     return int(row[0]) if row else 0
 
 
+_PREVIEW_TRANS = str.maketrans({"\r": " ", "\n": " "})
+_NON_SPACE_RE = re.compile(r"\S")
+
+
+def _message_preview(text: str) -> str:
+    """Same result as text.strip() with CR/LF -> space, cut to the preview length.
+    
+    Only the leading whitespace and the preview window are touched, so large
+    bodies are not copied three times just to keep their first few hundred chars.
+    """
+    m = _NON_SPACE_RE.search(text)
+    if not m:
+        return ""
+    start = m.start()
+    end = start + DEFAULT_MESSAGE_PREVIEW_LENGTH
+    window = text[start:end]
+    if not _NON_SPACE_RE.search(text, end):
+        window = window.rstrip()  # nothing but whitespace follows the window
+    return window.translate(_PREVIEW_TRANS)
+
+
+def _message_row(
+    mailbox: str,
+    provider: str,
+    provider_msg_id: str,
+    subject: str = "",
+    from_addr: str = "",
+    received_date: str = "",
+    body_text: str = "",
+    body_html: str = "",
+    is_read: Optional[bool] = None,
+    service: str = "",
+) -> Tuple[Any, ...]:
+    """Builds the _SAVE_MESSAGE_SQL parameter tuple for one message."""
+    return (
+        provider,
+        mailbox,
+        provider_msg_id,
+        subject,
+        from_addr,
+        received_date,
+        _message_preview(body_text or ""),
+        body_html,
+        body_text,
+        1 if is_read else 0 if is_read is not None else None,
+        service,
+    )
+
+
 def save_message(
     *,
     mailbox: str,
@@ -278,107 +483,93 @@ def save_message(
 ) -> int:
     if not mailbox or not provider or not provider_msg_id:
         return 0
-    preview = (body_text or "").strip().replace("\r", " ").replace("\n", " ")
-    if len(preview) > DEFAULT_MESSAGE_PREVIEW_LENGTH:
-        preview = preview[:DEFAULT_MESSAGE_PREVIEW_LENGTH]
-
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO messages(provider, mailbox, provider_msg_id, subject, from_addr, received_date, body_preview, body_html, body_text, is_read, service)
-        VALUES(?,?,?,?,?,?,?,?,?,?,?)
-        ON CONFLICT(provider, mailbox, provider_msg_id) DO UPDATE SET
-            subject=excluded.subject,
-            from_addr=excluded.from_addr,
-            received_date=excluded.received_date,
-            body_preview=excluded.body_preview,
-            body_html=excluded.body_html,
-            body_text=excluded.body_text,
-            is_read=COALESCE(excluded.is_read, messages.is_read),
-            service=excluded.service
-        ;
-        """,
-        (
-            provider,
-            mailbox,
-            provider_msg_id,
-            subject,
-            from_addr,
-            received_date,
-            preview,
-            body_html,
-            body_text,
-            1 if is_read else 0 if is_read is not None else None,
-            service,
-        ),
+    params = _message_row(
+        mailbox, provider, provider_msg_id, subject, from_addr,
+        received_date, body_text, body_html, is_read, service,
     )
-    conn.commit()
-    cur.execute(
-        "SELECT id FROM messages WHERE provider=? AND mailbox=? AND provider_msg_id=?",
-        (provider, mailbox, provider_msg_id),
-    )
-    row = cur.fetchone()
-    conn.close()
+
+    with _connect() as conn:
+        cur = conn.cursor()
+        if _HAS_RETURNING:
+            # The upsert hands back the row id directly (inserted or updated)
+            cur.execute(_SAVE_MESSAGE_RETURNING_SQL, params)
+            row = cur.fetchone()
+        else:
+            cur.execute(_SAVE_MESSAGE_SQL, params)
+            cur.execute(
+                "SELECT id FROM messages WHERE provider=? AND mailbox=? AND provider_msg_id=?",
+                (provider, mailbox, provider_msg_id),
+            )
+            row = cur.fetchone()
     return int(row[0]) if row else 0
 
 
+def save_messages_bulk(rows: List[Dict[str, Any]]) -> int:
+    """Upserts many messages in one transaction.
+    
+    Args:
+        rows: Dicts with the keyword arguments accepted by save_message()
+    
+    Returns:
+        Number of rows written (rows missing mailbox/provider/provider_msg_id
+        are skipped). Row ids are not returned; use save_message() for that.
+    """
+    params = [
+        _message_row(**row)
+        for row in rows
+        if row.get("mailbox") and row.get("provider") and row.get("provider_msg_id")
+    ]
+    if params:
+        with _connect() as conn:
+            conn.executemany(_SAVE_MESSAGE_SQL, params)
+    return len(params)
+
+
 def save_verification(*, message_id: int, service: str, value: str, is_link: bool) -> int:
     if not message_id or not value:
         return 0
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO verifications(message_id, service, value, is_link) VALUES(?,?,?,?)",
-        (message_id, service, value, 1 if is_link else 0),
-    )
-    conn.commit()
-    vid = cur.lastrowid
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(_SAVE_VERIFICATION_SQL, (message_id, service, value, 1 if is_link else 0))
+        vid = cur.lastrowid
     return int(vid)
 
 
 def get_graph_account() -> Optional[Dict[str, str]]:
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("SELECT email, refresh_token, client_id FROM graph_accounts ORDER BY id DESC LIMIT 1")
-    row = cur.fetchone()
-    conn.close()
-    if not row:
-        return None
-    return {"email": row[0], "refresh_token": row[1], "client_id": row[2]}
+    """Returns the newest legacy graph_accounts row (cached for a few seconds)."""
+    global _graph_account_cache
+    path = str(DB_PATH)
+    cached = _graph_account_cache
+    if cached is not None and cached[0] == path and time.monotonic() < cached[1]:
+        return dict(cached[2]) if cached[2] else None
+    
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT email, refresh_token, client_id FROM graph_accounts ORDER BY id DESC LIMIT 1")
+        row = cur.fetchone()
+    account = {"email": row[0], "refresh_token": row[1], "client_id": row[2]} if row else None
+    _graph_account_cache = (path, time.monotonic() + GRAPH_ACCOUNT_CACHE_TTL_SECONDS, account)
+    return dict(account) if account else None
 
 
 def upsert_graph_account(*, email: str, refresh_token: str, client_id: str) -> int:
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO graph_accounts(email, refresh_token, client_id)
-        VALUES(?,?,?)
-        ON CONFLICT(email) DO UPDATE SET
-            refresh_token=excluded.refresh_token,
-            client_id=excluded.client_id
-        ;
-        """,
-        (email, refresh_token, client_id),
-    )
-    conn.commit()
-    cur.execute("SELECT id FROM graph_accounts WHERE email=?", (email,))
-    row = cur.fetchone()
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        params = (email, refresh_token, client_id)
+        if _HAS_RETURNING:
+            cur.execute(_UPSERT_GRAPH_ACCOUNT_RETURNING_SQL, params)
+        else:
+            cur.execute(_UPSERT_GRAPH_ACCOUNT_SQL, params)
+            cur.execute("SELECT id FROM graph_accounts WHERE email=?", (email,))
+        row = cur.fetchone()
+    _invalidate_credential_cache()
     return int(row[0]) if row else 0
 
 
-def migrate_email_txt_to_db() -> None:
-    txt = DATA_DIR / "email.txt"
-    if not txt.exists():
-        return
-    try:
-        content = txt.read_text(errors="ignore")
-    except Exception:
-        return
-
+def _iter_legacy_lines(
+    content: str,
+) -> Iterator[Tuple[Tuple[Any, ...], Optional[Tuple[str, str, str]]]]:
+    """Parses email.txt lines into (account row, graph_accounts row or None)."""
     for line in content.splitlines():
         s = line.strip()
         if not s or s.startswith("#"):
@@ -386,8 +577,7 @@ def migrate_email_txt_to_db() -> None:
         email = ""
         password = ""
         acc_type: Optional[str] = None
-        refresh_token = ""
-        client_id = ""
+        graph_row: Optional[Tuple[str, str, str]] = None
         
         # try common separators
         for sep in ("----", ":", ",", "|"):
@@ -400,14 +590,7 @@ def migrate_email_txt_to_db() -> None:
                         refresh_token, client_id = parts[2], parts[3]
                         # Store Graph credentials
                         if refresh_token and client_id:
-                            try:
-                                upsert_graph_account(
-                                    email=email,
-                                    refresh_token=refresh_token,
-                                    client_id=client_id
-                                )
-                            except Exception:
-                                pass
+                            graph_row = (email, refresh_token, client_id)
                     elif len(parts) >= 3:
                         acc_type = parts[2]
                 break
@@ -419,61 +602,164 @@ def migrate_email_txt_to_db() -> None:
                 if len(parts) >= 3:
                     acc_type = parts[2]
         if email and password:
-            upsert_account(email=email, password=password, type=acc_type, source="file")
+            yield (
+                (email, password, acc_type or infer_type_from_email(email), "file", None, None, None, None),
+                graph_row,
+            )
+
+
+def migrate_email_txt_to_db() -> None:
+    txt = DATA_DIR / "email.txt"
+    if not txt.exists():
+        return
+    try:
+        content = txt.read_text(errors="ignore")
+    except Exception:
+        return
+
+    # Account rows stream straight into executemany; Graph rows (rare) are
+    # collected on the way and written in the same transaction
+    graph_rows: List[Tuple[str, str, str]] = []
+
+    def account_rows() -> Iterator[Tuple[Any, ...]]:
+        for account_row, graph_row in _iter_legacy_lines(content):
+            if graph_row:
+                graph_rows.append(graph_row)
+            yield account_row
+
+    with _connect() as conn:
+        if conn.executemany(_UPSERT_ACCOUNT_SQL, account_rows()).rowcount <= 0:
+            return
+        conn.executemany(_UPSERT_GRAPH_ACCOUNT_SQL, graph_rows)
+    _invalidate_credential_cache()
+
+
+def _get_accounts_raw(source: Optional[str] = None) -> List[sqlite3.Row]:
+    """Like get_accounts() but returns the sqlite3.Row objects unconverted.
+
+    Rows support ``row["email"]`` and index access; use this when only a few
+    columns are read and the dict copy per row would be wasted.
+    """
+    with _connect() as conn:
+        cur = conn.cursor()
+        query = "SELECT id, email, password, type, source, card, imap_server, refresh_token, client_id, created_at, last_seen_at FROM accounts"
+        params: List[Any] = []
+        if source:
+            query += " WHERE source = ?"
+            params.append(source)
+        query += " ORDER BY created_at DESC"
+        cur.execute(query, params)
+        return cur.fetchall()
 
 
 def get_accounts(source: Optional[str] = None) -> List[Dict[str, Any]]:
     """Retrieve accounts from the database, optionally filtered by source."""
-    conn = _connect()
-    cur = conn.cursor()
-    query = "SELECT id, email, password, type, source, card, imap_server, refresh_token, client_id, created_at, last_seen_at FROM accounts"
+    return [dict(row) for row in _get_accounts_raw(source)]
+
+
+def get_account_emails(source: Optional[str] = None) -> List[str]:
+    """Email addresses of all accounts, in get_accounts() order, optionally filtered by source."""
+    query = "SELECT email FROM accounts"
     params: List[Any] = []
     if source:
         query += " WHERE source = ?"
         params.append(source)
     query += " ORDER BY created_at DESC"
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    with _connect() as conn:
+        return [row[0] for row in conn.execute(query, params)]
+
+
+def get_account(email: str) -> Optional[Dict[str, Any]]:
+    """Retrieve one account by email (case-insensitive), or None."""
+    if not email:
+        return None
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT id, email, password, type, source, card, imap_server, refresh_token, client_id, created_at, last_seen_at
+            FROM accounts
+            WHERE lower(email) = lower(?)
+            LIMIT 1
+            """,
+            (email.strip(),),
+        )
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def get_first_graph_account() -> Optional[Dict[str, Any]]:
+    """Retrieve the newest account that has Microsoft Graph credentials."""
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT email, refresh_token, client_id
+            FROM accounts
+            WHERE refresh_token IS NOT NULL AND refresh_token != ''
+              AND client_id IS NOT NULL AND client_id != ''
+            ORDER BY created_at DESC
+            LIMIT 1
+            """
+        )
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def _get_latest_verifications_raw(mailbox: str, limit: int = 10) -> List[sqlite3.Row]:
+    """Like get_latest_verifications() but returns sqlite3.Row objects.
+
+    The mailbox filter is a subquery answered from the covering
+    idx_messages_mailbox_id, so no messages columns are joined into the rows
+    being sorted.
+    """
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT id, service, value, is_link, created_at
+            FROM verifications
+            WHERE message_id IN (SELECT id FROM messages WHERE mailbox = ?)
+            ORDER BY created_at DESC
+            LIMIT ?
+            """,
+            (mailbox, limit),
+        )
+        return cur.fetchall()
 
 
 def get_latest_verifications(mailbox: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Retrieve the latest verification codes/links for a given mailbox."""
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT v.id, v.service, v.value, v.is_link, v.created_at
-        FROM verifications v
-        JOIN messages m ON v.message_id = m.id
-        WHERE m.mailbox = ?
-        ORDER BY v.created_at DESC
-        LIMIT ?
-        """,
-        (mailbox, limit),
-    )
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    return [dict(row) for row in _get_latest_verifications_raw(mailbox, limit)]
 
 
-def find_verification(service: str, mailbox: Optional[str] = None, since_hours: int = DEFAULT_VERIFICATION_HOURS) -> Optional[Dict[str, Any]]:
+def find_verification(
+    service: str,
+    mailbox: Optional[str] = None,
+    since_hours: int = DEFAULT_VERIFICATION_HOURS,
+    exact: bool = True,
+) -> Optional[Dict[str, Any]]:
     """
     Find the latest verification for a specific service, optionally for a mailbox
     and within a certain timeframe.
+
+    With ``exact`` (the default) ``service`` is compared case-insensitively
+    with ``=``, so SQLite seeks idx_verifications_service_created and stops at
+    the first row. ``exact=False`` falls back to a substring ``LIKE`` scan.
     """
-    conn = _connect()
-    cur = conn.cursor()
-    
-    query = """
+    if exact:
+        service_clause = "v.service = ? COLLATE NOCASE"
+    else:
+        service_clause = "v.service LIKE ?"
+        service = f"%{service}%"
+    query = f"""
         SELECT v.id, v.service, v.value, v.is_link, v.created_at, m.mailbox
         FROM verifications v
         JOIN messages m ON v.message_id = m.id
-        WHERE v.service LIKE ?
-          AND v.created_at >= datetime('now', '-' || ? || ' hours')
+        WHERE v.created_at >= datetime('now', '-' || ? || ' hours')
+          AND {service_clause}
     """
-    params: List[Any] = [f"%{service}%", since_hours]
+    params: List[Any] = [since_hours, service]
 
     if mailbox:
         query += " AND m.mailbox = ?"
@@ -481,9 +767,8 @@ def find_verification(service: str, mailbox: Optional[str] = None, since_hours:
     
     query += " ORDER BY v.created_at DESC LIMIT 1"
     
-    cur.execute(query, params)
-    row = cur.fetchone()
-    conn.close()
+    with _connect() as conn:
+        row = conn.execute(query, params).fetchone()
     return dict(row) if row else None
 
 
@@ -496,53 +781,29 @@ def migrate_graph_accounts_to_accounts() -> None:
     This function is idempotent and safe to run multiple times.
     """
     try:
-        conn = _connect()
-        cur = conn.cursor()
-        
-        # Check if graph_accounts table has any data
-        cur.execute("SELECT COUNT(*) FROM graph_accounts")
-        count = cur.fetchone()
-        if not count or count[0] == 0:
-            conn.close()
-            return  # Nothing to migrate
-        
-        # Get all graph accounts
-        cur.execute("""
-            SELECT email, refresh_token, client_id, added_at
-            FROM graph_accounts
-            ORDER BY added_at DESC
-        """)
-        graph_accounts = cur.fetchall()
-        
-        migrated = 0
-        for row in graph_accounts:
-            email, refresh_token, client_id, added_at = row
-            
-            # Check if account already exists in accounts table
-            cur.execute("SELECT id, refresh_token, client_id FROM accounts WHERE email = ?", (email,))
-            existing = cur.fetchone()
-            
-            if existing:
-                # Account exists - only update if it doesn't have Graph credentials
-                if not existing[1] or not existing[2]:  # No refresh_token or client_id
-                    cur.execute("""
-                        UPDATE accounts
-                        SET refresh_token = ?, client_id = ?
-                        WHERE email = ?
-                    """, (refresh_token, client_id, email))
-                    migrated += 1
-            else:
-                # Account doesn't exist - create it with Graph credentials
-                # Infer type from email domain
-                acc_type = infer_type_from_email(email)
-                cur.execute("""
-                    INSERT INTO accounts (email, password, type, source, refresh_token, client_id)
-                    VALUES (?, '', ?, 'migrated', ?, ?)
-                """, (email, acc_type, refresh_token, client_id))
-                migrated += 1
-        
-        conn.commit()
-        conn.close()
+        with _connect() as conn:
+            # Set-based: nothing is read back into Python, and an empty
+            # graph_accounts table makes both statements no-ops
+            conn.create_function("infer_account_type", 1, infer_type_from_email, deterministic=True)
+            # Existing accounts only receive Graph credentials if they lack them
+            migrated = conn.execute(
+                """
+                UPDATE accounts SET (refresh_token, client_id) = (
+                    SELECT g.refresh_token, g.client_id FROM graph_accounts g
+                    WHERE g.email = accounts.email
+                )
+                WHERE (COALESCE(refresh_token, '') = '' OR COALESCE(client_id, '') = '')
+                  AND email IN (SELECT email FROM graph_accounts)
+                """
+            ).rowcount
+            migrated += conn.execute(
+                """
+                INSERT INTO accounts (email, password, type, source, refresh_token, client_id)
+                SELECT g.email, '', infer_account_type(g.email), 'migrated', g.refresh_token, g.client_id
+                FROM graph_accounts g
+                WHERE g.email NOT IN (SELECT email FROM accounts)
+                """
+            ).rowcount
         
         if migrated > 0:
             print(f"Migrated {migrated} account(s) from graph_accounts to accounts table.")
@@ -563,25 +824,24 @@ def migrate_normalize_flashmail_passwords() -> None:
     - accounts.client_id = client_id (if empty)
     """
     try:
-        conn = _connect()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT email, password, refresh_token, client_id
-            FROM accounts
-            WHERE password LIKE '%----%'
-            """
-        )
-        rows = cur.fetchall()
-        updated = 0
-        for email, pw, rt, cid in rows:
-            if not pw or '----' not in pw:
-                continue
-            parts = [p.strip() for p in pw.split('----')]
-            pw_clean = parts[0] if parts else pw
-            new_rt = rt or (parts[1] if len(parts) >= 2 else None)
-            new_cid = cid or (parts[2] if len(parts) >= 3 else None)
-            cur.execute(
+        with _connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT email, password, refresh_token, client_id
+                FROM accounts
+                WHERE password LIKE '%----%'
+                """
+            ).fetchall()
+            updates: List[Tuple[Any, ...]] = []
+            for email, pw, rt, cid in rows:
+                if not pw or '----' not in pw:
+                    continue
+                parts = [p.strip() for p in pw.split('----')]
+                pw_clean = parts[0] if parts else pw
+                new_rt = rt or (parts[1] if len(parts) >= 2 else None)
+                new_cid = cid or (parts[2] if len(parts) >= 3 else None)
+                updates.append((pw_clean, new_rt, new_cid, email))
+            conn.executemany(
                 """
                 UPDATE accounts
                 SET password = ?,
@@ -589,11 +849,9 @@ def migrate_normalize_flashmail_passwords() -> None:
                     client_id = COALESCE(?, client_id)
                 WHERE email = ?
                 """,
-                (pw_clean, new_rt, new_cid, email)
+                updates,
             )
-            updated += 1
-        conn.commit()
-        conn.close()
+            updated = len(updates)
         if updated:
             print(f"Normalized Flashmail-style passwords for {updated} account(s).")
     except Exception as e:
@@ -608,76 +866,115 @@ def add_flashmail_card(alias: str, storage: str = 'keyring') -> bool:
     """Add a flashmail card metadata row if not exists."""
     if not alias:
         return False
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO flashmail_cards(alias, storage)
-        VALUES(?, ?)
-        ON CONFLICT(alias) DO UPDATE SET storage=excluded.storage
-        """,
-        (alias, storage),
-    )
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO flashmail_cards(alias, storage)
+            VALUES(?, ?)
+            ON CONFLICT(alias) DO UPDATE SET storage=excluded.storage
+            """,
+            (alias, storage),
+        )
     return True
 
 
 def list_flashmail_cards() -> List[Dict[str, Any]]:
     """List all flashmail card aliases and metadata."""
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT alias, storage, last_known_balance, last_checked_at, is_default, created_at
-        FROM flashmail_cards
-        ORDER BY is_default DESC, alias ASC
-        """
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT alias, storage, last_known_balance, last_checked_at, is_default, created_at
+            FROM flashmail_cards
+            ORDER BY is_default DESC, alias ASC
+            """
+        )
+        rows = cur.fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_flashmail_cards_for_pick(min_required_credits: int, max_age_seconds: int) -> List[Dict[str, Any]]:
+    """Cards worth considering when picking one with enough credits.
+
+    Returns cards whose stored balance meets ``min_required_credits`` or was
+    not checked within ``max_age_seconds`` (so may have changed); cards with
+    a recent, too-small balance are filtered out in SQL. The card
+    list_flashmail_cards() would list first (the default, else the first
+    alias) is always included as the fallback choice, and comes first.
+
+    Returns:
+        Dicts with alias, last_known_balance, is_default and is_fresh, ordered
+        like list_flashmail_cards()
+    """
+    with _connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT alias, last_known_balance, is_default, is_fresh FROM (
+                SELECT alias, last_known_balance, is_default,
+                       COALESCE(julianday(last_checked_at) >= julianday('now', ?), 0) AS is_fresh
+                FROM flashmail_cards
+            )
+            WHERE last_known_balance >= ? OR NOT is_fresh
+               OR alias = (SELECT alias FROM flashmail_cards ORDER BY is_default DESC, alias ASC LIMIT 1)
+            ORDER BY is_default DESC, alias ASC
+            """,
+            (f"-{int(max_age_seconds)} seconds", int(min_required_credits)),
+        ).fetchall()
     return [dict(row) for row in rows]
 
 
 def set_default_flashmail_card(alias: str) -> bool:
     if not alias:
         return False
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("UPDATE flashmail_cards SET is_default = 0")
-    cur.execute("UPDATE flashmail_cards SET is_default = 1 WHERE alias = ?", (alias,))
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        # Both statements seek idx_flashmail_cards_only_default / the alias
+        # index. They stay separate because the unique index is checked per
+        # row, so a single CASE update could set the new default first.
+        cur.execute("UPDATE flashmail_cards SET is_default = 0 WHERE is_default = 1 AND alias != ?", (alias,))
+        cur.execute("UPDATE flashmail_cards SET is_default = 1 WHERE alias = ? AND is_default = 0", (alias,))
     return True
 
 
+_UPDATE_CARD_BALANCE_SQL = """
+    UPDATE flashmail_cards
+    SET last_known_balance = ?,
+        last_checked_at = COALESCE(?, datetime('now'))
+    WHERE alias = ?
+"""
+
+
 def update_flashmail_card_balance(alias: str, balance: int, checked_at: Optional[str] = None) -> bool:
     if not alias:
         return False
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        UPDATE flashmail_cards
-        SET last_known_balance = ?,
-            last_checked_at = COALESCE(?, datetime('now'))
-        WHERE alias = ?
-        """,
-        (int(balance), checked_at, alias),
-    )
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        conn.execute(_UPDATE_CARD_BALANCE_SQL, (int(balance), checked_at, alias))
     return True
 
 
+def update_flashmail_balances_bulk(items: List[Tuple[str, int, Optional[str]]]) -> int:
+    """Records several card balances in one transaction.
+
+    Args:
+        items: (alias, balance, checked_at) tuples; a None checked_at means now
+
+    Returns:
+        Number of card rows updated
+    """
+    rows = [(int(balance), checked_at, alias) for alias, balance, checked_at in items if alias]
+    if not rows:
+        return 0
+    with _connect() as conn:
+        return conn.executemany(_UPDATE_CARD_BALANCE_SQL, rows).rowcount
+
+
 def remove_flashmail_card(alias: str) -> bool:
     if not alias:
         return False
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM flashmail_cards WHERE alias = ?", (alias,))
-    conn.commit()
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM flashmail_cards WHERE alias = ?", (alias,))
     return True
 
 
@@ -701,94 +998,91 @@ def save_registration(
 ) -> int:
     if not service or not mailbox_email:
         return 0
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO registrations(
-            service, website_url, mailbox_email, service_username, service_password,
-            status, error, cookies_json, storage_state_json, user_agent, profile_dir,
-            debug_dir, artifacts_json, updated_at
-        ) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?, datetime('now'))
-        """,
-        (
-            service,
-            website_url,
-            mailbox_email,
-            service_username,
-            service_password,
-            status,
-            error,
-            cookies_json,
-            storage_state_json,
-            user_agent,
-            profile_dir,
-            debug_dir,
-            artifacts_json,
-        ),
-    )
-    conn.commit()
-    rid = cur.lastrowid
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO registrations(
+                service, website_url, mailbox_email, service_username, service_password,
+                status, error, cookies_json, storage_state_json, user_agent, profile_dir,
+                debug_dir, artifacts_json, updated_at
+            ) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?, datetime('now'))
+            """,
+            (
+                service,
+                website_url,
+                mailbox_email,
+                service_username,
+                service_password,
+                status,
+                error,
+                cookies_json,
+                storage_state_json,
+                user_agent,
+                profile_dir,
+                debug_dir,
+                artifacts_json,
+            ),
+        )
+        rid = cur.lastrowid
     return int(rid)
 
 
 def update_registration_status(registration_id: int, status: str, error: str | None = None) -> bool:
     if not registration_id or not status:
         return False
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        UPDATE registrations
-        SET status = ?, error = COALESCE(?, error), updated_at = datetime('now')
-        WHERE id = ?
-        """,
-        (status, error, registration_id),
-    )
-    conn.commit()
-    ok = cur.rowcount > 0
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE registrations
+            SET status = ?, error = COALESCE(?, error), updated_at = datetime('now')
+            WHERE id = ?
+            """,
+            (status, error, registration_id),
+        )
+        ok = cur.rowcount > 0
     return ok
 
 
+def _list_registrations_raw(service: str | None = None, mailbox_email: str | None = None) -> List[sqlite3.Row]:
+    with _connect() as conn:
+        cur = conn.cursor()
+        q = "SELECT id, service, website_url, mailbox_email, service_username, status, created_at, updated_at FROM registrations"
+        params: list[Any] = []
+        wh: list[str] = []
+        if service:
+            wh.append("service = ?")
+            params.append(service)
+        if mailbox_email:
+            wh.append("mailbox_email = ?")
+            params.append(mailbox_email)
+        if wh:
+            q += " WHERE " + " AND ".join(wh)
+        q += " ORDER BY created_at DESC"
+        cur.execute(q, params)
+        return cur.fetchall()
+
+
 def list_registrations(service: str | None = None, mailbox_email: str | None = None) -> List[Dict[str, Any]]:
-    conn = _connect()
-    cur = conn.cursor()
-    q = "SELECT id, service, website_url, mailbox_email, service_username, status, created_at, updated_at FROM registrations"
-    params: list[Any] = []
-    wh: list[str] = []
-    if service:
-        wh.append("service = ?")
-        params.append(service)
-    if mailbox_email:
-        wh.append("mailbox_email = ?")
-        params.append(mailbox_email)
-    if wh:
-        q += " WHERE " + " AND ".join(wh)
-    q += " ORDER BY created_at DESC"
-    cur.execute(q, params)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    return [dict(r) for r in _list_registrations_raw(service, mailbox_email)]
 
 
 def get_registration(service: str, mailbox_email: str) -> Optional[Dict[str, Any]]:
     if not service or not mailbox_email:
         return None
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT * FROM registrations
-        WHERE service = ? AND mailbox_email = ?
-        ORDER BY created_at DESC
-        LIMIT 1
-        """,
-        (service, mailbox_email),
-    )
-    row = cur.fetchone()
-    conn.close()
+    with _connect() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT * FROM registrations
+            WHERE service = ? AND mailbox_email = ?
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (service, mailbox_email),
+        )
+        row = cur.fetchone()
     return dict(row) if row else None
 
 # --- Event logging (appended) ---
@@ -2,6 +2,10 @@ from __future__ import annotations
 import json, sqlite3
 from pathlib import Path
 
+_INSERT_EVENT_SQL = 'INSERT INTO event_log(event_type,status,service,details_json) VALUES(?,?,?,?)'
+# Built once; compact separators and raw UTF-8 keep details_json small
+_JSON = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
 def _db_path() -> str:
     try:
         from servbot.data import database as db  # type: ignore
@@ -10,30 +14,61 @@ def _db_path() -> str:
         return str(Path(__file__).resolve().parent/'data'/'servbot.db')
 
 def _connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(_db_path())
-    conn.row_factory = sqlite3.Row
-    return conn
+    try:
+        from servbot.data import database as db  # type: ignore
+        return db._connect()  # shared per-thread connection
+    except ImportError:
+        conn = sqlite3.connect(_db_path())
+        conn.row_factory = sqlite3.Row
+        return conn
 
 def _ensure(conn: sqlite3.Connection) -> None:
-    c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS event_log (id INTEGER PRIMARY KEY AUTOINCREMENT, event_type TEXT, status TEXT, service TEXT, details_json TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP)')
-    conn.commit()
+    if getattr(conn, '_event_log_ready', False):
+        return  # already checked on this (cached) connection
+    try:
+        from servbot.data import database as db  # type: ignore
+    except ImportError:
+        db = None
+    if db is not None and isinstance(conn, db._SharedConnection):
+        db.init_db()  # event_log is part of the main schema; a PRAGMA read when current
+    else:
+        c = conn.cursor()
+        c.execute('CREATE TABLE IF NOT EXISTS event_log (id INTEGER PRIMARY KEY AUTOINCREMENT, event_type TEXT, status TEXT, service TEXT, details_json TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_event_log_type ON event_log(event_type)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_event_log_status ON event_log(status)')
+        conn.commit()
+    try:
+        conn._event_log_ready = True  # type: ignore[attr-defined]
+    except AttributeError:
+        pass  # plain sqlite3.Connection (fallback path) has no __dict__
 
 def log_event(event_type: str, status: str = 'info', *, service: str = '', details: dict | None = None) -> int:
     if not event_type:
         return 0
-    conn = _connect(); _ensure(conn)
-    c = conn.cursor()
-    c.execute('INSERT INTO event_log(event_type,status,service,details_json) VALUES(?,?,?,?)', (event_type, status, service, json.dumps(details or {})))
-    conn.commit(); i = c.lastrowid; conn.close(); return int(i)
+    with _connect() as conn:
+        _ensure(conn)
+        c = conn.cursor()
+        c.execute(_INSERT_EVENT_SQL, (event_type, status, service, _JSON(details) if details else '{}'))
+        return int(c.lastrowid)
+
+def _get_recent_events_raw(limit: int = 50) -> list[sqlite3.Row]:
+    # sqlite3.Row supports r['col'] directly; skip the per-row dict copy
+    with _connect() as conn:
+        _ensure(conn)
+        c = conn.cursor(); c.execute('SELECT * FROM event_log ORDER BY created_at DESC, id DESC LIMIT ?', (int(limit),))
+        return c.fetchall()
 
 def get_recent_events(limit: int = 50) -> list[dict]:
-    conn = _connect(); _ensure(conn)
-    c = conn.cursor(); c.execute('SELECT * FROM event_log ORDER BY created_at DESC, id DESC LIMIT ?', (int(limit),))
-    rows = [dict(r) for r in c.fetchall()]; conn.close(); return rows
+    return [dict(r) for r in _get_recent_events_raw(limit)]
 
 def get_event_stats() -> dict:
-    conn = _connect(); _ensure(conn)
-    c = conn.cursor(); c.execute('SELECT event_type, COUNT(*) FROM event_log GROUP BY event_type'); by_type = dict(c.fetchall())
-    c.execute('SELECT status, COUNT(*) FROM event_log GROUP BY status'); by_status = dict(c.fetchall()); conn.close()
-    return {'by_type': {k:int(v) for k,v in by_type.items()}, 'by_status': {k:int(v) for k,v in by_status.items()}}
+    # One statement; each branch is answered from its column's index
+    with _connect() as conn:
+        _ensure(conn)
+        rows = conn.execute(
+            "SELECT 't', event_type, COUNT(*) FROM event_log GROUP BY event_type "
+            "UNION ALL SELECT 's', status, COUNT(*) FROM event_log GROUP BY status"
+        ).fetchall()
+    by_type = {v: int(n) for k, v, n in rows if k == 't'}
+    by_status = {v: int(n) for k, v, n in rows if k == 's'}
+    return {'by_type': by_type, 'by_status': by_status}
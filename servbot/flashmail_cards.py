@@ -5,7 +5,9 @@ storage and the database.flashmail_cards table for metadata (no secrets).
 """
 from __future__ import annotations
 
+import concurrent.futures
 import datetime as dt
+import os
 from typing import Optional, Dict, List
 
 from .secure_store import (
@@ -20,11 +22,20 @@ from .data.database import (
     ensure_db,
     add_flashmail_card as db_add_card,
     list_flashmail_cards as db_list_cards,
+    get_flashmail_cards_for_pick as db_cards_for_pick,
     set_default_flashmail_card as db_set_default,
     update_flashmail_card_balance as db_update_balance,
+    update_flashmail_balances_bulk as db_update_balances_bulk,
     remove_flashmail_card as db_remove_card,
 )
 
+# Concurrent balance requests made by pick_card()
+BALANCE_REFRESH_WORKERS = 8
+
+# A stored balance younger than this is trusted by pick_card() without a
+# new API request (when it already covers the required credits)
+BALANCE_TTL_SECONDS = int(os.getenv("SERVBOT_BALANCE_TTL_SECONDS", "60"))
+
 
 def register_card(alias: str, card_value: str, set_default: bool = False) -> bool:
     """Register a Flashmail card under an alias and persist metadata.
@@ -69,12 +80,24 @@ def get_client_by_alias(alias: str) -> Optional[FlashmailClient]:
     return FlashmailClient(secret)
 
 
-def update_balance(alias: str) -> Optional[int]:
+def _fetch_balance(alias: str) -> Optional[int]:
+    """Queries the card's balance without touching the database."""
     client = get_client_by_alias(alias)
     if not client:
         return None
-    bal = client.get_balance()
-    db_update_balance(alias, bal, dt.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"))
+    return client.get_balance()
+
+
+def _checked_at() -> str:
+    # Same text as strftime("%Y-%m-%dT%H:%M:%SZ") without the strftime call
+    return dt.datetime.utcnow().isoformat(timespec="seconds") + "Z"
+
+
+def update_balance(alias: str) -> Optional[int]:
+    bal = _fetch_balance(alias)
+    if bal is None:
+        return None
+    db_update_balance(alias, bal, _checked_at())
     return bal
 
 
@@ -82,12 +105,17 @@ def pick_card(min_required_credits: int = 1) -> Optional[str]:
     """Pick the best card alias that meets the required credits.
 
     Strategy:
-    - Prefer default alias if it has sufficient credits (if known)
-    - Otherwise update balances for all and pick the one with enough credits
-      with maximum balance; tie-breaker: default, then alias name
+    - Prefer default alias if its recently checked balance is sufficient
+    - Otherwise take the best recently checked card that is sufficient
+      (max balance; tie-breaker: default, then alias name)
+    - Otherwise refresh the remaining balances concurrently and return the
+      first card that reports enough credits; if none does, return the
+      default (or first) alias
     """
     ensure_db()
-    cards = db_list_cards()
+    # Recent, too-small balances are already filtered out in SQL; cards[0]
+    # is the fallback (default, else first alias)
+    cards = db_cards_for_pick(min_required_credits, BALANCE_TTL_SECONDS)
     if not cards:
         return None
 
@@ -97,16 +125,42 @@ def pick_card(min_required_credits: int = 1) -> Optional[str]:
         if c.get("is_default"):
             default_alias = c["alias"]
             bal = int(c.get("last_known_balance") or 0)
-            if bal >= min_required_credits:
+            if bal >= min_required_credits and c.get("is_fresh"):
                 return default_alias
             break
 
-    # Refresh balances
     with_balances = []
+    stale = []
     for c in cards:
-        alias = c["alias"]
-        bal = update_balance(alias)
-        with_balances.append((alias, bal or 0, bool(c.get("is_default"))))
+        bal = int(c.get("last_known_balance") or 0)
+        if not c.get("is_fresh"):
+            stale.append(c)
+        elif bal >= min_required_credits:
+            with_balances.append((c["alias"], bal, bool(c.get("is_default"))))
+
+    if stale and not with_balances:
+        # Refresh concurrently; the default is submitted first for a head
+        # start, and the first sufficient card ends the search
+        stale.sort(key=lambda c: not c.get("is_default"))
+        checked_at = _checked_at()
+        fetched = []
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(BALANCE_REFRESH_WORKERS, len(stale)), thread_name_prefix="flashmail-balance"
+        )
+        try:
+            futures = {executor.submit(_fetch_balance, c["alias"]): c for c in stale}
+            for future in concurrent.futures.as_completed(futures):
+                c = futures[future]
+                bal = future.result()
+                if bal is None:
+                    continue
+                fetched.append((c["alias"], bal, checked_at))
+                if bal >= min_required_credits:
+                    return c["alias"]
+                with_balances.append((c["alias"], bal, bool(c.get("is_default"))))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            db_update_balances_bulk(fetched)
 
     # Filter by requirement
     candidates = [x for x in with_balances if x[1] >= min_required_credits]
@@ -114,6 +168,6 @@ def pick_card(min_required_credits: int = 1) -> Optional[str]:
         # If none meet requirement, still return default or the first
         return default_alias or (cards[0]["alias"])  # type: ignore
 
-    # Sort: max balance desc, default first, alias asc
-    candidates.sort(key=lambda x: (-x[1], not x[2], x[0]))
-    return candidates[0][0]
+    # Best by max balance, then default first, then alias asc; only the
+    # winner is needed, so take the min of precomputed keys instead of sorting
+    return min((-bal, not is_default, alias) for alias, bal, is_default in candidates)[2]
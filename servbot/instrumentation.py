@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import functools
+import os
+
 try:
     from . import event_logger as elog
 except Exception:
     elog = None  # type: ignore
 
+# Decided once at import. When off, nothing is patched, so instrumented calls
+# run the original functions with no wrapper overhead at all.
+_ENABLED = (
+    elog is not None
+    and getattr(elog, 'log_event', None) is not None
+    and os.environ.get('SERVBOT_DISABLE_EVENT_LOG') != '1'
+)
+
 def _safe_log(event_type: str, status: str = 'info', **details):
-    if elog is None:
+    if not _ENABLED:
         return
     try:
         service = details.pop('service', 'app')
@@ -14,144 +25,173 @@ def _safe_log(event_type: str, status: str = 'info', **details):
     except Exception:
         pass
 
-def _patch_database():
-    try:
-        from .data import database as db
-    except Exception:
-        return
+def _instrument(orig, event_type: str, on_success, on_error):
+    """Wraps ``orig`` so each call logs one ``event_type`` event.
 
-    # upsert_account
-    orig_upsert = db.upsert_account
-    def upsert_wrapper(*args, **kwargs):
-        email = kwargs.get('email') if isinstance(kwargs, dict) else None
-        source = kwargs.get('source') if isinstance(kwargs, dict) else None
-        acc_type = kwargs.get('type') if isinstance(kwargs, dict) else None
-        try:
-            acc_id = orig_upsert(*args, **kwargs)
-            if email:
-                if not acc_type:
-                    try:
-                        acc_type_local = db.infer_type_from_email(email)
-                    except Exception:
-                        acc_type_local = None
-                else:
-                    acc_type_local = acc_type
-                _safe_log('account_upsert', 'success', service='db', email=email, source=source or '', type=acc_type_local, account_id=acc_id)
-            return acc_id
-        except Exception as e:
-            if email:
-                _safe_log('account_upsert', 'error', service='db', email=email, source=source or '', error=str(e))
-            raise
-    db.upsert_account = upsert_wrapper
+    ``on_success(args, kwargs, result)`` returns ``(status, details)`` or None
+    to log nothing; ``on_error(args, kwargs, exc)`` returns the details of the
+    'error' event (or None). Exceptions from ``orig`` are re-raised; problems
+    building the event are ignored so logging never breaks the wrapped call.
+    Already-instrumented functions are returned unchanged, so re-importing or
+    reloading this module never stacks wrappers.
+    """
+    if getattr(orig, '_servbot_instrumented', False):
+        return orig
 
-    # save_message
-    orig_save_msg = db.save_message
-    def save_message_wrapper(*args, **kwargs):
+    @functools.wraps(orig)
+    def wrapper(*args, **kwargs):
         try:
-            mid = orig_save_msg(*args, **kwargs)
-            mailbox = kwargs.get('mailbox')
-            provider = kwargs.get('provider')
-            provider_msg_id = kwargs.get('provider_msg_id')
-            if mailbox and provider and provider_msg_id:
-                _safe_log('message_save', 'success', service=str(provider), mailbox=str(mailbox), provider_msg_id=str(provider_msg_id), message_id=mid)
-            return mid
+            result = orig(*args, **kwargs)
         except Exception as e:
-            mailbox = kwargs.get('mailbox')
-            provider = kwargs.get('provider')
-            _safe_log('message_save', 'error', service=str(provider or 'mail'), mailbox=str(mailbox or ''), error=str(e))
+            try:
+                details = on_error(args, kwargs, e)
+            except Exception:
+                details = None
+            if details is not None:
+                _safe_log(event_type, 'error', **details)
             raise
-    db.save_message = save_message_wrapper
-
-    # save_verification
-    orig_save_ver = db.save_verification
-    def save_verification_wrapper(*args, **kwargs):
         try:
-            vid = orig_save_ver(*args, **kwargs)
-            svc = kwargs.get('service')
-            message_id = kwargs.get('message_id')
-            value = kwargs.get('value')
-            is_link = bool(kwargs.get('is_link'))
-            _safe_log('verification_extract', 'success', service=str(svc or 'parser'), message_id=int(message_id or 0), value=str(value or ''), is_link=is_link, verification_id=vid)
-            return vid
-        except Exception as e:
-            svc = kwargs.get('service')
-            _safe_log('verification_extract', 'error', service=str(svc or 'parser'), error=str(e))
-            raise
-    db.save_verification = save_verification_wrapper
+            entry = on_success(args, kwargs, result)
+        except Exception:
+            entry = None
+        if entry is not None:
+            _safe_log(event_type, entry[0], **entry[1])
+        return result
+    wrapper._servbot_instrumented = True
+    return wrapper
 
-    # save_registration
-    orig_save_reg = db.save_registration
-    def save_registration_wrapper(*args, **kwargs):
-        try:
-            rid = orig_save_reg(*args, **kwargs)
-            svc = kwargs.get('service')
-            mailbox = kwargs.get('mailbox_email')
-            status = kwargs.get('status', 'success')
-            _safe_log('registration', str(status or 'success'), service=str(svc or 'automation'), mailbox=str(mailbox or ''), registration_id=rid)
-            return rid
-        except Exception as e:
-            svc = kwargs.get('service')
-            mailbox = kwargs.get('mailbox_email')
-            _safe_log('registration', 'error', service=str(svc or 'automation'), mailbox=str(mailbox or ''), error=str(e))
-            raise
-    db.save_registration = save_registration_wrapper
 
-    # update_registration_status
-    orig_update_reg = db.update_registration_status
-    def update_registration_status_wrapper(*args, **kwargs):
+def _account_upsert_ok(args, kwargs, acc_id):
+    email = kwargs.get('email')
+    if not email:
+        return None
+    acc_type = kwargs.get('type')
+    if not acc_type:
         try:
-            ok = orig_update_reg(*args, **kwargs)
-            reg_id = kwargs.get('registration_id')
-            status = kwargs.get('status')
-            _safe_log('registration_update', str(status or ''), service='automation', registration_id=int(reg_id or 0), ok=bool(ok), error=str(kwargs.get('error') or ''))
-            return ok
-        except Exception as e:
-            _safe_log('registration_update', 'error', service='automation', error=str(e))
-            raise
-    db.update_registration_status = update_registration_status_wrapper
+            from .data import database as db
+            acc_type = db.infer_type_from_email(email)
+        except Exception:
+            acc_type = None
+    return 'success', dict(service='db', email=email, source=kwargs.get('source') or '', type=acc_type, account_id=acc_id)
+
+
+def _account_upsert_err(args, kwargs, e):
+    email = kwargs.get('email')
+    if not email:
+        return None
+    return dict(service='db', email=email, source=kwargs.get('source') or '', error=str(e))
+
+
+def _message_save_ok(args, kwargs, mid):
+    mailbox, provider, provider_msg_id = kwargs.get('mailbox'), kwargs.get('provider'), kwargs.get('provider_msg_id')
+    if not (mailbox and provider and provider_msg_id):
+        return None
+    return 'success', dict(service=str(provider), mailbox=str(mailbox), provider_msg_id=str(provider_msg_id), message_id=mid)
+
+
+def _message_save_err(args, kwargs, e):
+    return dict(service=str(kwargs.get('provider') or 'mail'), mailbox=str(kwargs.get('mailbox') or ''), error=str(e))
+
+
+def _verification_ok(args, kwargs, vid):
+    return 'success', dict(
+        service=str(kwargs.get('service') or 'parser'),
+        message_id=int(kwargs.get('message_id') or 0),
+        value=str(kwargs.get('value') or ''),
+        is_link=bool(kwargs.get('is_link')),
+        verification_id=vid,
+    )
+
+
+def _verification_err(args, kwargs, e):
+    return dict(service=str(kwargs.get('service') or 'parser'), error=str(e))
+
+
+def _registration_ok(args, kwargs, rid):
+    return str(kwargs.get('status', 'success') or 'success'), dict(
+        service=str(kwargs.get('service') or 'automation'),
+        mailbox=str(kwargs.get('mailbox_email') or ''),
+        registration_id=rid,
+    )
+
+
+def _registration_err(args, kwargs, e):
+    return dict(service=str(kwargs.get('service') or 'automation'), mailbox=str(kwargs.get('mailbox_email') or ''), error=str(e))
+
+
+def _registration_update_ok(args, kwargs, ok):
+    return str(kwargs.get('status') or ''), dict(
+        service='automation',
+        registration_id=int(kwargs.get('registration_id') or 0),
+        ok=bool(ok),
+        error=str(kwargs.get('error') or ''),
+    )
+
+
+def _registration_update_err(args, kwargs, e):
+    return dict(service='automation', error=str(e))
+
+
+def _email_fetch_ok(args, kwargs, msgs):
+    count = len(msgs) if hasattr(msgs, '__len__') else 0
+    return 'success', dict(service='graph', mailbox=getattr(args[0], 'mailbox', ''), fetched=count)
+
+
+def _email_fetch_err(args, kwargs, e):
+    return dict(service='graph', mailbox=getattr(args[0], 'mailbox', ''), error=str(e))
+
+
+def _provision_ok(args, kwargs, result):
+    email = result.get('email') if isinstance(result, dict) else None
+    return 'success', dict(service='flashmail', email=str(email or ''))
+
+
+def _provision_err(args, kwargs, e):
+    return dict(service='flashmail', error=str(e))
+
+
+# (function name, event type, success extractor, error extractor)
+_DATABASE_EVENTS = [
+    ('upsert_account', 'account_upsert', _account_upsert_ok, _account_upsert_err),
+    ('save_message', 'message_save', _message_save_ok, _message_save_err),
+    ('save_verification', 'verification_extract', _verification_ok, _verification_err),
+    ('save_registration', 'registration', _registration_ok, _registration_err),
+    ('update_registration_status', 'registration_update', _registration_update_ok, _registration_update_err),
+]
+
+
+def _patch_database():
+    if not _ENABLED:
+        return
+    try:
+        from .data import database as db
+    except Exception:
+        return
+    for name, event_type, on_success, on_error in _DATABASE_EVENTS:
+        setattr(db, name, _instrument(getattr(db, name), event_type, on_success, on_error))
 
 def _patch_graph_client():
+    if not _ENABLED:
+        return
     try:
         from .clients.graph import GraphClient
     except Exception:
         return
-    orig_fetch = GraphClient.fetch_messages
-    def fetch_messages_wrapper(self, *args, **kwargs):
-        try:
-            msgs = orig_fetch(self, *args, **kwargs)
-            try:
-                count = len(msgs) if hasattr(msgs, '__len__') else 0
-            except Exception:
-                count = 0
-            _safe_log('email_fetch', 'success', service='graph', mailbox=getattr(self, 'mailbox', ''), fetched=count)
-            return msgs
-        except Exception as e:
-            _safe_log('email_fetch', 'error', service='graph', mailbox=getattr(self, 'mailbox', ''), error=str(e))
-            raise
-    GraphClient.fetch_messages = fetch_messages_wrapper
+    GraphClient.fetch_messages = _instrument(GraphClient.fetch_messages, 'email_fetch', _email_fetch_ok, _email_fetch_err)
 
 # Apply patches on import
 _patch_database()
 _patch_graph_client()
 
 def _patch_api():
+    if not _ENABLED:
+        return
     try:
         from . import api
     except Exception:
         return
     if hasattr(api, 'provision_flashmail_account'):
-        orig = api.provision_flashmail_account
-        def provision_wrapper(*args, **kwargs):
-            try:
-                result = orig(*args, **kwargs)
-                try:
-                    email = (result or {}).get('email') if isinstance(result, dict) else None
-                except Exception:
-                    email = None
-                _safe_log('account_provision', 'success', service='flashmail', email=str(email or ''))
-                return result
-            except Exception as e:
-                _safe_log('account_provision', 'error', service='flashmail', error=str(e))
-                raise
-        api.provision_flashmail_account = provision_wrapper
+        api.provision_flashmail_account = _instrument(
+            api.provision_flashmail_account, 'account_provision', _provision_ok, _provision_err
+        )
 _patch_api()
@@ -2,7 +2,7 @@
 
 from .code_parser import parse_verification_codes, parse_verification_links
 from .service_parser import identify_service, canonical_service_name, services_equal
-from .email_parser import extract_text_from_message, html_to_text, parse_addresses
+from .email_parser import extract_text_from_message, html_to_text, fast_html_snippet, parse_addresses
 
 __all__ = [
     'parse_verification_codes',
@@ -12,6 +12,7 @@ __all__ = [
     'services_equal',
     'extract_text_from_message',
     'html_to_text',
+    'fast_html_snippet',
     'parse_addresses',
 ]
 
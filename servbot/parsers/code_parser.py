@@ -5,17 +5,38 @@ regex patterns with optional AI fallback.
 """
 
 import re
-from typing import List, Optional
+import threading
+from typing import List, Optional, Set
+
+try:
+    import requests as _requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    _requests = None  # type: ignore
+
+try:
+    # Optional: multi-pattern DFA used to skip regexes that cannot match
+    import hyperscan
+except ImportError:
+    hyperscan = None  # type: ignore
+
+try:
+    # Optional: one-pass keyword matching for verification links
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # type: ignore
 
 # URL extraction regex
 _LINK_REGEX = re.compile(r"https?://[\w\-._~:/?#\[\]@!$&'()*+,;=%]+", re.IGNORECASE)
 
-# OTP/verification code regex patterns (ordered by specificity)
+# Vendor-specific formats, matched in one scan: Google G-123456 and
+# Facebook FB-123456. The two never overlap, so splitting the matches by
+# branch reproduces separate per-vendor scans.
+_VENDOR_CODE_RE = re.compile(r"\b(?:G-?(?P<google>\d{6})|FB-?(?P<fb>\d{6}))\b", re.IGNORECASE)
+
+# OTP/verification code regex patterns (ordered by specificity), tried after
+# the vendor formats
 _CODE_PATTERNS = [
-    # Vendor-specific formats
-    re.compile(r"\bG-?(\d{6})\b", re.IGNORECASE),  # Google: G-123456
-    re.compile(r"\bFB-?(\d{6})\b", re.IGNORECASE),  # Facebook: FB-123456
-    
     # Generic labeled codes
     re.compile(
         r"\b(?:code|otp|pass(?:code|word)?|verification|auth(?:entication)?|security)[:\s-]*((?!code\b)[A-Z0-9]{4,10})\b",
@@ -32,6 +53,178 @@ _CODE_PATTERNS = [
     re.compile(r"(?<![$€£#])\b(\d{6})\b(?!\s*(?:USD|EUR|CAD|GBP|\$))"),
 ]
 
+# Request headers for visit_verification_link
+_UA_HEADERS = {"User-Agent": "Mozilla/5.0 (Servbot)"}
+
+# Keep-alive session for visit_verification_link, created on first use:
+# magic-link flows often bounce through the same one or two hosts
+_LINK_SESSION = None
+_LINK_SESSION_LOCK = threading.Lock()
+
+
+def _link_session():
+    global _LINK_SESSION
+    if _LINK_SESSION is None:
+        with _LINK_SESSION_LOCK:
+            if _LINK_SESSION is None:
+                session = _requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _LINK_SESSION = session
+    return _LINK_SESSION
+
+# Keywords indicating verification links
+_LINK_INCLUDE_KEYWORDS = (
+    "verify", "verification", "confirm", "activate", "activation",
+    "validate", "validation", "magic", "login", "signin", "sign-in",
+    "confirm-email", "email-confirm", "account/confirm", "account/verify",
+)
+
+# Keywords indicating non-verification links
+_LINK_EXCLUDE_KEYWORDS = (
+    "unsubscribe", "preferences", "privacy", "terms", "help", "support",
+    "facebook.com/l.php",  # Tracking redirectors
+)
+
+_SUBJECT_HINT_KEYWORDS = ("verify", "verification", "confirm", "activate")
+
+# One search per URL instead of one substring test per keyword (fallback
+# when pyahocorasick is missing); matched against lowercased text
+_LINK_INCLUDE_RE = re.compile("|".join(map(re.escape, _LINK_INCLUDE_KEYWORDS)))
+_LINK_EXCLUDE_RE = re.compile("|".join(map(re.escape, _LINK_EXCLUDE_KEYWORDS)))
+_SUBJECT_HINT_RE = re.compile("|".join(map(re.escape, _SUBJECT_HINT_KEYWORDS)))
+
+
+def _build_link_automaton():
+    """Aho-Corasick automaton over both link keyword lists (value: is_exclude)."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for kw in _LINK_INCLUDE_KEYWORDS:
+        automaton.add_word(kw, False)
+    for kw in _LINK_EXCLUDE_KEYWORDS:
+        automaton.add_word(kw, True)
+    automaton.make_automaton()
+    return automaton
+
+
+_LINK_AUTOMATON = _build_link_automaton()
+
+
+def _link_keywords(url_lower: str) -> Optional[bool]:
+    """Classifies a lowercased URL by keyword.
+
+    Returns:
+        None if it has an exclude keyword, else whether it has an include one
+    """
+    if _LINK_AUTOMATON is not None:
+        # Single pass reporting both keyword sets
+        included = False
+        for _, is_exclude in _LINK_AUTOMATON.iter(url_lower):
+            if is_exclude:
+                return None
+            included = True
+        return included
+    if _LINK_EXCLUDE_RE.search(url_lower):
+        return None
+    return bool(_LINK_INCLUDE_RE.search(url_lower))
+
+
+# Hyperscan prefilter over [_VENDOR_CODE_RE, *_CODE_PATTERNS]; built on first
+# use, False when unavailable or the patterns fail to compile
+_HS_DB = None
+_HS_LOCK = threading.Lock()  # the database's scratch space is not thread-safe
+
+
+def _hs_database():
+    global _HS_DB
+    if _HS_DB is None:
+        patterns = [_VENDOR_CODE_RE, *_CODE_PATTERNS]
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                # Capture names mean nothing to Hyperscan; only match/no-match is used
+                expressions=[re.sub(r"\(\?P<\w+>", "(", p.pattern).encode("utf-8") for p in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                # PREFILTER turns lookarounds into a superset match, which is
+                # fine: a hit only means "run the real regex"
+                flags=[
+                    hyperscan.HS_FLAG_PREFILTER
+                    | hyperscan.HS_FLAG_SINGLEMATCH
+                    | (hyperscan.HS_FLAG_CASELESS if p.flags & re.IGNORECASE else 0)
+                    for p in patterns
+                ],
+            )
+            _HS_DB = db
+        except Exception:
+            _HS_DB = False
+    return _HS_DB
+
+
+def _candidate_patterns(text: str) -> Optional[Set[int]]:
+    """Indexes into [_VENDOR_CODE_RE, *_CODE_PATTERNS] that may match ``text``.
+
+    One Hyperscan pass replaces up to five ``re`` scans for text that has
+    nothing to extract. Only ASCII text is prefiltered; there Hyperscan's
+    digit and word-boundary classes agree with ``re``'s Unicode ones.
+
+    Returns:
+        Set of pattern indexes (a superset of the real matches), or None when
+        every pattern should be tried
+    """
+    if hyperscan is None or not text.isascii():
+        return None
+    db = _hs_database()
+    if not db:
+        return None
+    hits: Set[int] = set()
+
+    def on_match(pattern_id, start, end, flags, context):
+        hits.add(pattern_id)
+
+    with _HS_LOCK:
+        db.scan(text.encode("ascii"), match_event_handler=on_match)
+    return hits
+
+
+# parse_verification_codes() scans at most this many leading characters
+# first and only falls back to the whole text when they hold no code
+CODE_SCAN_HEAD_CHARS = 2048
+
+# Single-letter vendor prefix on a 6-digit code (G-123456 -> 123456)
+_VENDOR_PREFIX_FULL = re.compile(r"^[A-Z]-?\d{6}$", re.IGNORECASE)
+_VENDOR_PREFIX_STRIP = re.compile(r"^[A-Z]-?", re.IGNORECASE)
+
+
+def _scan_codes(text: str) -> List[str]:
+    """Runs the code patterns over ``text``; matches in priority order, with duplicates."""
+    candidates = _candidate_patterns(text)
+    
+    # Vendor formats first (all Google codes, then all Facebook codes)
+    google: List[str] = []
+    facebook: List[str] = []
+    if candidates is None or 0 in candidates:
+        for m in _VENDOR_CODE_RE.finditer(text):
+            (google if m.lastgroup == "google" else facebook).append(m.group(m.lastgroup))
+    found: List[str] = google + facebook
+    
+    # Try regex patterns
+    for index, pattern in enumerate(_CODE_PATTERNS, 1):
+        if candidates is not None and index not in candidates:
+            continue
+        for match in pattern.findall(text):
+            code = match if isinstance(match, str) else match[0]
+            
+            # Normalize vendor prefixes (G-123456 -> 123456)
+            if _VENDOR_PREFIX_FULL.match(code):
+                code = _VENDOR_PREFIX_STRIP.sub("", code)
+            
+            found.append(code)
+    
+    return found
+
 
 def parse_verification_codes(
     text: str,
@@ -39,6 +232,7 @@ def parse_verification_codes(
     email_body: str = "",
     from_addr: str = "",
     use_ai_fallback: bool = True,
+    ai_override: bool = False,
 ) -> List[str]:
     """Extracts verification/OTP codes from text.
     
@@ -50,6 +244,8 @@ def parse_verification_codes(
         email_body: Full email body (for AI fallback)
         from_addr: Sender address (for AI fallback)
         use_ai_fallback: Whether to use AI if regex fails
+        ai_override: Ask the AI parsers even when regex already found a
+            6-digit code (they may then add a further candidate)
         
     Returns:
         List of unique codes found, preserving order
@@ -58,17 +254,14 @@ def parse_verification_codes(
         return []
     
     found: List[str] = []
-    
-    # Try regex patterns
-    for pattern in _CODE_PATTERNS:
-        for match in pattern.findall(text):
-            code = match if isinstance(match, str) else match[0]
-            
-            # Normalize vendor prefixes (G-123456 -> 123456)
-            if re.match(r"^[A-Z]-?\d{6}$", code, re.IGNORECASE):
-                code = re.sub(r"^[A-Z]-?", "", code)
-            
-            found.append(code)
+    if len(text) > CODE_SCAN_HEAD_CHARS:
+        # Codes sit near the top of real emails; scan the head first (cut at
+        # a line break so no code is split) and the full text only on a miss
+        cut = text.rfind("\n", 0, CODE_SCAN_HEAD_CHARS)
+        if cut > 0:
+            found = _scan_codes(text[:cut])
+    if not found:
+        found = _scan_codes(text)
     
     # Deduplicate while preserving order
     seen = set()
@@ -78,8 +271,10 @@ def parse_verification_codes(
             seen.add(code)
             unique.append(code)
     
-    # AI fallback and Groq enhancement
-    if use_ai_fallback and email_subject and from_addr:
+    # AI fallback and Groq enhancement. A leading 6-digit regex code is
+    # trusted as-is; both AI calls are network round-trips.
+    confident = bool(unique) and unique[0].isdigit() and len(unique[0]) == 6
+    if use_ai_fallback and email_subject and from_addr and (ai_override or not confident):
         ai_code: Optional[str] = None
         try:
             from .ai_parser import extract_with_ai
@@ -100,7 +295,7 @@ def parse_verification_codes(
             pass
         if ai_code:
             # Prefer AI if our first candidate isn't 6-digit
-            if not unique or not (unique[0].isdigit() and len(unique[0]) == 6):
+            if not confident:
                 unique.insert(0, ai_code)
             elif ai_code not in unique:
                 unique.append(ai_code)
@@ -128,44 +323,21 @@ def parse_verification_links(text: str, email_subject: str = "") -> List[str]:
     if not candidates:
         return []
     
-    subject_lower = (email_subject or "").lower()
-    
-    # Keywords indicating verification links
-    include_keywords = [
-        "verify", "verification", "confirm", "activate", "activation",
-        "validate", "validation", "magic", "login", "signin", "sign-in",
-        "confirm-email", "email-confirm", "account/confirm", "account/verify",
-    ]
-    
-    # Keywords indicating non-verification links
-    exclude_keywords = [
-        "unsubscribe", "preferences", "privacy", "terms", "help", "support",
-        "facebook.com/l.php",  # Tracking redirectors
-    ]
+    # Subject hint is the same for every URL, so it is evaluated once
+    subject_hint = bool(_SUBJECT_HINT_RE.search((email_subject or "").lower()))
     
-    def _is_verification_link(url: str) -> bool:
-        """Checks if URL is likely a verification link."""
-        url_lower = url.lower()
-        
-        # Exclude unwanted links
-        if any(kw in url_lower for kw in exclude_keywords):
-            return False
-        
-        # Include if URL contains verification keywords
-        if any(kw in url_lower for kw in include_keywords):
-            return True
-        
-        # Include if subject hints at verification
-        if any(kw in subject_lower for kw in ["verify", "verification", "confirm", "activate"]):
-            return True
-        
-        return False
-    
-    # Filter and deduplicate
+    # Filter and deduplicate. A URL is kept unless it matches an exclude
+    # keyword, and then only if it has a verification keyword or the subject
+    # hints at verification.
     seen = set()
     filtered: List[str] = []
     for url in candidates:
-        if url not in seen and _is_verification_link(url):
+        if url in seen:
+            continue
+        has_include = _link_keywords(url.lower())
+        if has_include is None:
+            continue
+        if subject_hint or has_include:
             seen.add(url)
             filtered.append(url)
     
@@ -184,18 +356,13 @@ def visit_verification_link(url: str, timeout: int = 20) -> bool:
     """
     try:
         # Try requests library first
-        try:
-            import requests  # type: ignore
-            headers = {"User-Agent": "Mozilla/5.0 (Servbot)"}
-            response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
+        if _requests is not None:
+            response = _link_session().get(url, headers=_UA_HEADERS, timeout=timeout, allow_redirects=True)
             return 200 <= response.status_code < 400
-        except ImportError:
-            pass
         
         # Fallback to urllib
         import urllib.request
-        headers = {"User-Agent": "Mozilla/5.0 (Servbot)"}
-        req = urllib.request.Request(url, headers=headers, method="GET")
+        req = urllib.request.Request(url, headers=_UA_HEADERS, method="GET")
         with urllib.request.urlopen(req, timeout=timeout) as resp:  # type: ignore
             status = getattr(resp, "status", 200)
             return 200 <= status < 400
@@ -6,12 +6,23 @@ Provides functions to parse email messages and extract text content.
 import email
 import email.message
 import email.utils
+import html as html_lib
 import re
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from ..constants import MAX_HTML_BODY_BYTES
 
 # HTML parsing regexes
 _TAG_RE = re.compile(r"<[^>]+>")
 _WS_RE = re.compile(r"[\t\x0b\x0c\r]+")
+_SCRIPT_RE = re.compile(r"<script[\s\S]*?</script>", re.IGNORECASE)
+_STYLE_RE = re.compile(r"<style[\s\S]*?</style>", re.IGNORECASE)
+_ENTITY_RE = re.compile(r"&(nbsp|amp|lt|gt|quot);")
+_ENTITIES = {"nbsp": " ", "amp": "&", "lt": "<", "gt": ">", "quot": '"'}
+_ALL_WS_RE = re.compile(r"\s+")
+
+# Single-pass strip for fast_html_snippet: script/style blocks or any tag
+_SNIPPET_TAG_RE = re.compile(r"<(script|style)[^>]*>.*?</\1>|<[^>]+>", re.S | re.I)
 
 
 def html_to_text(html: str) -> str:
@@ -30,26 +41,53 @@ def html_to_text(html: str) -> str:
         return ""
     
     # Remove script and style tags
-    html = re.sub(r"<script[\s\S]*?</script>", " ", html, flags=re.IGNORECASE)
-    html = re.sub(r"<style[\s\S]*?</style>", " ", html, flags=re.IGNORECASE)
+    html = _SCRIPT_RE.sub(" ", html)
+    html = _STYLE_RE.sub(" ", html)
     
     # Remove HTML tags
     text = _TAG_RE.sub(" ", html)
     
     # Decode HTML entities
-    text = re.sub(r"&nbsp;", " ", text)
-    text = re.sub(r"&amp;", "&", text)
-    text = re.sub(r"&lt;", "<", text)
-    text = re.sub(r"&gt;", ">", text)
-    text = re.sub(r"&quot;", '"', text)
+    text = _ENTITY_RE.sub(lambda m: _ENTITIES[m.group(1)], text)
     
     # Normalize whitespace
     text = _WS_RE.sub(" ", text)
-    text = re.sub(r'\s+', ' ', text)
+    text = _ALL_WS_RE.sub(" ", text)
     
     return text.strip()
 
 
+def fast_html_snippet(
+    html: str,
+    max_len: Optional[int] = 2000,
+    max_bytes: Optional[int] = MAX_HTML_BODY_BYTES,
+) -> str:
+    """Extracts a plain-text snippet from HTML in a single regex pass.
+    
+    Cheaper than html_to_text for hot loops: script/style blocks and tags are
+    stripped together, all HTML entities are decoded with html.unescape and
+    whitespace is collapsed once.
+    
+    Args:
+        html: HTML string to convert
+        max_len: Maximum snippet length in characters (None for no cap)
+        max_bytes: Input is truncated to this many characters before parsing,
+            bounding time and memory on oversized bodies (None for no cap)
+        
+    Returns:
+        Plain text snippet
+    """
+    if not html:
+        return ""
+    if max_bytes is not None and len(html) > max_bytes:
+        html = html[:max_bytes]
+    text = html_lib.unescape(_SNIPPET_TAG_RE.sub(" ", html))
+    text = _ALL_WS_RE.sub(" ", text).strip()
+    if max_len is not None:
+        text = text[:max_len]
+    return text
+
+
 def parse_addresses(addr_header: str) -> List[str]:
     """Parses email addresses from header field.
     
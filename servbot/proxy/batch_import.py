@@ -3,16 +3,75 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import List, Dict, Optional
+import string
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass
 
+from .database import ProxyDatabase
 from .models import ProxyEndpoint, ProviderConfig, ProxyType, IPVersion, RotationType
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # type: ignore
+
 
 logger = logging.getLogger(__name__)
 
+# Lines per worker task when import_from_list runs with workers > 1
+IMPORT_CHUNK_SIZE = 5000
+
+# Credential markers used by MooProxy-style passwords (password_country-XX_session-ID)
+_SESSION_MARKER = "_session-"
+_COUNTRY_MARKER = "_country-"
+_SESSION_ID_CHARS = frozenset(string.ascii_letters + string.digits + "_-")
+
+# Well-formed user[:pass]@host:port and host:port lines (after the scheme is
+# removed); host:port:user:pass is split directly in parse_proxy_string
+_PROXY_LINE_RE = re.compile(
+    r"(?P<u1>[^:@\s]+)(?::(?P<p1>[^:@\s]+))?@(?P<h1>[^:@\s]+):(?P<port1>[0-9]+)\Z"
+    r"|(?P<h2>[^:@\s]+):(?P<port2>[0-9]+)\Z"
+)
+
+# Host/password substrings hinting at the proxy type, in priority order
+_PROXY_TYPE_INDICATORS = (
+    (ProxyType.RESIDENTIAL, ('residential', 'resi', 'home', 'dsl', 'cable')),
+    (ProxyType.ISP, ('isp', 'static-residential')),
+    (ProxyType.MOBILE, ('mobile', '4g', '5g', 'cellular')),
+)
+
+
+def _build_type_automaton():
+    """Aho-Corasick automaton over all type indicators (value: priority rank)."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for rank, (_, indicators) in enumerate(_PROXY_TYPE_INDICATORS):
+        for ind in indicators:
+            automaton.add_word(ind, rank)
+    automaton.make_automaton()
+    return automaton
+
+
+_TYPE_AUTOMATON = _build_type_automaton()
 
-@dataclass
+# Fallback without pyahocorasick: one regex whose groups (p0, p1, ...) follow
+# _PROXY_TYPE_INDICATORS order; each is anchored at the start with a lazy .*?
+# so the first listed type wins, not the leftmost indicator in the text
+_TYPE_RE = re.compile(
+    "|".join(
+        f"(?P<p{rank}>.*?(?:{'|'.join(map(re.escape, indicators))}))"
+        for rank, (_, indicators) in enumerate(_PROXY_TYPE_INDICATORS)
+    ),
+    re.DOTALL,
+)
+
+
+@dataclass(slots=True)
 class ProxyDetectionResult:
     """Result of auto-detecting proxy information."""
     host: str
@@ -55,35 +114,63 @@ class ProxyDetector:
         ],
     }
 
+    _provider_re = None
+    _provider_re_source = None
+    _provider_names: List[str] = []
+
+    @classmethod
+    def _provider_regex(cls) -> re.Pattern:
+        """Returns PROVIDER_PATTERNS compiled into a single regex.
+
+        Each provider becomes a named group anchored at the start of the text
+        (``.*?`` lets it match anywhere), so alternation order keeps the
+        original provider priority rather than preferring the leftmost hit.
+        Rebuilt if PROVIDER_PATTERNS is replaced.
+        """
+        if cls._provider_re is None or cls._provider_re_source is not cls.PROVIDER_PATTERNS:
+            groups = "|".join(
+                f"(?P<p{i}>.*?(?:{'|'.join(patterns)}))"
+                for i, patterns in enumerate(cls.PROVIDER_PATTERNS.values())
+            )
+            cls._provider_names = list(cls.PROVIDER_PATTERNS)
+            # Hosts and credentials are ASCII; re.ASCII skips Unicode case folding
+            cls._provider_re = re.compile(groups, re.IGNORECASE | re.DOTALL | re.ASCII)
+            cls._provider_re_source = cls.PROVIDER_PATTERNS
+        return cls._provider_re
+
     @classmethod
     def detect_provider(cls, host: str, username: str = None, password: str = None) -> Optional[str]:
         """Detect provider from host/credentials."""
         full_text = f"{host} {username or ''} {password or ''}"
 
-        for provider, patterns in cls.PROVIDER_PATTERNS.items():
-            if any(re.search(pattern, full_text, re.IGNORECASE) for pattern in patterns):
-                logger.debug(f"Detected provider: {provider} from {host}")
-                return provider
+        match = cls._provider_regex().match(full_text)
+        if match:
+            provider = cls._provider_names[int(match.lastgroup[1:])]
+            logger.debug("Detected provider: %s from %s", provider, host)
+            return provider
 
         return None
 
     @classmethod
     def detect_proxy_type(cls, host: str, username: str = None, password: str = None) -> ProxyType:
         """Detect proxy type based on patterns."""
-        # Check for residential indicators
-        residential_indicators = ['residential', 'resi', 'home', 'dsl', 'cable']
-        if any(ind in host.lower() or (password and ind in password.lower()) for ind in residential_indicators):
-            return ProxyType.RESIDENTIAL
-
-        # Check for ISP indicators
-        isp_indicators = ['isp', 'static-residential']
-        if any(ind in host.lower() or (password and ind in password.lower()) for ind in isp_indicators):
-            return ProxyType.ISP
-
-        # Check for mobile indicators
-        mobile_indicators = ['mobile', '4g', '5g', 'cellular']
-        if any(ind in host.lower() or (password and ind in password.lower()) for ind in mobile_indicators):
-            return ProxyType.MOBILE
+        # NUL keeps indicators from matching across the host/password boundary
+        text = f"{host}\0{password or ''}".lower()
+
+        if _TYPE_AUTOMATON is not None:
+            # Single pass; the highest-priority indicator found wins
+            best = len(_PROXY_TYPE_INDICATORS)
+            for _, rank in _TYPE_AUTOMATON.iter(text):
+                if rank < best:
+                    best = rank
+                    if rank == 0:
+                        break
+            if best < len(_PROXY_TYPE_INDICATORS):
+                return _PROXY_TYPE_INDICATORS[best][0]
+        else:
+            match = _TYPE_RE.match(text)
+            if match:
+                return _PROXY_TYPE_INDICATORS[int(match.lastgroup[1:])][0]
 
         # Default to datacenter
         return ProxyType.DATACENTER
@@ -91,8 +178,12 @@ class ProxyDetector:
     @classmethod
     def detect_ip_version(cls, host: str) -> IPVersion:
         """Detect IP version from host."""
-        # Check for IPv6 indicators
-        if ':' in host.split('.')[0] or 'ipv6' in host.lower() or 'v6' in host.lower():
+        # IPv6 literal: a colon before the first dot (no split() list needed)
+        colon = host.find(':')
+        if colon >= 0 and host.find('.', 0, colon) < 0:
+            return IPVersion.IPV6
+        # 'v6' also covers 'ipv6'
+        if 'v6' in host.lower():
             return IPVersion.IPV6
         return IPVersion.IPV4
 
@@ -116,9 +207,14 @@ class ProxyDetector:
             return None
 
         # MooProxy format: password_country-XX_session-ID
-        match = re.search(r'_session-([A-Za-z0-9_-]+)', password)
-        if match:
-            return match.group(1)
+        i = password.find(_SESSION_MARKER)
+        while i >= 0:
+            start = end = i + len(_SESSION_MARKER)
+            while end < len(password) and password[end] in _SESSION_ID_CHARS:
+                end += 1
+            if end > start:
+                return password[start:end]
+            i = password.find(_SESSION_MARKER, start)
 
         return None
 
@@ -129,9 +225,13 @@ class ProxyDetector:
             return None
 
         # MooProxy format: password_country-XX
-        match = re.search(r'_country-([A-Z]{2})', password)
-        if match:
-            return match.group(1)
+        i = password.find(_COUNTRY_MARKER)
+        while i >= 0:
+            start = i + len(_COUNTRY_MARKER)
+            code = password[start:start + 2]
+            if len(code) == 2 and all(c in string.ascii_uppercase for c in code):
+                return code
+            i = password.find(_COUNTRY_MARKER, start)
 
         return None
 
@@ -165,8 +265,22 @@ class ProxyDetector:
             scheme, rest = proxy_string.split("://", 1)
             proxy_string = rest
 
+        # Fast paths for well-formed lines, host:port:user:pass (the common
+        # MooProxy format) first; anything unusual falls through to the
+        # format-by-format parsing below
+        parts = proxy_string.split(':', 3)
+        if len(parts) == 4 and parts[1].isascii() and parts[1].isdigit():
+            host, port, username, password = parts[0], int(parts[1]), parts[2], parts[3]
+        else:
+            match = _PROXY_LINE_RE.match(proxy_string)
+            if match:
+                if match['port1']:
+                    host, port, username, password = match['h1'], int(match['port1']), match['u1'], match['p1']
+                else:
+                    host, port = match['h2'], int(match['port2'])
+
         # Format 1: host:port:username:password (MooProxy/similar)
-        if proxy_string.count(':') >= 3:
+        if host is None and proxy_string.count(':') >= 3:
             parts = proxy_string.split(':', 3)
             if len(parts) == 4:
                 host = parts[0]
@@ -174,7 +288,7 @@ class ProxyDetector:
                     port = int(parts[1])
                     username = parts[2]
                     password = parts[3]
-                    logger.debug(f"Parsed as format host:port:user:pass - {host}:{port}")
+                    logger.debug("Parsed as format host:port:user:pass - %s:%s", host, port)
                 except ValueError:
                     # Try other formats
                     pass
@@ -187,27 +301,29 @@ class ProxyDetector:
             else:
                 username = creds
 
-            if ':' in hostport:
-                host, port_str = hostport.rsplit(':', 1)
+            colon = hostport.rfind(':')
+            if colon >= 0:
+                host, port_str = hostport[:colon], hostport[colon + 1:]
                 try:
                     port = int(port_str)
-                    logger.debug(f"Parsed as format user:pass@host:port - {host}:{port}")
+                    logger.debug("Parsed as format user:pass@host:port - %s:%s", host, port)
                 except ValueError:
-                    logger.warning(f"Invalid port in proxy string: {proxy_string}")
+                    logger.warning("Invalid port in proxy string: %s", proxy_string)
                     return None
 
         # Format 3: host:port
-        if host is None and ':' in proxy_string:
-            host, port_str = proxy_string.rsplit(':', 1)
+        colon = proxy_string.rfind(':') if host is None else -1
+        if colon >= 0:
+            host, port_str = proxy_string[:colon], proxy_string[colon + 1:]
             try:
                 port = int(port_str)
-                logger.debug(f"Parsed as format host:port - {host}:{port}")
+                logger.debug("Parsed as format host:port - %s:%s", host, port)
             except ValueError:
-                logger.warning(f"Invalid port in proxy string: {proxy_string}")
+                logger.warning("Invalid port in proxy string: %s", proxy_string)
                 return None
 
         if not host or not port:
-            logger.error(f"Could not parse proxy string: {proxy_string}")
+            logger.error("Could not parse proxy string: %s", proxy_string)
             return None
 
         # Auto-detect provider
@@ -220,6 +336,14 @@ class ProxyDetector:
         session = cls.extract_session_id(password)
         region = cls.extract_region(password)
 
+        # Gateway hosts, schemes and country codes repeat across a batch;
+        # interning lets all imported endpoints share one string each.
+        # Provider names already come from the PROVIDER_PATTERNS keys.
+        host = sys.intern(host)
+        scheme = sys.intern(scheme)
+        if region:
+            region = sys.intern(region)
+
         result = ProxyDetectionResult(
             host=host,
             port=port,
@@ -236,8 +360,8 @@ class ProxyDetector:
         )
 
         logger.info(
-            f"Detected proxy: host={host}:{port} provider={provider} type={proxy_type.value} "
-            f"region={region} session={session}"
+            "Detected proxy: host=%s:%s provider=%s type=%s region=%s session=%s",
+            host, port, provider, proxy_type.value, region, session,
         )
 
         return result
@@ -248,59 +372,37 @@ class ProxyBatchImporter:
 
     @staticmethod
     def import_from_list(
-        proxy_strings: List[str],
+        proxy_strings: Iterable[str],
         provider_name: str = "auto-imported",
         default_proxy_type: Optional[ProxyType] = None,
+        db: Optional[ProxyDatabase] = None,
+        workers: int = 1,
     ) -> List[ProxyEndpoint]:
-        """Import multiple proxies from string list with auto-detection.
+        """Import multiple proxies from strings with auto-detection.
 
         Args:
-            proxy_strings: List of proxy strings in various formats
+            proxy_strings: Proxy strings in various formats (any iterable;
+                consumed lazily, so a generator over a file works)
             provider_name: Name for the provider (default: "auto-imported")
             default_proxy_type: Override proxy type detection
+            db: If given, the imported endpoints are also saved to this
+                database in a single transaction
+            workers: Parse in this many processes (chunks of
+                IMPORT_CHUNK_SIZE lines); only worth it for very large lists
 
         Returns:
             List of ProxyEndpoint objects
         """
-        endpoints = []
-        detector = ProxyDetector()
-
-        logger.info(f"Starting batch import of {len(proxy_strings)} proxies")
-
-        for i, proxy_str in enumerate(proxy_strings, 1):
-            try:
-                result = detector.parse_proxy_string(proxy_str)
-                if not result:
-                    logger.warning(f"Skipped invalid proxy {i}/{len(proxy_strings)}: {proxy_str[:50]}")
-                    continue
-
-                endpoint = ProxyEndpoint(
-                    scheme=result.scheme,
-                    host=result.host,
-                    port=result.port,
-                    username=result.username,
-                    password=result.password,
-                    provider=result.provider or provider_name,
-                    session=result.session,
-                    proxy_type=default_proxy_type or result.proxy_type,
-                    ip_version=result.ip_version,
-                    rotation_type=result.rotation_type,
-                    region=result.region,
-                    metadata={
-                        'imported': True,
-                        'detection_confidence': result.confidence,
-                        'batch_index': i,
-                    }
-                )
+        logger.info("Starting batch import of proxies")
 
-                endpoints.append(endpoint)
-                logger.debug(f"Imported proxy {i}/{len(proxy_strings)}: {result.host}:{result.port}")
+        if workers > 1:
+            endpoints, i = _import_parallel(proxy_strings, provider_name, default_proxy_type, workers)
+        else:
+            endpoints, i = _import_lines(proxy_strings, 1, provider_name, default_proxy_type)
 
-            except Exception as e:
-                logger.error(f"Error importing proxy {i}/{len(proxy_strings)}: {e}", exc_info=True)
-                continue
-
-        logger.info(f"Successfully imported {len(endpoints)}/{len(proxy_strings)} proxies")
+        logger.info(f"Successfully imported {len(endpoints)}/{i} proxies")
+        if db is not None and endpoints:
+            db.add_proxies_batch(endpoints)
         return endpoints
 
     @staticmethod
@@ -308,6 +410,8 @@ class ProxyBatchImporter:
         file_path: str,
         provider_name: str = "auto-imported",
         default_proxy_type: Optional[ProxyType] = None,
+        db: Optional[ProxyDatabase] = None,
+        workers: int = 1,
     ) -> List[ProxyEndpoint]:
         """Import proxies from a text file (one per line).
 
@@ -315,20 +419,23 @@ class ProxyBatchImporter:
             file_path: Path to file containing proxy strings
             provider_name: Name for the provider
             default_proxy_type: Override proxy type detection
+            db: If given, also save the imported endpoints to this database
+            workers: Number of parsing processes (see import_from_list)
 
         Returns:
             List of ProxyEndpoint objects
         """
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                proxy_strings = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-
-            logger.info(f"Read {len(proxy_strings)} proxies from {file_path}")
-            return ProxyBatchImporter.import_from_list(
-                proxy_strings,
-                provider_name=provider_name,
-                default_proxy_type=default_proxy_type,
-            )
+                logger.info(f"Reading proxies from {file_path}")
+                # Lines are streamed straight into the import, never held as a list
+                return ProxyBatchImporter.import_from_list(
+                    (line for line in map(str.strip, f) if line and not line.startswith('#')),
+                    provider_name=provider_name,
+                    default_proxy_type=default_proxy_type,
+                    db=db,
+                    workers=workers,
+                )
         except Exception as e:
             logger.error(f"Error reading proxy file {file_path}: {e}", exc_info=True)
             return []
@@ -353,14 +460,18 @@ class ProxyBatchImporter:
         """
         # Convert endpoints to entries string
         entries = []
+        has_moo = False
         for ep in endpoints:
-            if ep.username and ep.password:
-                entry = f"{ep.host}:{ep.port}:{ep.username}:{ep.password}"
-            elif ep.username:
-                entry = f"{ep.username}@{ep.host}:{ep.port}"
+            host, port, username, password = ep.host, ep.port, ep.username, ep.password
+            if username and password:
+                entry = f"{host}:{port}:{username}:{password}"
+            elif username:
+                entry = f"{username}@{host}:{port}"
             else:
-                entry = f"{ep.host}:{ep.port}"
+                entry = f"{host}:{port}"
             entries.append(entry)
+            if not has_moo and 'mooproxy' in host:
+                has_moo = True
 
         # Use first endpoint to determine proxy type
         proxy_type = endpoints[0].proxy_type.value if endpoints else "residential"
@@ -368,7 +479,7 @@ class ProxyBatchImporter:
 
         config = ProviderConfig(
             name=name,
-            type="static_list" if not any('mooproxy' in str(ep.host) for ep in endpoints) else "mooproxy",
+            type="mooproxy" if has_moo else "static_list",
             price_per_gb=price_per_gb,
             concurrency_limit=concurrency_limit,
             options={
@@ -380,3 +491,92 @@ class ProxyBatchImporter:
 
         logger.info(f"Created provider config: {name} with {len(entries)} endpoints")
         return config
+
+
+def _import_lines(
+    lines: Iterable[str],
+    first_index: int,
+    provider_name: str,
+    default_proxy_type: Optional[ProxyType],
+) -> Tuple[List[ProxyEndpoint], int]:
+    """Parses proxy strings into endpoints (module-level so worker processes can run it).
+
+    Returns:
+        Tuple of (endpoints, number of lines read); batch_index metadata
+        counts from first_index
+    """
+    endpoints = []
+    parse = ProxyDetector.parse_proxy_string  # classmethod; no instance needed
+
+    i = first_index - 1
+    for i, proxy_str in enumerate(lines, first_index):
+        try:
+            result = parse(proxy_str)
+            if not result:
+                logger.warning("Skipped invalid proxy %d: %.50s", i, proxy_str)
+                continue
+
+            endpoint = ProxyEndpoint(
+                scheme=result.scheme,
+                host=result.host,
+                port=result.port,
+                username=result.username,
+                password=result.password,
+                provider=result.provider or provider_name,
+                session=result.session,
+                proxy_type=default_proxy_type or result.proxy_type,
+                ip_version=result.ip_version,
+                rotation_type=result.rotation_type,
+                region=result.region,
+                metadata={
+                    'imported': True,
+                    'detection_confidence': result.confidence,
+                    'batch_index': i,
+                }
+            )
+
+            endpoints.append(endpoint)
+            logger.debug("Imported proxy %d: %s:%s", i, result.host, result.port)
+
+        except Exception as e:
+            logger.error("Error importing proxy %d: %s", i, e, exc_info=True)
+            continue
+
+    return endpoints, i - first_index + 1
+
+
+def _import_parallel(
+    proxy_strings: Iterable[str],
+    provider_name: str,
+    default_proxy_type: Optional[ProxyType],
+    workers: int,
+) -> Tuple[List[ProxyEndpoint], int]:
+    """Runs _import_lines over IMPORT_CHUNK_SIZE chunks in a process pool.
+
+    At most two chunks per worker are in flight, so the input is still
+    streamed; results are merged in input order.
+    """
+    endpoints: List[ProxyEndpoint] = []
+    total = 0
+    it = iter(proxy_strings)
+    pending = deque()
+
+    def collect() -> None:
+        nonlocal total
+        chunk_endpoints, count = pending.popleft().result()
+        endpoints.extend(chunk_endpoints)
+        total += count
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        first_index = 1
+        for chunk in iter(lambda: list(islice(it, IMPORT_CHUNK_SIZE)), []):
+            pending.append(executor.submit(
+                _import_lines, chunk, first_index, provider_name, default_proxy_type
+            ))
+            first_index += len(chunk)
+            if len(pending) >= workers * 2:
+                collect()
+        while pending:
+            collect()
+
+    return endpoints, total
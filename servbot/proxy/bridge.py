@@ -7,11 +7,63 @@ Provides:
 """
 from __future__ import annotations
 
+import atexit
+import dataclasses
+import functools
+import threading
+import time
 from typing import Optional, Dict
 
 from .database import ProxyDatabase
 from .models import ProxyEndpoint
 
+PROXY_DB_PATH = "data/proxies.db"
+
+# Selected endpoints are reused for this long before the DB is queried again
+PROXY_CACHE_SECONDS = 5
+
+# One ProxyDatabase per path, shared by all threads (it gives each thread
+# its own SQLite connection)
+_DBS: Dict[str, ProxyDatabase] = {}
+_DBS_LOCK = threading.Lock()
+
+
+def _get_db(db_path: Optional[str] = None) -> ProxyDatabase:
+    """Returns the ProxyDatabase for ``db_path`` (default PROXY_DB_PATH), opening it on first use."""
+    path = db_path or PROXY_DB_PATH
+    db = _DBS.get(path)
+    if db is None:
+        with _DBS_LOCK:
+            db = _DBS.get(path)
+            if db is None:
+                db = _DBS[path] = ProxyDatabase(path)
+    return db
+
+
+@atexit.register
+def _close_dbs() -> None:
+    with _DBS_LOCK:
+        dbs = list(_DBS.values())
+        _DBS.clear()
+    for db in dbs:
+        db.close()
+
+
+@functools.lru_cache(maxsize=4)
+def _fetch_first(only_working: bool, db_path: str, epoch: int) -> Optional[ProxyEndpoint]:
+    """Loads the first matching endpoint; ``epoch`` changes every PROXY_CACHE_SECONDS."""
+    db = _get_db(db_path)
+    endpoints = db.get_working_proxies(limit=1) if only_working else db.get_all_proxies(active_only=True, limit=1)
+    return endpoints[0] if endpoints else None
+
+
+def _pick_endpoint(only_working: bool) -> Optional[ProxyEndpoint]:
+    ep = _fetch_first(only_working, PROXY_DB_PATH, int(time.monotonic() // PROXY_CACHE_SECONDS))
+    if ep is None or ep.metadata is None:
+        return ep
+    # The instance is frozen but its metadata dict is not; give each caller its own
+    return dataclasses.replace(ep, metadata=dict(ep.metadata))
+
 
 def get_playwright_proxy_from_db(*, only_working: bool = True) -> Optional[Dict[str, str]]:
     """Return a Playwright proxy dict from proxies DB.
@@ -22,16 +74,8 @@ def get_playwright_proxy_from_db(*, only_working: bool = True) -> Optional[Dict[
     Returns:
         Playwright-compatible proxy dict or None if none available
     """
-    db = ProxyDatabase("data/proxies.db")
-    try:
-        endpoints = db.get_working_proxies() if only_working else db.get_all_proxies(active_only=True)
-        if not endpoints:
-            return None
-        # Pick the first
-        ep = endpoints[0]
-        return ep.as_playwright_proxy()
-    finally:
-        db.close()
+    ep = _pick_endpoint(only_working)
+    return ep.as_playwright_proxy() if ep else None
 
 
 def get_requests_proxies_from_db(*, only_working: bool = True) -> Optional[Dict[str, str]]:
@@ -43,15 +87,8 @@ def get_requests_proxies_from_db(*, only_working: bool = True) -> Optional[Dict[
     Returns:
         requests-compatible proxies dict or None if none available
     """
-    db = ProxyDatabase("data/proxies.db")
-    try:
-        endpoints = db.get_working_proxies() if only_working else db.get_all_proxies(active_only=True)
-        if not endpoints:
-            return None
-        ep = endpoints[0]
-        return ep.as_requests_proxies()
-    finally:
-        db.close()
+    ep = _pick_endpoint(only_working)
+    return ep.as_requests_proxies() if ep else None
 
 
 def get_proxy_endpoint_from_db(*, only_working: bool = True) -> Optional[ProxyEndpoint]:
@@ -63,11 +100,4 @@ def get_proxy_endpoint_from_db(*, only_working: bool = True) -> Optional[ProxyEn
     Returns:
         ProxyEndpoint or None
     """
-    db = ProxyDatabase("data/proxies.db")
-    try:
-        endpoints = db.get_working_proxies() if only_working else db.get_all_proxies(active_only=True)
-        if not endpoints:
-            return None
-        return endpoints[0]
-    finally:
-        db.close()
\ No newline at end of file
+    return _pick_endpoint(only_working)
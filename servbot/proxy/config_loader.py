@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 
 from .models import ProviderConfig
 
+try:
+    # Optional: C JSON parser, faster for configs with large inline entry lists
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
 
 def load_provider_configs(path: str | Path) -> List[ProviderConfig]:
     """Load ProviderConfig list from a JSON file.
@@ -35,7 +42,8 @@ def load_provider_configs(path: str | Path) -> List[ProviderConfig]:
     }
     """
     p = Path(path)
-    data = json.loads(p.read_text(encoding="utf-8"))
+    # Both parsers take UTF-8 bytes directly, so skip the str decode
+    data = _loads(p.read_bytes())
     providers = []
     for item in data.get("providers", []):
         providers.append(
@@ -1,10 +1,14 @@
 """SQL database storage for proxies."""
 from __future__ import annotations
 
+import atexit
 import logging
+import queue
 import sqlite3
+import threading
+import weakref
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import Dict, Iterator, List, Optional
 from pathlib import Path
 
 from .models import ProxyEndpoint, ProxyType, IPVersion, RotationType
@@ -12,6 +16,151 @@ from .models import ProxyEndpoint, ProxyType, IPVersion, RotationType
 
 logger = logging.getLogger(__name__)
 
+# Per-connection settings; WAL (set separately) persists in the file
+_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL;",   # safe with WAL: no fsync per commit
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -20000;",    # ~20 MB page cache
+    "PRAGMA mmap_size = 268435456;",  # 256 MB
+)
+
+# Stored enum values -> members, so row conversion skips Enum.__call__
+# (NULL, empty or unknown values map to None)
+_PROXY_TYPES = {m.value: m for m in ProxyType}
+_IP_VERSIONS = {m.value: m for m in IPVersion}
+_ROTATION_TYPES = {m.value: m for m in RotationType}
+
+_INSERT_TEST_SQL = """
+    INSERT INTO proxy_tests (
+        proxy_id, success, response_time_ms, status_code,
+        error_message, test_url, response_ip
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_UPDATE_LAST_TEST_SQL = """
+    UPDATE proxies SET last_test_success = ?, last_tested_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+"""
+
+# Max test results committed per transaction by the writer thread
+TEST_RESULT_BATCH_SIZE = 500
+
+_STOP_WRITER = object()
+
+# Queues with a writer thread; flushed once at interpreter exit. Weak, so
+# neither this hook nor the writer keeps a ProxyDatabase alive.
+_WRITER_QUEUES: "weakref.WeakSet[queue.Queue]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_writer_queues():
+    for pending in list(_WRITER_QUEUES):
+        pending.join()
+
+_PROXY_COLUMNS = """
+    host, port, username, password, provider, session,
+    proxy_type, ip_version, rotation_type, region, scheme
+"""
+_INSERT_PROXY_SQL = f"INSERT INTO proxies ({_PROXY_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_PROXY_OR_IGNORE_SQL = _INSERT_PROXY_SQL.replace("INSERT", "INSERT OR IGNORE", 1)
+
+
+def _endpoint_row(endpoint: ProxyEndpoint) -> tuple:
+    """Parameters for _INSERT_PROXY_SQL."""
+    return (
+        endpoint.host,
+        endpoint.port,
+        endpoint.username,
+        endpoint.password,
+        endpoint.provider,
+        endpoint.session,
+        endpoint.proxy_type.value if endpoint.proxy_type else None,
+        endpoint.ip_version.value if endpoint.ip_version else None,
+        endpoint.rotation_type.value if endpoint.rotation_type else None,
+        endpoint.region,
+        endpoint.scheme,
+    )
+
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    """Open a connection to ``path`` (WAL unless in-memory, tuned PRAGMAs)."""
+    # check_same_thread=False only so close() can close it from any thread
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    if path != ":memory:":
+        conn.execute("PRAGMA journal_mode = WAL;")
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _write_test_results(conn: sqlite3.Connection, rows: List[tuple]):
+    with conn:
+        conn.executemany(_INSERT_TEST_SQL, rows)
+        # In queue order, so each proxy ends with its latest result
+        conn.executemany(_UPDATE_LAST_TEST_SQL, [(row[1], row[0]) for row in rows])
+
+
+def _drain_test_results(db_path: str, pending: "queue.Queue[tuple]"):
+    """Writer thread: commits queued test results in batches.
+
+    Takes whatever is already queued (up to TEST_RESULT_BATCH_SIZE) after
+    each blocking get, so batches grow under load without delaying a lone
+    result. A batch that fails is retried row by row so one bad result does
+    not drop the others. The writer uses its own connection and holds no
+    reference to its ProxyDatabase.
+
+    Args:
+        db_path: Database file to write to
+        pending: Queue this writer owns until it takes _STOP_WRITER
+    """
+    conn = None
+    try:
+        while True:
+            batch = [pending.get()]
+            while len(batch) < TEST_RESULT_BATCH_SIZE:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [item for item in batch if item is not _STOP_WRITER]
+            try:
+                if rows:
+                    conn = conn or _open_connection(db_path)
+                    _write_test_results(conn, rows)
+            except Exception as e:
+                if conn is None or len(rows) == 1:
+                    logger.error(f"Error recording {len(rows)} proxy test results: {e}")
+                else:
+                    logger.warning(f"Error recording {len(rows)} proxy test results, retrying one by one: {e}")
+                    for row in rows:
+                        try:
+                            _write_test_results(conn, [row])
+                        except Exception as e:
+                            logger.error(f"Error recording test result for proxy {row[0]}: {e}")
+            finally:
+                for _ in batch:
+                    pending.task_done()
+            if len(rows) < len(batch):  # stop sentinel seen
+                return
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+class _ThreadConnection:
+    """Holds one thread's connection and closes it once the thread is gone.
+
+    Only the owning thread's local storage references the holder, so it is
+    collected at thread exit and the finalizer closes the connection.
+    """
+
+    __slots__ = ("conn", "close", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.close = weakref.finalize(self, conn.close)
+
 
 class ProxyDatabase:
     """SQLite database for storing and managing proxies."""
@@ -24,16 +173,42 @@ class ProxyDatabase:
         """
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = None
+        self._in_memory = str(self.db_path) == ":memory:"
+        # One connection per thread (WAL lets readers run alongside the
+        # writer), closed when its thread exits; live ones are tracked
+        # weakly so close() can close every one
+        self._local = threading.local()
+        self._conns: "weakref.WeakSet[_ThreadConnection]" = weakref.WeakSet()
+        self._shared_conn: Optional[_ThreadConnection] = None  # ":memory:" only
+        self._conns_lock = threading.Lock()
+        # record_test_result() only enqueues; a writer thread (started on
+        # first use, restarted if it died) commits results in batches. Both
+        # are swapped under _conns_lock so close() stops exactly its writer.
+        # In-memory databases write synchronously instead (see there).
+        self._test_queue: "queue.Queue[tuple]" = queue.Queue()
+        self._test_writer: Optional[threading.Thread] = None
+        # Stops the writer (once it has drained the queue) if the database
+        # is dropped without close()
+        self._stop_test_writer: Optional[weakref.finalize] = None
         self._init_database()
         logger.info(f"Proxy database initialized: {self.db_path}")
 
     def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection."""
-        if self._conn is None:
-            self._conn = sqlite3.connect(str(self.db_path))
-            self._conn.row_factory = sqlite3.Row
-        return self._conn
+        """Get this thread's database connection (WAL mode, tuned PRAGMAs)."""
+        holder = getattr(self._local, "holder", None)
+        if holder is not None:
+            return holder.conn
+
+        with self._conns_lock:
+            if self._in_memory and self._shared_conn is not None:
+                holder = self._shared_conn  # a second connection would be a separate database
+            else:
+                holder = _ThreadConnection(_open_connection(str(self.db_path)))
+                self._conns.add(holder)
+                if self._in_memory:
+                    self._shared_conn = holder  # lives as long as the database
+        self._local.holder = holder
+        return holder.conn
 
     def _init_database(self):
         """Create database tables if they don't exist."""
@@ -58,10 +233,19 @@ class ProxyDatabase:
                 is_active BOOLEAN DEFAULT 1,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_test_success INTEGER,
+                last_tested_at TIMESTAMP,
                 UNIQUE(host, port, username, session)
             )
         """)
 
+        # Older databases: add the latest-test columns and fill them from history
+        columns = {row['name'] for row in cursor.execute("PRAGMA table_info(proxies)")}
+        backfill_last_test = 'last_test_success' not in columns
+        if backfill_last_test:
+            cursor.execute("ALTER TABLE proxies ADD COLUMN last_test_success INTEGER")
+            cursor.execute("ALTER TABLE proxies ADD COLUMN last_tested_at TIMESTAMP")
+
         # Proxy test results table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS proxy_tests (
@@ -95,10 +279,32 @@ class ProxyDatabase:
 
         # Create indexes
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_proxies_provider ON proxies(provider)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_proxies_active ON proxies(is_active)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_proxy_tests_proxy_id ON proxy_tests(proxy_id)")
+        # Serves get_working_proxies and active-only listings; replaces the
+        # is_active-only index
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_proxies_active_last_success
+            ON proxies(is_active, last_test_success)
+        """)
+        cursor.execute("DROP INDEX IF EXISTS idx_proxies_active")
+        # Latest-test-first per proxy: serves get_test_history and the
+        # last-test backfill; supersedes the old proxy_id-only index
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_proxy_tests_proxy_time
+            ON proxy_tests(proxy_id, tested_at DESC, id DESC)
+        """)
+        cursor.execute("DROP INDEX IF EXISTS idx_proxy_tests_proxy_id")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_proxy_stats_proxy_id ON proxy_stats(proxy_id)")
 
+        if backfill_last_test:
+            cursor.execute("""
+                UPDATE proxies SET (last_test_success, last_tested_at) = (
+                    SELECT success, tested_at FROM proxy_tests t
+                    WHERE t.proxy_id = proxies.id
+                    ORDER BY tested_at DESC, id DESC
+                    LIMIT 1
+                )
+            """)
+
         conn.commit()
         logger.debug("Database tables and indexes created/verified")
 
@@ -115,24 +321,7 @@ class ProxyDatabase:
         cursor = conn.cursor()
 
         try:
-            cursor.execute("""
-                INSERT INTO proxies (
-                    host, port, username, password, provider, session,
-                    proxy_type, ip_version, rotation_type, region, scheme
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                endpoint.host,
-                endpoint.port,
-                endpoint.username,
-                endpoint.password,
-                endpoint.provider,
-                endpoint.session,
-                endpoint.proxy_type.value if endpoint.proxy_type else None,
-                endpoint.ip_version.value if endpoint.ip_version else None,
-                endpoint.rotation_type.value if endpoint.rotation_type else None,
-                endpoint.region,
-                endpoint.scheme,
-            ))
+            cursor.execute(_INSERT_PROXY_SQL, _endpoint_row(endpoint))
 
             conn.commit()
             proxy_id = cursor.lastrowid
@@ -159,23 +348,44 @@ class ProxyDatabase:
             raise
 
     def add_proxies_batch(self, endpoints: List[ProxyEndpoint]) -> List[int]:
-        """Add multiple proxies in batch.
+        """Add multiple proxies in a single transaction.
+
+        Proxies that already exist are not duplicated; their existing IDs are
+        returned instead, as with add_proxy().
 
         Args:
             endpoints: List of ProxyEndpoint objects
 
         Returns:
-            List of database IDs
+            List of database IDs (rows that could not be added are skipped)
         """
         logger.info(f"Adding {len(endpoints)} proxies to database")
+        conn = self._get_connection()
         ids = []
-        for endpoint in endpoints:
-            try:
-                proxy_id = self.add_proxy(endpoint)
-                ids.append(proxy_id)
-            except Exception as e:
-                logger.error(f"Error adding proxy {endpoint.host}:{endpoint.port}: {e}")
-                continue
+        new_ids = []
+
+        with conn:  # one commit for the whole batch
+            cursor = conn.cursor()
+            for endpoint in endpoints:
+                cursor.execute(_INSERT_PROXY_OR_IGNORE_SQL, _endpoint_row(endpoint))
+                if cursor.rowcount == 1:
+                    new_ids.append(cursor.lastrowid)
+                    ids.append(cursor.lastrowid)
+                    continue
+                cursor.execute("""
+                    SELECT id FROM proxies
+                    WHERE host=? AND port=? AND username=? AND session=?
+                """, (endpoint.host, endpoint.port, endpoint.username, endpoint.session))
+                row = cursor.fetchone()
+                if row:
+                    ids.append(row['id'])
+                else:
+                    logger.error(f"Error adding proxy {endpoint.host}:{endpoint.port}")
+
+            cursor.executemany(
+                "INSERT OR IGNORE INTO proxy_stats (proxy_id) VALUES (?)",
+                [(proxy_id,) for proxy_id in new_ids],
+            )
 
         logger.info(f"Successfully added {len(ids)}/{len(endpoints)} proxies")
         return ids
@@ -200,25 +410,42 @@ class ProxyDatabase:
 
         return self._row_to_endpoint(row)
 
-    def get_all_proxies(self, active_only: bool = True) -> List[ProxyEndpoint]:
+    def get_all_proxies(self, active_only: bool = True, limit: Optional[int] = None) -> List[ProxyEndpoint]:
         """Get all proxies from database.
 
         Args:
             active_only: Only return active proxies
+            limit: Return at most this many proxies (all if None)
 
         Returns:
             List of ProxyEndpoint objects
         """
+        return list(self.iter_proxies(active_only=active_only, limit=limit))
+
+    def iter_proxies(self, active_only: bool = True, limit: Optional[int] = None,
+                     batch_size: int = 1000) -> Iterator[ProxyEndpoint]:
+        """Yield proxies in id order, fetching batch_size rows at a time.
+
+        Only one batch of rows is held at once, so callers that aggregate or
+        filter never need the whole table in memory.
+
+        Args:
+            active_only: Only yield active proxies
+            limit: Yield at most this many proxies (all if None)
+            batch_size: Rows fetched from SQLite per round
+
+        Yields:
+            ProxyEndpoint objects
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
 
-        if active_only:
-            cursor.execute("SELECT * FROM proxies WHERE is_active=1 ORDER BY id")
-        else:
-            cursor.execute("SELECT * FROM proxies ORDER BY id")
+        where = "WHERE is_active=1 " if active_only else ""
+        cursor.execute(f"SELECT * FROM proxies {where}ORDER BY id LIMIT ?", (-1 if limit is None else limit,))
 
-        rows = cursor.fetchall()
-        return [self._row_to_endpoint(row) for row in rows]
+        while rows := cursor.fetchmany(batch_size):
+            for row in rows:
+                yield self._row_to_endpoint(row)
 
     def get_proxies_by_provider(self, provider: str) -> List[ProxyEndpoint]:
         """Get proxies filtered by provider.
@@ -253,19 +480,43 @@ class ProxyDatabase:
             test_url: URL that was tested
             response_ip: IP address from response
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT INTO proxy_tests (
-                proxy_id, success, response_time_ms, status_code,
-                error_message, test_url, response_ip
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (proxy_id, success, response_time_ms, status_code,
-              error_message, test_url, response_ip))
-
-        conn.commit()
-        logger.debug(f"Recorded test result for proxy {proxy_id}: success={success}")
+        row = (proxy_id, success, response_time_ms, status_code, error_message, test_url, response_ip)
+        if self._in_memory:
+            # The writer's own connection would be a separate database, and
+            # sharing this one would let it commit another thread's transaction
+            _write_test_results(self._get_connection(), [row])
+            return
+        with self._conns_lock:
+            self._ensure_test_writer()
+            self._test_queue.put(row)
+        logger.debug("Queued test result for proxy %s: success=%s", proxy_id, success)
+
+    def flush_test_results(self):
+        """Block until every queued test result has been written."""
+        with self._conns_lock:
+            if self._test_writer is None:
+                return
+            self._ensure_test_writer()
+            pending = self._test_queue
+        pending.join()
+
+    def _ensure_test_writer(self):
+        """Start a writer for the current queue unless one is running.
+
+        Callers must hold _conns_lock.
+        """
+        if self._test_writer is not None and self._test_writer.is_alive():
+            return
+        pending = self._test_queue
+        self._test_writer = threading.Thread(
+            target=_drain_test_results, args=(str(self.db_path), pending),
+            name="proxy-test-writer", daemon=True,
+        )
+        self._test_writer.start()
+        _WRITER_QUEUES.add(pending)
+        if self._stop_test_writer is None:
+            self._stop_test_writer = weakref.finalize(self, pending.put, _STOP_WRITER)
+            self._stop_test_writer.atexit = False  # _flush_writer_queues handles exit
 
     def update_proxy_status(self, proxy_id: int, is_active: bool):
         """Update proxy active status.
@@ -315,6 +566,7 @@ class ProxyDatabase:
         Returns:
             List of test result dictionaries
         """
+        self.flush_test_results()
         conn = self._get_connection()
         cursor = conn.cursor()
 
@@ -328,29 +580,26 @@ class ProxyDatabase:
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
-    def get_working_proxies(self) -> List[ProxyEndpoint]:
+    def get_working_proxies(self, limit: Optional[int] = None) -> List[ProxyEndpoint]:
         """Get proxies that passed their last test.
 
+        Args:
+            limit: Return at most this many proxies (all if None)
+
         Returns:
             List of working ProxyEndpoint objects
         """
+        self.flush_test_results()
         conn = self._get_connection()
         cursor = conn.cursor()
 
+        # last_test_success is kept current by the test-result writer
         cursor.execute("""
-            SELECT p.* FROM proxies p
-            INNER JOIN (
-                SELECT proxy_id, success
-                FROM proxy_tests pt1
-                WHERE tested_at = (
-                    SELECT MAX(tested_at)
-                    FROM proxy_tests pt2
-                    WHERE pt2.proxy_id = pt1.proxy_id
-                )
-            ) latest ON p.id = latest.proxy_id
-            WHERE latest.success = 1 AND p.is_active = 1
-            ORDER BY p.id
-        """)
+            SELECT * FROM proxies
+            WHERE is_active = 1 AND last_test_success = 1
+            ORDER BY id
+            LIMIT ?
+        """, (-1 if limit is None else limit,))
 
         rows = cursor.fetchall()
         return [self._row_to_endpoint(row) for row in rows]
@@ -361,18 +610,28 @@ class ProxyDatabase:
         Returns:
             Dictionary with stats
         """
+        self.flush_test_results()
         conn = self._get_connection()
         cursor = conn.cursor()
 
-        stats = {}
-
-        # Total proxies
-        cursor.execute("SELECT COUNT(*) as count FROM proxies")
-        stats['total_proxies'] = cursor.fetchone()['count']
-
-        # Active proxies
-        cursor.execute("SELECT COUNT(*) as count FROM proxies WHERE is_active=1")
-        stats['active_proxies'] = cursor.fetchone()['count']
+        # One pass over each table
+        cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM proxies) AS total_proxies,
+                (SELECT COUNT(*) FROM proxies WHERE is_active=1) AS active_proxies,
+                tests.total AS total_tests,
+                tests.successful AS successful_tests
+            FROM (
+                SELECT COUNT(*) AS total,
+                       SUM(CASE WHEN success=1 THEN 1 ELSE 0 END) AS successful
+                FROM proxy_tests
+            ) AS tests
+        """)
+        row = cursor.fetchone()
+        stats = {
+            'total_proxies': row['total_proxies'],
+            'active_proxies': row['active_proxies'],
+        }
 
         # Proxies by provider
         cursor.execute("""
@@ -381,22 +640,11 @@ class ProxyDatabase:
             WHERE is_active=1
             GROUP BY provider
         """)
-        stats['by_provider'] = {row['provider']: row['count'] for row in cursor.fetchall()}
+        stats['by_provider'] = {r['provider']: r['count'] for r in cursor.fetchall()}
 
-        # Total tests
-        cursor.execute("SELECT COUNT(*) as count FROM proxy_tests")
-        stats['total_tests'] = cursor.fetchone()['count']
-
-        # Success rate
-        cursor.execute("""
-            SELECT
-                SUM(CASE WHEN success=1 THEN 1 ELSE 0 END) as successful,
-                COUNT(*) as total
-            FROM proxy_tests
-        """)
-        row = cursor.fetchone()
-        if row['total'] > 0:
-            stats['success_rate'] = (row['successful'] / row['total']) * 100
+        stats['total_tests'] = row['total_tests']
+        if row['total_tests'] > 0:
+            stats['success_rate'] = (row['successful_tests'] / row['total_tests']) * 100
         else:
             stats['success_rate'] = 0.0
 
@@ -419,18 +667,36 @@ class ProxyDatabase:
             password=row['password'],
             provider=row['provider'],
             session=row['session'],
-            proxy_type=ProxyType(row['proxy_type']) if row['proxy_type'] else None,
-            ip_version=IPVersion(row['ip_version']) if row['ip_version'] else None,
-            rotation_type=RotationType(row['rotation_type']) if row['rotation_type'] else None,
+            proxy_type=_PROXY_TYPES.get(row['proxy_type']),
+            ip_version=_IP_VERSIONS.get(row['ip_version']),
+            rotation_type=_ROTATION_TYPES.get(row['rotation_type']),
             region=row['region'],
             metadata={'db_id': row['id'], 'is_active': bool(row['is_active'])}
         )
 
     def close(self):
-        """Close database connection."""
-        if self._conn:
-            self._conn.close()
-            self._conn = None
+        """Flush queued test results and close every thread's connection."""
+        with self._conns_lock:
+            writer = None
+            if self._test_writer is not None:
+                self._ensure_test_writer()  # a dead writer would leave results unwritten
+                writer, self._test_writer = self._test_writer, None
+                self._stop_test_writer()  # enqueues _STOP_WRITER
+                self._stop_test_writer = None
+                self._test_queue = queue.Queue()  # a later writer never sees this sentinel
+        if writer is not None:
+            writer.join()
+        with self._conns_lock:
+            conns, self._conns = list(self._conns), weakref.WeakSet()
+            self._shared_conn = None
+            self._local = threading.local()  # threads reconnect on next use
+        for holder in conns:
+            try:
+                holder.conn.execute("PRAGMA optimize;")
+            except sqlite3.Error:
+                pass
+            holder.close()
+        if conns:
             logger.debug("Database connection closed")
 
     def __enter__(self):
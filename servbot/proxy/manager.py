@@ -43,9 +43,10 @@ class ProxyManager:
         """
         self._providers: Dict[str, ProxyProvider] = {}
         self._meter = ProxyMeter() if enable_metering else None
-        self._concurrency_locks: Dict[str, threading.Semaphore] = {}
+        # Active slot counts for providers with a concurrency limit; one lock
+        # covers the limit check and the update
         self._active_counts: Dict[str, int] = {}
-        self._count_locks: Dict[str, threading.Lock] = {}
+        self._slots_lock = threading.Lock()
 
         logger.info("Initializing ProxyManager with %d provider configs", len(configs))
 
@@ -56,9 +57,7 @@ class ProxyManager:
 
                 # Setup concurrency tracking
                 if cfg.concurrency_limit:
-                    self._concurrency_locks[cfg.name] = threading.Semaphore(cfg.concurrency_limit)
                     self._active_counts[cfg.name] = 0
-                    self._count_locks[cfg.name] = threading.Lock()
                     logger.info(
                         "Provider loaded with concurrency limit: name=%s type=%s limit=%d",
                         cfg.name,
@@ -81,6 +80,14 @@ class ProxyManager:
                 logger.error("Failed to load provider %s: %s", cfg.name, e, exc_info=True)
                 raise
 
+        # Providers are fixed after construction, so auto-selection can use a
+        # precomputed cheapest provider (first one wins on equal prices)
+        self._cheapest: Optional[ProxyProvider] = min(
+            self._providers.values(),
+            key=lambda p: (p.config.price_per_gb if p.config.price_per_gb is not None else 1e9),
+            default=None,
+        )
+
         logger.info("ProxyManager initialized successfully with %d providers", len(self._providers))
 
     def _build_provider(self, cfg: ProviderConfig) -> ProxyProvider:
@@ -130,27 +137,30 @@ class ProxyManager:
             )
         else:
             # Auto-select cheapest provider
-            candidates = sorted(
-                self._providers.values(),
-                key=lambda p: (p.config.price_per_gb if p.config.price_per_gb is not None else 1e9),
-            )
-            if not candidates:
+            cheapest = self._cheapest
+            if cheapest is None:
                 logger.error("No proxy providers configured")
                 raise RuntimeError("No proxy providers configured")
 
-            provider_name = candidates[0].config.name
+            provider_name = cheapest.config.name
             logger.debug(
                 "Auto-selected cheapest provider: name=%s price_per_gb=%s",
                 provider_name,
-                f"${candidates[0].config.price_per_gb}" if candidates[0].config.price_per_gb else "N/A",
+                f"${cheapest.config.price_per_gb}" if cheapest.config.price_per_gb else "N/A",
             )
 
         # Check and acquire concurrency slot
-        if provider_name in self._concurrency_locks:
-            lock = self._concurrency_locks[provider_name]
-            if not lock.acquire(blocking=False):
-                with self._count_locks[provider_name]:
-                    active = self._active_counts[provider_name]
+        limited = provider_name in self._active_counts
+        if limited:
+            with self._slots_lock:
+                active = self._active_counts[provider_name]
+                if active < self._providers[provider_name].config.concurrency_limit:
+                    active += 1
+                    self._active_counts[provider_name] = active
+                    acquired = True
+                else:
+                    acquired = False
+            if not acquired:
                 logger.warning(
                     "Concurrency limit reached for provider: name=%s active=%d",
                     provider_name,
@@ -159,14 +169,7 @@ class ProxyManager:
                 raise RuntimeError(
                     f"Concurrency limit reached for provider {provider_name} (active: {active})"
                 )
-
-            with self._count_locks[provider_name]:
-                self._active_counts[provider_name] += 1
-                logger.debug(
-                    "Acquired concurrency slot: provider=%s active=%d",
-                    provider_name,
-                    self._active_counts[provider_name],
-                )
+            logger.debug("Acquired concurrency slot: provider=%s active=%d", provider_name, active)
 
         try:
             # Acquire from provider
@@ -191,10 +194,8 @@ class ProxyManager:
 
         except Exception as e:
             # Release concurrency slot on error
-            if provider_name in self._concurrency_locks:
-                self._concurrency_locks[provider_name].release()
-                with self._count_locks[provider_name]:
-                    self._active_counts[provider_name] -= 1
+            if limited:
+                self._release_slot(provider_name)
 
             logger.error(
                 "Failed to acquire proxy from provider %s: %s",
@@ -234,15 +235,9 @@ class ProxyManager:
             self._meter.record_release(endpoint, reason=reason)
 
         # Release concurrency slot
-        if provider_name in self._concurrency_locks:
-            self._concurrency_locks[provider_name].release()
-            with self._count_locks[provider_name]:
-                self._active_counts[provider_name] -= 1
-                logger.debug(
-                    "Released concurrency slot: provider=%s active=%d",
-                    provider_name,
-                    self._active_counts[provider_name],
-                )
+        if provider_name in self._active_counts:
+            active = self._release_slot(provider_name)
+            logger.debug("Released concurrency slot: provider=%s active=%d", provider_name, active)
 
         logger.info(
             "Proxy released: provider=%s host=%s:%d session=%s reason=%s",
@@ -253,6 +248,13 @@ class ProxyManager:
             reason or "normal",
         )
 
+    def _release_slot(self, provider_name: str) -> int:
+        """Frees one concurrency slot and returns the new active count."""
+        with self._slots_lock:
+            active = max(self._active_counts[provider_name] - 1, 0)
+            self._active_counts[provider_name] = active
+        return active
+
     def get_meter(self) -> Optional[ProxyMeter]:
         """Get the meter instance for usage tracking.
 
@@ -281,9 +283,9 @@ class ProxyManager:
             }
 
             if name in self._active_counts:
-                with self._count_locks[name]:
-                    provider_stats["active_connections"] = self._active_counts[name]
-                    stats["total_active"] += self._active_counts[name]
+                active = self._active_counts[name]
+                provider_stats["active_connections"] = active
+                stats["total_active"] += active
 
             stats["providers"][name] = provider_stats
 
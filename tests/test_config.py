@@ -8,12 +8,20 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from servbot.config import load_cerebras_key, get_data_dir
+from servbot.config import (
+    load_cerebras_key, load_flashmail_card, load_graph_account, get_data_dir, clear_config_cache,
+)
 
 
 class TestConfig(unittest.TestCase):
     """Test cases for configuration functions."""
 
+    def setUp(self):
+        clear_config_cache()
+
+    def tearDown(self):
+        clear_config_cache()
+
     def test_get_data_dir(self):
         """Test getting data directory path."""
         data_dir = get_data_dir()
@@ -47,6 +55,24 @@ class TestConfig(unittest.TestCase):
         key = load_cerebras_key()
         self.assertIsNone(key)
 
+    @patch('pathlib.Path.exists', return_value=True)
+    @patch('pathlib.Path.read_text', return_value='CEREBRAS_KEY = "k1"\nFLASHMAIL_CARD = \'card-2\'\n')
+    def test_ai_api_file_read_once(self, mock_read, mock_exists):
+        """Multiple loaders share one parse of data/ai.api."""
+        self.assertEqual(load_cerebras_key(), "k1")
+        self.assertEqual(load_flashmail_card(), "card-2")
+        self.assertEqual(mock_read.call_count, 1)
+
+
+    @patch('servbot.data.database.ensure_db')
+    @patch('servbot.data.database.get_first_graph_account')
+    def test_graph_account_cached_but_copied(self, mock_first, _ensure):
+        """Callers get their own dict, so mutating it cannot corrupt the cache."""
+        mock_first.return_value = {"email": "g@example.com", "refresh_token": "rt", "client_id": "cid"}
+        load_graph_account()["refresh_token"] = "changed"
+        self.assertEqual(load_graph_account()["refresh_token"], "rt")
+        mock_first.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -22,6 +22,7 @@ class TestDatabase(unittest.TestCase):
 
     def tearDown(self):
         """Remove the test database file after each test."""
+        db.close_db()
         if os.path.exists(TEST_DB_PATH):
             os.remove(TEST_DB_PATH)
 
@@ -35,6 +36,8 @@ class TestDatabase(unittest.TestCase):
         self.assertIn("messages", tables)
         self.assertIn("verifications", tables)
         self.assertIn("graph_accounts", tables)
+        self.assertIn("event_log", tables)
+        self.assertEqual(db._connect().execute("PRAGMA user_version").fetchone()[0], db.SCHEMA_VERSION)
 
     def test_02_upsert_account(self):
         acc_id = db.upsert_account(email="test@example.com", password="password", source="test")
@@ -49,6 +52,31 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(len(accounts), 1)
         self.assertEqual(accounts[0]['password'], "new_password")
 
+    def test_02c_combined_flashmail_password_split(self):
+        db.upsert_account(email="combo@example.com", password="pw ---- rt ---- cid")
+        acc = db.get_account("combo@example.com")
+        self.assertEqual((acc["password"], acc["refresh_token"], acc["client_id"]), ("pw", "rt", "cid"))
+        db.upsert_account(email="combo@example.com", password="pw2----x----y", refresh_token="keep",
+                          update_only_if_provided=True)
+        acc = db.get_account("combo@example.com")
+        self.assertEqual((acc["password"], acc["refresh_token"], acc["client_id"]), ("pw2", "keep", "y"))
+
+    def test_02a_raw_rows_match_dicts(self):
+        db.upsert_account(email="raw@example.com", password="pw", source="test")
+        raw = db._get_accounts_raw()
+        self.assertEqual(raw[0]["email"], "raw@example.com")
+        self.assertEqual([dict(r) for r in raw], db.get_accounts())
+        self.assertEqual(db.get_account_emails(), ["raw@example.com"])
+        self.assertEqual(db.get_account_emails(source="other"), [])
+
+    def test_02b_get_account_case_insensitive(self):
+        db.upsert_account(email="Mixed@Example.com", password="pw", refresh_token="rt", client_id="cid")
+        acc = db.get_account("mixed@example.COM")
+        self.assertIsNotNone(acc)
+        self.assertEqual(acc['email'], "Mixed@Example.com")
+        self.assertIsNone(db.get_account("missing@example.com"))
+        self.assertEqual(db.get_first_graph_account()['refresh_token'], "rt")
+
     def test_03_save_message_and_verification(self):
         msg_id = db.save_message(
             mailbox="test@example.com", provider="imap", provider_msg_id="123",
@@ -63,12 +91,94 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(len(verifs), 1)
         self.assertEqual(verifs[0]['value'], "12345")
 
+    def test_03b_save_message_upsert_returns_same_id(self):
+        first = db.save_message(mailbox="dup@example.com", provider="graph", provider_msg_id="m1", subject="A")
+        second = db.save_message(mailbox="dup@example.com", provider="graph", provider_msg_id="m1", subject="B")
+        self.assertGreater(first, 0)
+        self.assertEqual(first, second)
+
+    def test_03b2_save_messages_bulk(self):
+        rows = [
+            {"mailbox": "bulk@example.com", "provider": "imap", "provider_msg_id": str(i), "body_text": "x"}
+            for i in range(3)
+        ]
+        rows.append({"mailbox": "", "provider": "imap", "provider_msg_id": "skipped"})
+        self.assertEqual(db.save_messages_bulk(rows), 3)
+        self.assertEqual(db.save_messages_bulk(rows[:1]), 1)  # upsert, no duplicate
+        count = db._connect().execute(
+            "SELECT COUNT(*) FROM messages WHERE mailbox = 'bulk@example.com'"
+        ).fetchone()[0]
+        self.assertEqual(count, 3)
+
+    def test_03b3_message_preview(self):
+        limit = db.DEFAULT_MESSAGE_PREVIEW_LENGTH
+        self.assertEqual(db._message_preview("  line1\r\nline2 \n "), "line1  line2")
+        self.assertEqual(db._message_preview("\n" + "a" * (limit + 50)), "a" * limit)
+        self.assertEqual(db._message_preview("b" * (limit - 1) + "   \n\n"), "b" * (limit - 1))
+        self.assertEqual(db._message_preview(" \r\n "), "")
+
+    def test_03c_credential_cache_invalidated_on_upsert(self):
+        from servbot.config import load_account_credentials
+        db.upsert_account(email="Cache@Example.com", refresh_token="rt1", client_id="cid")
+        self.assertEqual(load_account_credentials("cache@example.com")["refresh_token"], "rt1")
+        db.upsert_account(email="Cache@Example.com", refresh_token="rt2", client_id="cid",
+                          update_only_if_provided=True)
+        self.assertEqual(load_account_credentials("CACHE@example.com ")["refresh_token"], "rt2")
+
     def test_04_graph_account(self):
         self.assertIsNone(db.get_graph_account())
         db.upsert_graph_account(email="graph@example.com", refresh_token="abc", client_id="123")
         acct = db.get_graph_account()
         self.assertIsNotNone(acct)
         self.assertEqual(acct['email'], "graph@example.com")
+        db.upsert_graph_account(email="graph2@example.com", refresh_token="def", client_id="456")
+        self.assertEqual(db.get_graph_account()['email'], "graph2@example.com")  # cache invalidated
+
+    def test_04b_migrate_graph_accounts(self):
+        db.upsert_account(email="existing@example.com", password="pw")
+        db.upsert_account(email="has_creds@example.com", refresh_token="keep", client_id="cid")
+        for email in ("existing@example.com", "has_creds@example.com", "new@example.com"):
+            db.upsert_graph_account(email=email, refresh_token="rt-" + email, client_id="gcid")
+
+        db.migrate_graph_accounts_to_accounts()
+
+        self.assertEqual(db.get_account("existing@example.com")["refresh_token"], "rt-existing@example.com")
+        self.assertEqual(db.get_account("has_creds@example.com")["refresh_token"], "keep")
+        self.assertEqual(db.get_account("new@example.com")["source"], "migrated")
+        self.assertEqual(db.get_account("new@example.com")["type"], "other")
+
+    def test_04c_single_default_flashmail_card(self):
+        for alias in ("a", "b", "c"):
+            db.add_flashmail_card(alias)
+        for alias in ("b", "c", "c", "a"):
+            db.set_default_flashmail_card(alias)
+        defaults = [c["alias"] for c in db.list_flashmail_cards() if c["is_default"]]
+        self.assertEqual(defaults, ["a"])
+        with self.assertRaises(db.sqlite3.IntegrityError):
+            db._connect().execute("UPDATE flashmail_cards SET is_default = 1 WHERE alias = 'b'")
+
+    def test_04d_update_flashmail_balances_bulk(self):
+        db.add_flashmail_card("a")
+        db.add_flashmail_card("b")
+        updated = db.update_flashmail_balances_bulk([("a", 5, "2026-01-01T00:00:00Z"), ("b", 9, None), ("gone", 1, None)])
+        self.assertEqual(updated, 2)
+        cards = {c["alias"]: c for c in db.list_flashmail_cards()}
+        self.assertEqual((cards["a"]["last_known_balance"], cards["a"]["last_checked_at"]), (5, "2026-01-01T00:00:00Z"))
+        self.assertEqual(cards["b"]["last_known_balance"], 9)
+        self.assertIsNotNone(cards["b"]["last_checked_at"])
+
+    def test_04e_flashmail_cards_for_pick(self):
+        for alias in ("a", "b", "c", "d"):
+            db.add_flashmail_card(alias)
+        db.set_default_flashmail_card("c")
+        db.update_flashmail_balances_bulk([
+            ("a", 1, None),                      # fresh, too small -> filtered out
+            ("b", 9, None),                      # fresh, enough
+            ("c", 0, None),                      # fresh, too small, but the default fallback
+            ("d", 0, "2000-01-01T00:00:00Z"),    # stale
+        ])
+        rows = db.get_flashmail_cards_for_pick(5, 60)
+        self.assertEqual([(r["alias"], r["is_fresh"]) for r in rows], [("c", 1), ("b", 1), ("d", 0)])
 
     def test_05_find_verification(self):
         msg_id = db.save_message(mailbox="find@test.com", provider="test", provider_msg_id="1")
@@ -78,6 +188,28 @@ class TestDatabase(unittest.TestCase):
         self.assertIsNotNone(found)
         self.assertEqual(found['value'], "111222")
         self.assertIsNone(db.find_verification(service="OtherService"))
+        self.assertIsNotNone(db.find_verification(service="myservice"))
+        self.assertIsNone(db.find_verification(service="My"))
+        self.assertIsNotNone(db.find_verification(service="Serv", exact=False))
+
+    def test_05b_connection_reused_with_wal(self):
+        conn = db._connect()
+        self.assertIs(conn, db._connect())
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+        conn.close()  # legacy callers' close() leaves the shared connection usable
+        self.assertEqual(db.get_accounts(), [])
+
+    def test_05c_thread_connection_closed_on_thread_exit(self):
+        import gc
+        import threading
+        opened = []
+        worker = threading.Thread(target=lambda: opened.append(db._connect()))
+        worker.start()
+        worker.join()
+        gc.collect()
+        with self.assertRaises(db.sqlite3.ProgrammingError):  # closed with its thread
+            opened[0].execute("SELECT 1")
 
     def test_06_migrate_email_txt(self):
         # Temporarily create a dummy email.txt
@@ -98,5 +230,14 @@ class TestDatabase(unittest.TestCase):
             elif dummy_path.exists():
                 os.remove(dummy_path)
 
+    def test_06b_iter_legacy_lines(self):
+        content = "# comment\na@outlook.com----pw----rt----cid\nb@x.com:pw:hotmail\nbad\n"
+        rows = list(db._iter_legacy_lines(content))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0][0][:4], ("a@outlook.com", "pw", "outlook", "file"))
+        self.assertEqual(rows[0][1], ("a@outlook.com", "rt", "cid"))
+        self.assertEqual(rows[1][0][2], "hotmail")
+        self.assertIsNone(rows[1][1])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -14,9 +14,10 @@ class TestEventLogger(unittest.TestCase):
         if TEST_DB_PATH.exists():
             TEST_DB_PATH.unlink()
         db.DB_PATH = TEST_DB_PATH
-        db.init_db()  # create base schema; event_log created lazily by elog
+        db.init_db()  # base schema, including event_log
 
     def tearDown(self):
+        db.close_db()
         if TEST_DB_PATH.exists():
             TEST_DB_PATH.unlink()
 
@@ -42,5 +43,12 @@ class TestEventLogger(unittest.TestCase):
         self.assertGreaterEqual(stats['by_status'].get('success', 0), 2)
         self.assertGreaterEqual(stats['by_status'].get('error', 0), 1)
 
+    def test_details_json_compact(self):
+        elog.log_event('note', details={'name': 'café', 'n': 1})
+        elog.log_event('empty')
+        rows = {r['event_type']: r['details_json'] for r in elog.get_recent_events(5)}
+        self.assertEqual(rows['note'], '{"name":"café","n":1}')
+        self.assertEqual(rows['empty'], '{}')
+
 if __name__ == '__main__':
     unittest.main()
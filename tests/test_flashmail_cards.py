@@ -0,0 +1,92 @@
+"""Tests for Flashmail card selection."""
+
+import threading
+import unittest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from servbot import flashmail_cards
+
+
+CARDS = [
+    {"alias": "a", "is_default": 1, "last_known_balance": 0, "is_fresh": 0},
+    {"alias": "b", "is_default": 0, "last_known_balance": 0, "is_fresh": 0},
+    {"alias": "c", "is_default": 0, "last_known_balance": 0, "is_fresh": 0},
+]
+
+
+class TestPickCard(unittest.TestCase):
+    """Test cases for pick_card."""
+
+    @patch('servbot.flashmail_cards.ensure_db')
+    @patch('servbot.flashmail_cards.db_update_balances_bulk')
+    @patch('servbot.flashmail_cards.db_cards_for_pick', return_value=CARDS)
+    def test_balances_fetched_concurrently(self, _list, mock_update, _ensure):
+        """All balance requests are in flight together; results are written in one batch."""
+        barrier = threading.Barrier(len(CARDS), timeout=5)
+        balances = {"a": 1, "b": 7, "c": None}
+
+        def fetch(alias):
+            barrier.wait()  # deadlocks (BrokenBarrierError) if fetched serially
+            return balances[alias]
+
+        with patch('servbot.flashmail_cards._fetch_balance', side_effect=fetch):
+            self.assertEqual(flashmail_cards.pick_card(min_required_credits=2), "b")
+
+        mock_update.assert_called_once()
+        self.assertIn("b", [item[0] for item in mock_update.call_args.args[0]])
+
+    @patch('servbot.flashmail_cards.ensure_db')
+    @patch('servbot.flashmail_cards.db_update_balances_bulk')
+    @patch('servbot.flashmail_cards.db_cards_for_pick', return_value=CARDS)
+    def test_falls_back_to_default(self, _list, _update, _ensure):
+        """With no card meeting the requirement the default alias is returned."""
+        with patch('servbot.flashmail_cards._fetch_balance', return_value=0):
+            self.assertEqual(flashmail_cards.pick_card(min_required_credits=5), "a")
+
+
+    @patch('servbot.flashmail_cards.ensure_db')
+    @patch('servbot.flashmail_cards.db_update_balances_bulk')
+    def test_fresh_balances_skip_refresh(self, mock_update, _ensure):
+        """Recently checked balances that already suffice are not re-fetched."""
+        cards = [
+            {"alias": "a", "is_default": 1, "last_known_balance": 9, "is_fresh": 0},
+            {"alias": "b", "is_default": 0, "last_known_balance": 5, "is_fresh": 1},
+        ]
+        with patch('servbot.flashmail_cards.db_cards_for_pick', return_value=cards), \
+                patch('servbot.flashmail_cards._fetch_balance', return_value=0) as mock_fetch:
+            self.assertEqual(flashmail_cards.pick_card(min_required_credits=3), "b")
+            mock_fetch.assert_not_called()
+
+            cards[1]["is_fresh"] = 0  # nothing fresh is sufficient now
+            self.assertEqual(flashmail_cards.pick_card(min_required_credits=3), "a")
+            self.assertEqual(sorted(c.args[0] for c in mock_fetch.call_args_list), ["a", "b"])
+
+            cards[0]["is_fresh"] = 1
+            mock_fetch.reset_mock()
+            self.assertEqual(flashmail_cards.pick_card(min_required_credits=3), "a")
+            mock_fetch.assert_not_called()
+
+    @patch('servbot.flashmail_cards.ensure_db')
+    @patch('servbot.flashmail_cards.db_update_balances_bulk')
+    @patch('servbot.flashmail_cards.db_cards_for_pick', return_value=CARDS)
+    def test_first_sufficient_card_wins(self, _list, mock_update, _ensure):
+        """The search stops at the first card reporting enough credits."""
+        release = threading.Event()
+
+        def fetch(alias):
+            if alias != "c":
+                release.wait(5)  # a and b only answer after the result is in
+            return 4
+
+        with patch('servbot.flashmail_cards._fetch_balance', side_effect=fetch):
+            self.assertEqual(flashmail_cards.pick_card(min_required_credits=3), "c")
+        release.set()
+        self.assertEqual(mock_update.call_args.args[0][0][:2], ("c", 4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Tests for the Flashmail API client."""
+
+import unittest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from servbot.clients.flashmail import FlashmailClient
+
+
+class TestFlashmailClient(unittest.TestCase):
+    """Test cases for FlashmailClient."""
+
+    @patch('servbot.clients.flashmail._http_get')
+    def test_fetch_accounts_inventory_short_circuit(self, mock_get):
+        """Sold-out inventory raises before the fetch request is issued."""
+        client = FlashmailClient("card")
+
+        with self.assertRaises(RuntimeError):
+            client.fetch_accounts(1, "outlook", inventory={"outlook": 0, "hotmail": 5})
+
+        mock_get.assert_not_called()
+
+    @patch('servbot.clients.flashmail._http_get')
+    def test_fetch_accounts_check_inventory(self, mock_get):
+        """check_inventory queries /kucun once, then fetches accounts."""
+        mock_get.side_effect = [
+            (200, '{"outlook": 3, "hotmail": 0}', {}),
+            (200, "user@outlook.com----pw", {}),
+        ]
+        client = FlashmailClient("card")
+
+        accounts = client.fetch_accounts(1, "outlook", check_inventory=True)
+
+        self.assertEqual(len(accounts), 1)
+        self.assertEqual(accounts[0].email, "user@outlook.com")
+        self.assertEqual(mock_get.call_args_list[0].args[0], "/kucun")
+
+
+if __name__ == "__main__":
+    unittest.main()
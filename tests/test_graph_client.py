@@ -1,20 +1,34 @@
 """Tests for Microsoft Graph API client."""
 
+import io
+import json
 import unittest
+from datetime import datetime, timedelta, timezone
 from unittest.mock import Mock, patch, MagicMock
 import sys
+from urllib.parse import parse_qs, urlsplit
 from pathlib import Path
 
+import requests
+
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from servbot.clients.graph import GraphClient
+from servbot.clients import graph as graph_module
+from servbot.clients.graph import GraphClient, GraphThrottled
 from servbot.core.models import EmailMessage
 
 
+def _encode(payload):
+    return json.dumps(payload).encode("utf-8")
+
+
 class TestGraphClient(unittest.TestCase):
     """Test cases for GraphClient."""
 
+    def setUp(self):
+        graph_module._TOKEN_CACHE.clear()
+
     def test_init(self):
         """Test GraphClient initialization."""
         client = GraphClient("test_token", "refresh_token", "client_id")
@@ -22,13 +36,13 @@ class TestGraphClient(unittest.TestCase):
         self.assertEqual(client.refresh_token, "refresh_token")
         self.assertEqual(client.client_id, "client_id")
 
-    @patch('servbot.clients.graph.requests')
-    def test_fetch_messages_success(self, mock_requests):
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_success(self, mock_session):
         """Test successful message fetching."""
         # Setup mock response
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = _encode({
             "value": [
                 {
                     "id": "msg1",
@@ -47,9 +61,9 @@ class TestGraphClient(unittest.TestCase):
                     "isRead": False
                 }
             ]
-        }
+        })
         mock_response.raise_for_status = Mock()
-        mock_requests.get.return_value = mock_response
+        mock_session.get.return_value = mock_response
 
         client = GraphClient("test_token")
         messages = client.fetch_messages()
@@ -58,62 +72,242 @@ class TestGraphClient(unittest.TestCase):
         self.assertEqual(messages[0].subject, "Test Subject")
         self.assertEqual(messages[0].from_addr, "test@example.com")
         self.assertEqual(messages[0].provider, "graph")
-
-    @patch('servbot.clients.graph.requests')
-    def test_fetch_messages_empty(self, mock_requests):
+        self.assertEqual(messages[0].received_date, "2025-01-01T12:00:00Z")
+        self.assertEqual(
+            messages[0].received_at,
+            datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc),
+        )
+
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_empty(self, mock_session):
         """Test fetching when no messages exist."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"value": []}
+        mock_response.content = _encode({"value": []})
         mock_response.raise_for_status = Mock()
-        mock_requests.get.return_value = mock_response
+        mock_session.get.return_value = mock_response
 
         client = GraphClient("test_token")
         messages = client.fetch_messages()
 
         self.assertEqual(len(messages), 0)
 
-    @patch('servbot.clients.graph.requests')
-    def test_fetch_messages_error(self, mock_requests):
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_follows_next_link(self, mock_session):
+        """Pages are followed via @odata.nextLink until the limit is reached."""
+        def page(ids, next_link=None):
+            resp = Mock(status_code=200, raise_for_status=Mock())
+            data = {"value": [{"id": i, "subject": i} for i in ids]}
+            if next_link:
+                data["@odata.nextLink"] = next_link
+            resp.content = _encode(data)
+            return resp
+
+        mock_session.get.side_effect = [
+            page(["a", "b"], "https://graph.example/next1"),
+            page(["c", "d"], "https://graph.example/next2"),
+        ]
+
+        client = GraphClient("test_token")
+        messages = client.fetch_messages(limit=3)
+
+        self.assertEqual([m.message_id for m in messages], ["a", "b", "c"])
+        self.assertEqual(mock_session.get.call_count, 2)
+        self.assertEqual(mock_session.get.call_args.args[0], "https://graph.example/next1")
+
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_select_body_only_on_request(self, mock_session):
+        """The list call skips the full body unless include_body is set."""
+        mock_response = Mock(status_code=200, raise_for_status=Mock())
+        mock_response.content = _encode({"value": []})
+        mock_session.get.return_value = mock_response
+
+        def selected_fields():
+            query = parse_qs(urlsplit(mock_session.get.call_args.args[0]).query)
+            return query["$select"][0].split(",")
+
+        client = GraphClient("test_token")
+        client.fetch_messages()
+        self.assertNotIn("body", selected_fields())
+
+        mock_response.raw = io.BytesIO(b'{"value": []}')
+        client.fetch_messages(include_body=True)
+        self.assertIn("body", selected_fields())
+
+    @unittest.skipUnless(graph_module.ijson, "ijson not installed")
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_streams_full_bodies(self, mock_session):
+        """Full-body pages are parsed incrementally from the raw stream."""
+        payload = {
+            "value": [
+                {
+                    "id": "msg1",
+                    "subject": "Code",
+                    "body": {"content": "<p>Your code is 123456</p>", "contentType": "html"},
+                    "isRead": False,
+                }
+            ]
+        }
+        mock_response = Mock(status_code=200, raise_for_status=Mock())
+        mock_response.raw = io.BytesIO(json.dumps(payload).encode("utf-8"))
+        mock_session.get.return_value = mock_response
+
+        client = GraphClient("test_token")
+        messages = client.fetch_messages(include_body=True)
+
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].body_text, "Your code is 123456")
+        mock_response.json.assert_not_called()
+        self.assertTrue(mock_session.get.call_args.kwargs["stream"])
+
+    @unittest.skipUnless(graph_module.ijson, "ijson not installed")
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_stream_errors_return_empty(self, mock_session):
+        """A truncated or dropped streamed page is logged and yields [] like a bad non-stream body."""
+        from urllib3.exceptions import ProtocolError
+
+        dropped = Mock()
+        dropped.read.side_effect = ProtocolError("Connection broken")
+        for raw in (io.BytesIO(b'{"value": [{"id": "msg1", "subj'), dropped):
+            mock_response = Mock(status_code=200, raise_for_status=Mock())
+            mock_response.raw = raw
+            mock_session.get.return_value = mock_response
+
+            with self.assertLogs(graph_module.logger, "WARNING"):
+                self.assertEqual(GraphClient("test_token").fetch_messages(include_body=True), [])
+
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_small_body_page_not_streamed(self, mock_session):
+        """Full-body pages below the streaming threshold are decoded in one go."""
+        payload = {"value": [{"id": "msg1", "body": {"content": "code 42", "contentType": "text"}}]}
+        mock_response = Mock(status_code=200, raise_for_status=Mock(), headers={"Content-Length": "90"})
+        mock_response.content = _encode(payload)
+        del mock_response.raw  # reading the raw stream would raise AttributeError
+        mock_session.get.return_value = mock_response
+
+        messages = GraphClient("test_token").fetch_messages(include_body=True)
+
+        self.assertEqual([m.message_id for m in messages], ["msg1"])
+
+    def test_fetch_many_isolates_failures(self):
+        """One failing mailbox does not hide the others' messages."""
+        good = GraphClient("t1", mailbox="good@example.com")
+        bad = GraphClient("t2", mailbox="bad@example.com")
+        message = EmailMessage("m1", "graph", "good@example.com", "Code", "a@b.c", "")
+
+        with patch.object(good, 'fetch_messages', return_value=[message]) as good_fetch, \
+                patch.object(bad, 'fetch_messages', side_effect=GraphThrottled(5)):
+            results = GraphClient.fetch_many([good, bad], unseen_only=False)
+
+        self.assertEqual(results, {"good@example.com": [message], "bad@example.com": []})
+        good_fetch.assert_called_once_with(unseen_only=False)
+
+    def test_to_email_message_tolerates_null_properties(self):
+        """Null ``from``/``body`` properties fall back to empty values."""
+        client = GraphClient("test_token", mailbox="me@example.com")
+        msg = client._to_email_message(
+            {"id": "m1", "from": None, "body": None, "bodyPreview": "preview", "isRead": True}
+        )
+
+        self.assertEqual(msg.from_addr, "")
+        self.assertEqual(msg.body_text, "preview")
+        self.assertIs(msg.is_read, True)
+        self.assertEqual(msg.mailbox, "me@example.com")
+
+    def test_build_list_url(self):
+        """The list URL carries the encoded OData query and is cached."""
+        url = graph_module._build_list_url("inbox", True, 25, "2025-01-01T00:00:00Z", False)
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+
+        self.assertTrue(parts.path.endswith("/me/mailFolders/inbox/messages"))
+        self.assertEqual(query["$top"], ["25"])
+        self.assertEqual(
+            query["$filter"], ["isRead eq false and receivedDateTime ge 2025-01-01T00:00:00Z"]
+        )
+        self.assertIs(url, graph_module._build_list_url("inbox", True, 25, "2025-01-01T00:00:00Z", False))
+
+    def test_format_since(self):
+        """Since filters are rendered as second-precision UTC timestamps."""
+        naive = datetime(2025, 1, 1, 12, 30, 15, 999999)
+        aware = datetime(2025, 1, 1, 14, 30, 15, tzinfo=timezone(timedelta(hours=2)))
+
+        self.assertEqual(graph_module._format_since(naive), "2025-01-01T12:30:15Z")
+        self.assertEqual(graph_module._format_since(aware), "2025-01-01T12:30:15Z")
+
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_error(self, mock_session):
         """Test error handling in fetch_messages."""
-        mock_requests.get.side_effect = Exception("Network error")
+        mock_session.get.side_effect = requests.ConnectionError("Network error")
 
         client = GraphClient("test_token")
         messages = client.fetch_messages()
 
         self.assertEqual(len(messages), 0)
 
-    @patch('servbot.clients.graph.requests')
-    def test_mark_as_read_success(self, mock_requests):
+    @patch.object(GraphClient, '_session')
+    def test_fetch_messages_throttled(self, mock_session):
+        """A 429 that survives the session retries raises GraphThrottled."""
+        mock_session.get.return_value = Mock(status_code=429, headers={"Retry-After": "7"})
+
+        client = GraphClient("test_token")
+        with self.assertRaises(GraphThrottled) as ctx:
+            client.fetch_messages()
+
+        self.assertEqual(ctx.exception.retry_after, 7.0)
+
+    @patch.object(GraphClient, '_session')
+    def test_mark_as_read_success(self, mock_session):
         """Test marking message as read."""
         mock_response = Mock()
         mock_response.status_code = 200
         mock_response.raise_for_status = Mock()
-        mock_requests.patch.return_value = mock_response
+        mock_session.patch.return_value = mock_response
 
         client = GraphClient("test_token")
         result = client.mark_as_read("msg_id")
 
         self.assertTrue(result)
 
-    @patch('servbot.clients.graph.requests')
-    def test_mark_as_read_failure(self, mock_requests):
+    @patch.object(GraphClient, '_session')
+    def test_mark_as_read_failure(self, mock_session):
         """Test failure in marking message as read."""
-        mock_requests.patch.side_effect = Exception("Error")
+        mock_session.patch.side_effect = Exception("Error")
 
         client = GraphClient("test_token")
         result = client.mark_as_read("msg_id")
 
         self.assertFalse(result)
 
-    @patch('servbot.clients.graph.requests')
-    def test_refresh_access_token_success(self, mock_requests):
+    @patch.object(GraphClient, '_session')
+    def test_mark_many_as_read_batches(self, mock_session):
+        """Messages are marked read in $batch chunks of 20."""
+        def batch_response(*args, **kwargs):
+            reqs = kwargs["json"]["requests"]
+            resp = Mock(status_code=200, raise_for_status=Mock())
+            resp.content = _encode({
+                "responses": [{"id": r["id"], "status": 200} for r in reqs]
+            })
+            return resp
+
+        mock_session.post.side_effect = batch_response
+        ids = [f"m{i}" for i in range(25)]
+
+        client = GraphClient("test_token")
+        result = client.mark_many_as_read(ids)
+
+        self.assertEqual(mock_session.post.call_count, 2)
+        self.assertTrue(all(result[mid] for mid in ids))
+        mock_session.patch.assert_not_called()
+
+    @patch.object(GraphClient, '_session')
+    def test_refresh_access_token_success(self, mock_session):
         """Test successful token refresh."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"access_token": "new_token"}
+        mock_response.content = _encode({"access_token": "new_token"})
         mock_response.raise_for_status = Mock()
-        mock_requests.post.return_value = mock_response
+        mock_session.post.return_value = mock_response
 
         client = GraphClient("old_token", "refresh_token", "client_id")
         new_token = client.refresh_access_token()
@@ -121,38 +315,117 @@ class TestGraphClient(unittest.TestCase):
         self.assertEqual(new_token, "new_token")
         self.assertEqual(client.access_token, "new_token")
 
-    @patch('servbot.clients.graph.requests')
-    def test_refresh_access_token_no_credentials(self, mock_requests):
+    @patch.object(GraphClient, '_session')
+    def test_refresh_body_follows_rotation(self, mock_session):
+        """The pre-encoded refresh body is rebuilt when the refresh token rotates."""
+        mock_response = Mock(raise_for_status=Mock())
+        mock_response.content = _encode({"access_token": "new", "refresh_token": "rotated"})
+        mock_session.post.return_value = mock_response
+
+        client = GraphClient("old_token", "refresh_token", "client_id")
+        client.refresh_access_token()
+        first_body = parse_qs(mock_session.post.call_args.kwargs["data"].decode("ascii"))
+        client.refresh_access_token()
+        second_body = parse_qs(mock_session.post.call_args.kwargs["data"].decode("ascii"))
+
+        self.assertEqual(first_body["refresh_token"], ["refresh_token"])
+        self.assertEqual(second_body["refresh_token"], ["rotated"])
+        self.assertEqual(second_body["grant_type"], ["refresh_token"])
+
+    @patch.object(graph_module, 'TOKEN_CACHE_MAX_ENTRIES', 3)
+    @patch.object(GraphClient, '_session')
+    def test_token_cache_bounded_across_rotations(self, mock_session):
+        """Repeated rotations evict the oldest token cache entries."""
+        client = GraphClient("old_token", "rt0", "client_id")
+        for n in range(1, 6):
+            mock_session.post.return_value = Mock(
+                raise_for_status=Mock(), content=_encode({"access_token": f"at{n}", "refresh_token": f"rt{n}"})
+            )
+            client.refresh_access_token()
+
+        self.assertEqual(len(graph_module._TOKEN_CACHE), 3)
+        self.assertIsNone(graph_module._cached_token("client_id", "rt0"))
+        self.assertEqual(graph_module._cached_token("client_id", "rt4")[:2], ("at5", "rt5"))  # old key -> rotated
+        self.assertEqual(graph_module._cached_token("client_id", "rt5")[:2], ("at5", "rt5"))
+
+    @patch.object(GraphClient, '_persist_tokens_to_db')
+    @patch.object(GraphClient, '_session')
+    def test_rotated_refresh_token_persisted_in_background(self, mock_session, mock_persist):
+        """A rotated refresh token is written to the DB on the persist thread."""
+        mock_response = Mock(raise_for_status=Mock())
+        mock_response.content = _encode({"access_token": "new", "refresh_token": "rotated"})
+        mock_session.post.return_value = mock_response
+
+        client = GraphClient("old", "refresh_token", "client_id", mailbox="me@example.com")
+        self.assertEqual(client.refresh_access_token(), "new")
+        graph_module._PERSIST_EXECUTOR.submit(lambda: None).result()  # drain the queue
+
+        mock_persist.assert_called_once_with("new", "rotated")
+
+    @patch.object(GraphClient, '_session')
+    def test_refresh_access_token_no_credentials(self, mock_session):
         """Test token refresh without credentials."""
         client = GraphClient("token")  # No refresh token or client_id
         result = client.refresh_access_token()
 
         self.assertIsNone(result)
-        mock_requests.post.assert_not_called()
+        mock_session.post.assert_not_called()
 
-    @patch('servbot.clients.graph.requests')
-    def test_from_credentials_success(self, mock_requests):
+    @patch.object(GraphClient, '_session')
+    def test_from_credentials_success(self, mock_session):
         """Test creating client from credentials."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"access_token": "access_token"}
+        mock_response.content = _encode({"access_token": "access_token"})
         mock_response.raise_for_status = Mock()
-        mock_requests.post.return_value = mock_response
+        mock_session.post.return_value = mock_response
 
         client = GraphClient.from_credentials("refresh_token", "client_id")
 
         self.assertIsNotNone(client)
         self.assertEqual(client.access_token, "access_token")
 
-    @patch('servbot.clients.graph.requests')
-    def test_from_credentials_failure(self, mock_requests):
+    @patch.object(GraphClient, '_session')
+    def test_from_credentials_failure(self, mock_session):
         """Test creating client with invalid credentials."""
-        mock_requests.post.side_effect = Exception("Auth error")
+        mock_session.post.side_effect = Exception("Auth error")
 
         client = GraphClient.from_credentials("bad_token", "client_id")
 
         self.assertIsNone(client)
 
+    @patch.object(GraphClient, '_session')
+    def test_from_credentials_reuses_cached_token(self, mock_session):
+        """A second client for the same account skips the token endpoint."""
+        mock_response = Mock()
+        mock_response.content = _encode({"access_token": "cached", "expires_in": 3600})
+        mock_response.raise_for_status = Mock()
+        mock_session.post.return_value = mock_response
+
+        first = GraphClient.from_credentials("refresh_token", "client_id")
+        second = GraphClient.from_credentials("refresh_token", "client_id")
+
+        self.assertEqual(second.access_token, "cached")
+        self.assertIs(first.access_token, second.access_token)
+        self.assertEqual(mock_session.post.call_count, 1)
+
+    @patch.object(GraphClient, '_session')
+    def test_expired_token_refreshed_before_request(self, mock_session):
+        """An expired token is refreshed proactively instead of waiting for a 401."""
+        token_response = Mock()
+        token_response.content = _encode({"access_token": "fresh", "expires_in": 3600})
+        token_response.raise_for_status = Mock()
+        mock_session.post.return_value = token_response
+        mock_session.patch.return_value = Mock(raise_for_status=Mock())
+
+        client = GraphClient("stale", "refresh_token", "client_id", expires_at=1.0)
+        self.assertTrue(client.mark_as_read("msg_id"))
+
+        mock_session.post.assert_called_once()
+        self.assertEqual(client.access_token, "fresh")
+        headers = mock_session.patch.call_args.kwargs["headers"]
+        self.assertEqual(headers["Authorization"], "Bearer fresh")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,81 @@
+"""Tests for the batched IMAP client."""
+
+import unittest
+from unittest.mock import Mock, patch
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from servbot.clients.imap import IMAPClient, _looks_promising
+
+CODE_HEADER = b"Subject: Your verification code\r\nFrom: Svc <no-reply@svc.com>\r\nDate: Tue, 01 Apr 2025 10:00:00 +0000\r\n\r\n"
+NEWS_HEADER = b"Subject: Weekly news\r\nFrom: news@example.com\r\nDate: Tue, 01 Apr 2025 09:00:00 +0000\r\n\r\n"
+FULL_CODE = CODE_HEADER[:-2] + b"Content-Type: text/plain\r\n\r\nYour code is 123456\r\n"
+
+
+class TestIMAPClient(unittest.TestCase):
+    """Test cases for IMAPClient."""
+
+    def _conn(self):
+        conn = Mock()
+
+        def uid(command, *args):
+            if command == "SEARCH":
+                return "OK", [b"7 9"]
+            if "BODY.PEEK[]" in args[1]:
+                return "OK", [(b"2 (UID 9 BODY[] {%d}" % len(FULL_CODE), FULL_CODE), b")"]
+            return "OK", [
+                (b'1 (UID 7 FLAGS () INTERNALDATE "01-Apr-2025 09:00:00 +0000" '
+                 b"BODY[HEADER.FIELDS (SUBJECT FROM DATE)] {%d}" % len(NEWS_HEADER), NEWS_HEADER),
+                (b" BODY[TEXT]<0> {12}", b"Hello there."),
+                b")",
+                (b"2 (UID 9 FLAGS (\\Seen) BODY[HEADER.FIELDS (SUBJECT FROM DATE)] {%d}"
+                 % len(CODE_HEADER), CODE_HEADER),
+                (b" BODY[TEXT]<0> {19}", b"Your code is 123456"),
+                b' INTERNALDATE "01-Apr-2025 10:00:00 +0000")',
+            ]
+
+        conn.uid.side_effect = uid
+        return conn
+
+    def test_fetch_messages_batches_round_trips(self):
+        """One preview FETCH for all UIDs, one full FETCH for promising ones."""
+        conn = self._conn()
+        client = IMAPClient("imap.example.com", "me@example.com", "pw")
+
+        with patch.object(client, "_connect", return_value=conn):
+            messages = client.fetch_messages(unseen_only=False)
+
+        fetches = [c.args for c in conn.uid.call_args_list if c.args[0] == "FETCH"]
+        self.assertEqual(len(fetches), 2)
+        self.assertEqual(fetches[0][1], "7,9")
+        self.assertEqual(fetches[1][1], "9")
+
+        self.assertEqual([m.message_id for m in messages], ["9", "7"])
+        code, news = messages
+        self.assertEqual(code.subject, "Your verification code")
+        self.assertEqual(code.from_addr, "no-reply@svc.com")
+        self.assertIn("123456", code.body_text)
+        self.assertTrue(code.is_read)
+        self.assertEqual(code.received_at.hour, 10)
+        self.assertEqual(news.body_text, "Hello there.")
+        self.assertFalse(news.is_read)
+        conn.logout.assert_called_once()
+
+    def test_looks_promising_ignores_years(self):
+        """Footer years do not trigger a full-body download; code-shaped numbers do."""
+        self.assertFalse(_looks_promising({"header": NEWS_HEADER, "text": b"(c) 2026 Example Inc, Suite 1200"}))
+        self.assertTrue(_looks_promising({"header": NEWS_HEADER, "text": b"Use 482913 to sign in"}))
+        self.assertTrue(_looks_promising({"header": CODE_HEADER, "text": b""}))
+
+    def test_fetch_messages_error_returns_empty(self):
+        """Connection failures are logged and yield no messages."""
+        client = IMAPClient("imap.example.com", "me@example.com", "pw")
+        with patch.object(client, "_connect", side_effect=OSError("refused")):
+            self.assertEqual(client.fetch_messages(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import json
 import unittest
 from pathlib import Path
 import sys
@@ -18,6 +19,7 @@ class TestInstrumentationEvents(unittest.TestCase):
         db.init_db()
 
     def tearDown(self):
+        db.close_db()
         if TEST_DB_PATH.exists():
             TEST_DB_PATH.unlink()
 
@@ -48,5 +50,23 @@ class TestInstrumentationEvents(unittest.TestCase):
         self.assertGreaterEqual(stats['by_type'].get('registration', 0), 1)
         self.assertGreaterEqual(stats['by_type'].get('registration_update', 0), 1)
 
+    def test_wrapper_details(self):
+        self.assertEqual(db.save_message.__name__, 'save_message')
+        mid = db.save_message(mailbox='inst_det@example.com', provider='imap', provider_msg_id='d1')
+        ev = next(e for e in elog.get_recent_events(5) if e['event_type'] == 'message_save')
+        self.assertEqual(ev['service'], 'imap')
+        self.assertEqual(json.loads(ev['details_json']),
+                         {'mailbox': 'inst_det@example.com', 'provider_msg_id': 'd1', 'message_id': mid})
+
+    def test_reload_does_not_stack_wrappers(self):
+        import importlib
+        from servbot import instrumentation
+        from servbot.clients.graph import GraphClient
+        before = (db.save_message, GraphClient.fetch_messages)
+        importlib.reload(instrumentation)
+        self.assertIs(db.save_message, before[0])
+        self.assertIs(GraphClient.fetch_messages, before[1])
+        self.assertFalse(getattr(db.save_message.__wrapped__, '_servbot_instrumented', False))
+
 if __name__ == '__main__':
     unittest.main()
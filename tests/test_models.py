@@ -44,6 +44,13 @@ class TestModels(unittest.TestCase):
         self.assertIsInstance(pair, str)
         self.assertEqual(pair, "<GitHub, 123456>")
 
+    def test_verification_is_frozen_and_hashable(self):
+        """Verification is immutable and usable as a set member."""
+        v = Verification("GitHub", "123456")
+        with self.assertRaises(AttributeError):
+            v.code = "654321"
+        self.assertEqual(len({v, Verification("GitHub", "123456")}), 1)
+
     def test_email_message_init(self):
         """Test EmailMessage initialization."""
         msg = EmailMessage(
@@ -5,16 +5,19 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from unittest.mock import patch
+
 from servbot.parsers.code_parser import (
     parse_verification_codes,
     parse_verification_links,
+    visit_verification_link,
 )
 from servbot.parsers.service_parser import (
     identify_service,
     canonical_service_name,
     services_equal,
 )
-from servbot.parsers.email_parser import html_to_text
+from servbot.parsers.email_parser import html_to_text, fast_html_snippet
 
 class TestParsers(unittest.TestCase):
 
@@ -23,6 +26,13 @@ class TestParsers(unittest.TestCase):
         expected = "Hello World"
         self.assertEqual(html_to_text(html).strip(), expected)
 
+    def test_fast_html_snippet(self):
+        html = "<style>p{color:red}</style><p>Code&nbsp;is <b>123456</b> &amp; more</p><script>alert(1)</script>"
+        self.assertEqual(fast_html_snippet(html), "Code is 123456 & more")
+        self.assertEqual(fast_html_snippet(html, max_len=4), "Code")
+        self.assertEqual(fast_html_snippet(""), "")
+        self.assertEqual(fast_html_snippet("<p>abcdef</p>", max_bytes=6), "abc")
+
     def test_parse_verification_codes(self):
         # Basic cases
         self.assertEqual(parse_verification_codes("Your code is 123456.", use_ai_fallback=False), ["123456"])
@@ -30,14 +40,39 @@ class TestParsers(unittest.TestCase):
         self.assertEqual(parse_verification_codes("Use code: ABCDE123", use_ai_fallback=False), ["ABCDE123"])
         self.assertEqual(parse_verification_codes("Security code: 555-666", use_ai_fallback=False), []) # Not a code
         self.assertEqual(parse_verification_codes("Your OTP is 888777", use_ai_fallback=False), ["888777"])
+        self.assertEqual(parse_verification_codes("Your code: g123456", use_ai_fallback=False), ["123456"])
+        self.assertEqual(parse_verification_codes("FB-112233 then G-987654", use_ai_fallback=False), ["987654", "112233"])
         
         # Multiple codes
         text = "Code 1 is 111111. Code 2 is 222222. 111111 is a repeat."
         self.assertEqual(parse_verification_codes(text, use_ai_fallback=False), ["111111", "222222"])
 
+        # Long text: a code in the head wins, otherwise the whole text is scanned
+        filler = ("lorem ipsum\n" * 400)
+        self.assertEqual(parse_verification_codes("Your code is 111111\n" + filler + "Code 222222", use_ai_fallback=False), ["111111"])
+        self.assertEqual(parse_verification_codes(filler + "Code 222222", use_ai_fallback=False), ["222222"])
+
         # No code
         self.assertEqual(parse_verification_codes("Hello world, how are you?", use_ai_fallback=False), [])
 
+    def test_parse_verification_codes_prefilter(self):
+        # Only patterns reported by the (Hyperscan) prefilter are run
+        text = "G-987654 and your code is 123456"
+        with patch('servbot.parsers.code_parser._candidate_patterns', return_value={3}):
+            self.assertEqual(parse_verification_codes(text, use_ai_fallback=False), ["987654", "123456"])
+        with patch('servbot.parsers.code_parser._candidate_patterns', return_value={0}):
+            self.assertEqual(parse_verification_codes(text, use_ai_fallback=False), ["987654"])
+        with patch('servbot.parsers.code_parser._candidate_patterns', return_value=None):
+            self.assertEqual(parse_verification_codes(text, use_ai_fallback=False), ["987654", "123456"])
+
+    @patch('servbot.parsers.ai_parser.extract_with_ai', return_value={'code': '4321'})
+    def test_ai_skipped_for_confident_code(self, mock_ai):
+        kwargs = dict(email_subject="Your code", from_addr="no-reply@x.com")
+        self.assertEqual(parse_verification_codes("Your code is 123456", **kwargs), ["123456"])
+        mock_ai.assert_not_called()
+        self.assertEqual(parse_verification_codes("Use code: ABCDE1", **kwargs)[0], "4321")
+        self.assertEqual(parse_verification_codes("Your code is 123456", ai_override=True, **kwargs), ["123456", "4321"])
+
     def test_parse_verification_links(self):
         text = '''
             Click here to verify: https://service.com/verify?token=123
@@ -49,6 +84,26 @@ class TestParsers(unittest.TestCase):
         self.assertIn("https://service.com/verify?token=123", links[0])
         self.assertIn("https://service.com/login", links[1])
 
+        text = "https://x.com/a https://x.com/HELP https://x.com/a"
+        self.assertEqual(parse_verification_links(text, email_subject="Please Verify"), ["https://x.com/a"])
+        self.assertEqual(parse_verification_links(text), [])
+
+        # Regex fallback when pyahocorasick is not installed gives the same result
+        with patch('servbot.parsers.code_parser._LINK_AUTOMATON', None):
+            self.assertEqual(parse_verification_links(text, email_subject="Please Verify"), ["https://x.com/a"])
+            self.assertEqual(parse_verification_links("https://s.com/verify https://s.com/help/verify"), ["https://s.com/verify"])
+
+    @patch('servbot.parsers.code_parser._LINK_SESSION', None)
+    def test_visit_verification_link_reuses_session(self):
+        with patch('requests.Session.get') as mock_get:
+            mock_get.return_value.status_code = 302
+            self.assertTrue(visit_verification_link("https://a.example/verify"))
+            mock_get.return_value.status_code = 404
+            self.assertFalse(visit_verification_link("https://a.example/verify"))
+        from servbot.parsers import code_parser
+        self.assertIsNotNone(code_parser._LINK_SESSION)
+        self.assertEqual(mock_get.call_count, 2)
+
     def test_identify_service(self):
         # From domain
         self.assertEqual(identify_service("noreply@github.com", "", "", use_ai_fallback=False), "GitHub")
@@ -1,4 +1,6 @@
 """Comprehensive tests for proxy module."""
+import threading
+
 import pytest
 from servbot.proxy import (
     ProxyEndpoint,
@@ -7,6 +9,7 @@ from servbot.proxy import (
     ProxyType,
     IPVersion,
     RotationType,
+    ProxyDetector,
 )
 from servbot.proxy.meter import ProxyMeter, ProxyUsageMetrics
 
@@ -265,6 +268,41 @@ class TestProxyManager:
         ep3 = pm.acquire(name="limited")
         assert ep3 is not None
 
+    def test_concurrency_limit_across_threads(self):
+        """Concurrent acquires never exceed the limit and releases free every slot."""
+        config = ProviderConfig(
+            name="threaded",
+            type="static_list",
+            concurrency_limit=3,
+            options={"entries": "1.2.3.4:8080"},
+        )
+        pm = ProxyManager([config], enable_metering=False)
+        acquired, barrier = [], threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            try:
+                acquired.append(pm.acquire(name="threaded"))
+            except RuntimeError:
+                pass
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(acquired) == 3
+        assert pm.get_stats()["total_active"] == 3
+        for ep in acquired:
+            pm.release(ep)
+        pm.release(acquired[0])  # an extra release does not create a spare slot
+        assert pm.get_stats()["providers"]["threaded"]["active_connections"] == 0
+        for _ in range(3):
+            pm.acquire(name="threaded")
+        with pytest.raises(RuntimeError, match="Concurrency limit reached"):
+            pm.acquire(name="threaded")
+
     def test_release_tracking(self):
         """Test proxy release tracking."""
         config = ProviderConfig(
@@ -417,6 +455,67 @@ class TestProxyMeter:
         assert "provider2" in summary["by_provider"]
 
 
+class TestProxyDetector:
+    """Test provider auto-detection."""
+
+    def test_detect_provider(self):
+        """Test provider detection keeps PROVIDER_PATTERNS priority."""
+        assert ProxyDetector.detect_provider("GATE.SmartProxy.com") == "smartproxy"
+        assert ProxyDetector.detect_provider("1.2.3.4") is None
+        # oxylabs matches earlier in the text, but mooproxy is listed first
+        assert ProxyDetector.detect_provider("pr.oxylabs.io", "user", "pw_session-abc") == "mooproxy"
+
+    def test_extract_session_and_region(self):
+        """Test session/region extraction from MooProxy-style passwords."""
+        password = "pw_country-us_country-GB_session-:_session-Ab1_x-2:rest"
+        assert ProxyDetector.extract_session_id(password) == "Ab1_x-2"
+        assert ProxyDetector.extract_region(password) == "GB"
+        assert ProxyDetector.extract_session_id("pw_session-") is None
+        assert ProxyDetector.extract_region("pw_country-U") is None
+
+    def test_parse_proxy_string_formats(self):
+        """Test each supported line format, including ones the fast path skips."""
+        cases = {
+            "socks5://gw.mooproxy.net:1080:user:pw_country-US_session-s1": ("socks5", "gw.mooproxy.net", 1080, "user", "pw_country-US_session-s1"),
+            "user:pw@1.2.3.4:8080": ("http", "1.2.3.4", 8080, "user", "pw"),
+            "user@1.2.3.4:8080": ("http", "1.2.3.4", 8080, "user", None),
+            "1.2.3.4:8080": ("http", "1.2.3.4", 8080, None, None),
+            "u:p@q@h:81": ("http", "q@h", 81, "u", "p"),  # handled by the fallback parsing
+        }
+        for line, expected in cases.items():
+            r = ProxyDetector.parse_proxy_string(line)
+            assert (r.scheme, r.host, r.port, r.username, r.password) == expected
+        assert ProxyDetector.parse_proxy_string("1.2.3.4:0") is None
+        assert ProxyDetector.parse_proxy_string("1.2.3.4:http") is None
+
+    def test_repeated_fields_are_shared(self):
+        """Test host/scheme/region strings are interned across parsed lines."""
+        first, second = (
+            ProxyDetector.parse_proxy_string(f"socks5://gw.mooproxy.net:1000:u:p_country-US_session-{s}")
+            for s in "ab"
+        )
+        assert first.host is second.host
+        assert first.scheme is second.scheme
+        assert first.region is second.region
+
+    def test_detect_proxy_type(self):
+        """Test proxy type indicators, with and without pyahocorasick."""
+        from unittest.mock import patch
+        from servbot.proxy import batch_import
+
+        cases = [
+            ("isp.example.com", "pw_static-residential", ProxyType.RESIDENTIAL),
+            ("ISP.example.com", None, ProxyType.ISP),
+            ("gw.example.com", "pw-4G", ProxyType.MOBILE),
+            ("dc.example.com", "pw", ProxyType.DATACENTER),
+            ("r", "esi", ProxyType.DATACENTER),  # no match across host/password
+        ]
+        for automaton in (batch_import._TYPE_AUTOMATON, None):
+            with patch.object(batch_import, "_TYPE_AUTOMATON", automaton):
+                for host, password, expected in cases:
+                    assert ProxyDetector.detect_proxy_type(host, None, password) == expected
+
+
 class TestIntegration:
     """Integration tests for complete proxy workflow."""
 
@@ -476,3 +575,249 @@ class TestIntegration:
         # Can still get specific provider
         ep2 = pm.acquire(name="backup")
         assert ep2.provider == "backup"
+
+
+class TestBridge:
+    """Test proxies-DB bridge helpers."""
+
+    def test_db_handle_reused(self, tmp_path, monkeypatch):
+        """Test the bridge shares one ProxyDatabase per path across threads and sees new rows."""
+        from servbot.proxy import bridge
+
+        monkeypatch.setattr(bridge, "PROXY_DB_PATH", str(tmp_path / "proxies.db"))
+        monkeypatch.setattr(bridge, "_DBS", {})
+        monkeypatch.setattr(bridge, "PROXY_CACHE_SECONDS", 3600)
+        bridge._fetch_first.cache_clear()
+
+        assert bridge.get_proxy_endpoint_from_db(only_working=False) is None
+        db = bridge._get_db()
+        db.add_proxy(ProxyEndpoint(scheme="http", host="1.2.3.4", port=8080))
+        assert bridge._get_db() is db
+        other_thread = []
+        worker = threading.Thread(target=lambda: other_thread.append(bridge._get_db()))
+        worker.start()
+        worker.join()
+        assert other_thread == [db]
+        assert bridge._get_db(str(tmp_path / "other.db")) is not db
+        assert bridge.get_proxy_endpoint_from_db(only_working=False) is None  # cached
+        bridge._fetch_first.cache_clear()
+        assert bridge.get_requests_proxies_from_db(only_working=False) == {
+            "http": "http://1.2.3.4:8080",
+            "https": "http://1.2.3.4:8080",
+        }
+        first = bridge.get_proxy_endpoint_from_db(only_working=False)
+        first.metadata["is_active"] = False
+        assert bridge.get_proxy_endpoint_from_db(only_working=False).metadata["is_active"] is True
+        bridge._close_dbs()
+        assert bridge._DBS == {}
+
+
+class TestBatchImport:
+    """Test batch proxy import."""
+
+    def test_import_from_file_streams_lines(self, tmp_path):
+        """Test file import skips comments/blank lines and accepts any iterable."""
+        from servbot.proxy import ProxyBatchImporter
+
+        path = tmp_path / "proxies.txt"
+        path.write_text("# comment\n\n1.2.3.4:80\nbad\n  u:p@h.example.com:81  \n")
+        endpoints = ProxyBatchImporter.import_from_file(str(path))
+        assert [(ep.host, ep.metadata["batch_index"]) for ep in endpoints] == [("1.2.3.4", 1), ("h.example.com", 3)]
+        assert ProxyBatchImporter.import_from_list(iter(["5.6.7.8:90"]))[0].port == 90
+
+    def test_import_persists_in_one_batch(self, tmp_path):
+        """Test imported endpoints are saved once, with duplicates mapped to existing IDs."""
+        from servbot.proxy import ProxyBatchImporter
+        from servbot.proxy.database import ProxyDatabase
+
+        db = ProxyDatabase(str(tmp_path / "proxies.db"))
+        assert db._get_connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        lines = ["gw.mooproxy.net:1000:u:p_session-a", "gw.mooproxy.net:1000:u:p_session-b"]
+        ProxyBatchImporter.import_from_list(lines, db=db)
+        ids = db.add_proxies_batch(ProxyBatchImporter.import_from_list(lines))  # re-adding returns existing IDs
+        assert sorted(ids) == [1, 2]
+        assert len(db.get_all_proxies()) == 2
+        stats = db._get_connection().execute("SELECT COUNT(*) FROM proxy_stats").fetchone()[0]
+        assert stats == 2
+        db.close()
+
+    def test_parallel_import_matches_serial(self, monkeypatch):
+        """Test multi-process import keeps input order and batch indexes."""
+        from servbot.proxy import ProxyBatchImporter, batch_import
+
+        monkeypatch.setattr(batch_import, "IMPORT_CHUNK_SIZE", 3)
+        lines = [f"10.0.0.{n}:{8000 + n}" if n % 4 else "bad" for n in range(20)]
+        serial = ProxyBatchImporter.import_from_list(lines)
+        parallel = ProxyBatchImporter.import_from_list(iter(lines), workers=2)
+        assert parallel == serial
+        assert [ep.metadata["batch_index"] for ep in parallel][:3] == [2, 3, 4]
+
+
+class TestProxyDatabase:
+    """Test ProxyDatabase queries."""
+
+    def test_working_proxies_use_latest_test(self, tmp_path):
+        """Test only proxies whose most recent test passed are returned."""
+        from servbot.proxy.database import ProxyDatabase
+
+        db = ProxyDatabase(str(tmp_path / "proxies.db"))
+        ids = [db.add_proxy(ProxyEndpoint(scheme="http", host=f"10.0.0.{n}", port=80)) for n in range(3)]
+        db.record_test_result(ids[0], True)
+        db.record_test_result(ids[0], False)  # same second: the later row wins
+        db.record_test_result(ids[1], False)
+        db.record_test_result(ids[1], True)
+        assert [ep.host for ep in db.get_working_proxies()] == ["10.0.0.1"]
+        db.close()
+
+    def test_connection_per_thread(self, tmp_path):
+        """Test each thread gets its own connection and close() closes them all."""
+        import gc
+        import sqlite3
+        from servbot.proxy.database import ProxyDatabase
+
+        db = ProxyDatabase(str(tmp_path / "proxies.db"))
+        main_conn = db._get_connection()
+        seen = []
+
+        def worker(n):
+            seen.append(db._get_connection())
+            db.add_proxy(ProxyEndpoint(scheme="http", host=f"10.0.1.{n}", port=80))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len({id(c) for c in seen + [main_conn]}) == 5
+        assert len(db.get_all_proxies()) == 4
+        gc.collect()
+        for conn in seen:  # closed when their threads exited
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        assert len(db._conns) == 1
+        assert list(db.iter_proxies(batch_size=3)) == db.get_all_proxies()
+        db.close()
+        assert db._get_connection() is not main_conn  # reopened after close
+        db.close()
+
+    def test_test_results_written_in_background(self, tmp_path, monkeypatch):
+        """Test queued test results are batched and visible to readers and after close()."""
+        from servbot.proxy import database
+
+        monkeypatch.setattr(database, "TEST_RESULT_BATCH_SIZE", 7)
+        path = str(tmp_path / "proxies.db")
+        db = database.ProxyDatabase(path)
+        proxy_id = db.add_proxy(ProxyEndpoint(scheme="http", host="10.0.2.1", port=80))
+        for n in range(50):
+            db.record_test_result(proxy_id, n % 2 == 1, status_code=200)
+        assert len(db.get_test_history(proxy_id, limit=100)) == 50  # reads flush first
+        assert [ep.host for ep in db.get_working_proxies()] == ["10.0.2.1"]
+        db.record_test_result(proxy_id, False)
+        db.close()
+
+        reopened = database.ProxyDatabase(path)
+        assert reopened.get_working_proxies() == []
+        reopened.close()
+
+    def test_bad_test_result_keeps_writer_alive(self, tmp_path):
+        """Test a row SQLite rejects is dropped alone and later flushes still return."""
+        from servbot.proxy import database
+
+        db = database.ProxyDatabase(str(tmp_path / "proxies.db"))
+        ids = [db.add_proxy(ProxyEndpoint(scheme="http", host=f"10.0.2.{n}", port=80)) for n in range(3)]
+        with db._conns_lock:  # queue all three so they land in one batch
+            db._ensure_test_writer()
+            db._test_queue.put((ids[0], True, None, None, None, "", None))
+            db._test_queue.put((ids[1], True, None, 2**70, None, "", None))  # OverflowError
+            db._test_queue.put((ids[2], True, None, None, None, "", None))
+        assert [ep.host for ep in db.get_working_proxies()] == ["10.0.2.0", "10.0.2.2"]
+
+        db._test_queue.put(database._STOP_WRITER)  # as if the writer thread had died
+        dead = db._test_writer
+        dead.join()
+        db.record_test_result(ids[1], True, status_code=2**70)
+        assert db._test_writer is not dead and db._test_writer.is_alive()
+        db.record_test_result(ids[1], True)
+        assert len(db.get_working_proxies()) == 3
+        db.close()
+
+    def test_test_writer_does_not_keep_database_alive(self, tmp_path):
+        """Test a database dropped without close() is collected and its queued results still land."""
+        import gc
+        import weakref
+        from servbot.proxy.database import ProxyDatabase
+
+        path = str(tmp_path / "proxies.db")
+        db = ProxyDatabase(path)
+        proxy_id = db.add_proxy(ProxyEndpoint(scheme="http", host="10.0.2.9", port=80))
+        db.record_test_result(proxy_id, True)
+        writer, ref = db._test_writer, weakref.ref(db)
+        del db
+        gc.collect()
+        assert ref() is None
+        writer.join(5)
+        assert not writer.is_alive()
+
+        reopened = ProxyDatabase(path)
+        assert [ep.host for ep in reopened.get_working_proxies()] == ["10.0.2.9"]
+        reopened.close()
+
+    def test_in_memory_test_results_written_synchronously(self):
+        """Test :memory: databases record results on the caller's connection."""
+        from servbot.proxy.database import ProxyDatabase
+
+        db = ProxyDatabase(":memory:")
+        proxy_id = db.add_proxy(ProxyEndpoint(scheme="http", host="10.0.2.8", port=80))
+        db.record_test_result(proxy_id, True)
+        assert db._test_writer is None
+        assert [ep.host for ep in db.get_working_proxies()] == ["10.0.2.8"]
+        db.close()
+
+    def test_last_test_columns_backfilled(self, tmp_path):
+        """Test databases created before last_test_success get it filled from history."""
+        import sqlite3
+        from servbot.proxy.database import ProxyDatabase
+
+        path = str(tmp_path / "proxies.db")
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE proxies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, host TEXT NOT NULL, port INTEGER NOT NULL,
+                username TEXT, password TEXT, provider TEXT, session TEXT, proxy_type TEXT,
+                ip_version TEXT, rotation_type TEXT, region TEXT, scheme TEXT DEFAULT 'http',
+                is_active BOOLEAN DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE(host, port, username, session)
+            );
+            CREATE TABLE proxy_tests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, proxy_id INTEGER NOT NULL, success BOOLEAN NOT NULL,
+                response_time_ms REAL, status_code INTEGER, error_message TEXT, test_url TEXT,
+                response_ip TEXT, tested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            INSERT INTO proxies (host, port) VALUES ('10.0.3.1', 80), ('10.0.3.2', 80), ('10.0.3.3', 80);
+            INSERT INTO proxy_tests (proxy_id, success, tested_at) VALUES
+                (1, 1, '2026-01-02'), (1, 0, '2026-01-01'), (2, 1, '2026-01-01'), (2, 0, '2026-01-02');
+        """)
+        conn.close()
+
+        db = ProxyDatabase(path)
+        assert [ep.host for ep in db.get_working_proxies()] == ["10.0.3.1"]
+        db.record_test_result(3, True)
+        assert [ep.host for ep in db.get_working_proxies()] == ["10.0.3.1", "10.0.3.3"]
+        db.close()
+
+    def test_database_stats(self, tmp_path):
+        """Test aggregate stats over proxies and test results."""
+        from servbot.proxy.database import ProxyDatabase
+
+        db = ProxyDatabase(str(tmp_path / "proxies.db"))
+        assert db.get_database_stats() == {
+            "total_proxies": 0, "active_proxies": 0, "by_provider": {}, "total_tests": 0, "success_rate": 0.0,
+        }
+        ids = [db.add_proxy(ProxyEndpoint(scheme="http", host=f"10.0.4.{n}", port=80, provider="p")) for n in range(3)]
+        db.update_proxy_status(ids[2], False)
+        for success in (True, True, True, False):
+            db.record_test_result(ids[0], success)
+        assert db.get_database_stats() == {
+            "total_proxies": 3, "active_proxies": 2, "by_provider": {"p": 2}, "total_tests": 4, "success_rate": 75.0,
+        }
+        db.close()
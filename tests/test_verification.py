@@ -11,7 +11,9 @@ sys.path.insert(0, str(Path(__file__).parent))
 from servbot.core.verification import (
     _process_email_for_verifications,
     _deduplicate_verifications,
+    get_latest_verification,
 )
+from servbot.clients import GraphThrottled
 from servbot.core.models import EmailMessage, Verification
 
 
@@ -103,6 +105,11 @@ class TestVerification(unittest.TestCase):
         result = _deduplicate_verifications([v])
         self.assertEqual(len(result), 1)
 
+    @patch('servbot.core.verification.fetch_verification_codes', side_effect=GraphThrottled(30))
+    def test_get_latest_verification_throttled_returns_none(self, _fetch):
+        """The single-shot helper reports throttling as 'nothing found'."""
+        self.assertIsNone(get_latest_verification("Service", username="me@example.com"))
+
 
 if __name__ == "__main__":
     unittest.main()